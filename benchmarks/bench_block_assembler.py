@@ -0,0 +1,64 @@
+"""
+Benchmarks for block template assembly from large mempools.
+
+Run from the repo root:
+    python -m benchmarks.bench_block_assembler
+"""
+
+import os
+import random
+import timeit
+
+from blockchain.script import P2PKH_script_pubkey, Script
+from blockchain.transaction import Transaction, TransactionInput, TransactionOutput
+from ktc_constants import MAX_BLOCK_SIZE
+from mining.block_assembler import select_transactions
+from mining.constants import BLOCK_RESERVED_SIZE
+from mining.mempool import Mempool, MempoolEntry
+
+
+def _mempool(n: int, chain_ratio: float = 0.3) -> Mempool:
+    """
+    A mempool of `n` unsigned 1-input transactions, where about `chain_ratio` of them spend a recent mempool transaction.
+    Entries are added directly, skipping validation, so that only assembly is measured.
+    """
+    rng = random.Random(0)
+    mempool = Mempool(node=None)
+    recent: list[bytes] = []
+    for i in range(n):
+        if recent and rng.random() < chain_ratio:
+            prev_hash = rng.choice(recent[-200:])
+        else:
+            prev_hash = os.urandom(32)
+
+        tx = Transaction(
+            version=1,
+            inputs=[TransactionInput(prev_hash, 0, Script([os.urandom(rng.randint(100, 1500))]))],
+            outputs=[TransactionOutput(1000, P2PKH_script_pubkey(os.urandom(20)))],
+            locktime=0,
+        )
+        tx_hash, size = tx.hash(), tx.size()
+        mempool._add_entry(MempoolEntry(tx, tx_hash, size, rng.randint(100, 5000) * size // 1024, i))
+        recent.append(tx_hash)
+    return mempool
+
+
+def bench(n: int, number: int = 5):
+    mempool = _mempool(n)
+    max_size = MAX_BLOCK_SIZE - BLOCK_RESERVED_SIZE
+    t_build = timeit.timeit(lambda: select_transactions(mempool, max_size), number=number) / number
+
+    entries, size, fee, _ = select_transactions(mempool, max_size)
+    print(
+        f"{n:>7} txs ({mempool.get_total_size() / (1 << 20):6.1f} MB)  build {t_build * 1e3:8.1f} ms  "
+        f"selected {len(entries):>6} txs, {size / (1 << 20):.2f} MB, {fee} khets"
+    )
+
+
+def main():
+    for n in (1_000, 10_000, 50_000):
+        bench(n)
+
+
+if __name__ == "__main__":
+    main()
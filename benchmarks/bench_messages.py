@@ -0,0 +1,45 @@
+"""
+Micro-benchmarks for vector message serialization and parsing.
+
+Run from the repo root:
+    python -m benchmarks.bench_messages
+"""
+
+import os
+import timeit
+from io import BytesIO
+
+from networking.constants import ADDR_LIMIT, GETHEADERS_LIMIT, INV_LIMIT, TX_TYPE
+from networking.messages.types import AddrMessage, GetDataMessage, HeadersMessage, InvMessage, NotFoundMessage
+from utils.helper import encode_ip
+
+
+def _inventory(n: int) -> list[tuple[int, bytes]]:
+    return [(TX_TYPE, os.urandom(32)) for _ in range(n)]
+
+
+def _headers(n: int) -> list[bytes]:
+    return [os.urandom(80) for _ in range(n)]
+
+
+def _addresses(n: int) -> list[tuple[int, int, bytes, int]]:
+    return [(1_700_000_000 + i, 1, encode_ip(f"10.0.{i // 256}.{i % 256}"), 8666) for i in range(n)]
+
+
+def bench(name: str, message_class, items, number: int = 20):
+    payload = message_class(items).payload
+    t_build = timeit.timeit(lambda: message_class(items), number=number) / number
+    t_parse = timeit.timeit(lambda: message_class.parse(BytesIO(payload)), number=number) / number
+    print(f"{name:<10} {len(items):>6} items  build {t_build * 1e3:8.3f} ms  parse {t_parse * 1e3:8.3f} ms")
+
+
+def main():
+    bench("inv", InvMessage, _inventory(INV_LIMIT))
+    bench("getdata", GetDataMessage, _inventory(INV_LIMIT))
+    bench("notfound", NotFoundMessage, _inventory(INV_LIMIT))
+    bench("headers", HeadersMessage, _headers(GETHEADERS_LIMIT))
+    bench("addr", AddrMessage, _addresses(ADDR_LIMIT))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from typing import List, BinaryIO
 from io import BytesIO
 
 from db.block import calculate_block_target, get_block_height_at_hash
-from utils.helper import bits_to_target, bytes_to_int, read_varint, encode_varint
+from utils.helper import bits_to_target, bytes_to_int, read_varint, encode_varint, target_to_work
 from blockchain.header import Header
 from blockchain.transaction import Transaction
 from blockchain.merkle_tree import MerkleTree
@@ -144,7 +144,7 @@ class Block:
         return HIGHEST_TARGET / self.target
 
     def work(self) -> int:
-        return floor((1 << 256) / (self.target + 1))
+        return target_to_work(self.target)
     
     def check_proof_of_work(self) -> bool:
         return bytes_to_int(self.hash()) < self.target
@@ -6,7 +6,7 @@ from io import BytesIO
 from typing import BinaryIO
 
 from crypto.hashing import HASH256
-from utils.helper import bytes_to_int, int_to_bytes
+from utils.helper import bits_to_target, bytes_to_int, int_to_bytes, target_to_work
 
 
 class Header:
@@ -66,6 +66,9 @@ class Header:
 
     def hash(self) -> bytes:
         return HASH256(self.serialize())
+
+    def work(self) -> int:
+        return target_to_work(bits_to_target(self.bits))
     
     # Methods specific for mining
     def serialize_without_nonce(self):
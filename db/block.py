@@ -99,6 +99,50 @@ def get_raw_header_at_height(height: int) -> bytes | None:
     return get_raw_block_at_height(height, _full=False)
 
 
+def get_raw_blocks_in_range(start_height: int, count: int, headers_only: bool = False, max_bytes: int = 0) -> list[bytes]:
+    """
+    Returns up to `count` consecutive blocks (or 80B headers) of the active chain in byte form, starting at `start_height`.
+    \nStops early at the tip, or after `max_bytes` if given. Reads all offsets in one transaction,
+    and each .dat file is opened once, for bulk reads.
+    """
+    result = []
+    total_size = 0
+    dat_files = dict()
+    try:
+        with LMDB_ENV.begin() as txn:
+            for height in range(start_height, start_height + count):
+                block_hash = txn.get(int_to_bytes(height, 8), db=HEIGHT_DB)
+                if block_hash is None:
+                    break
+                value = txn.get(block_hash, db=BLOCKS_DB)
+                if value is None:
+                    break
+
+                dat_file_no = bytes_to_int(value[:4])
+                offset = bytes_to_int(value[4:8])
+                block_size = bytes_to_int(value[8:12])
+
+                if dat_file_no not in dat_files:
+                    dat_files[dat_file_no] = open(BLOCKCHAIN_DIR / f"blk{dat_file_no:08}.dat", "rb")
+                stream = dat_files[dat_file_no]
+                stream.seek(offset)
+                if stream.read(4) != BLOCK_MAGIC:
+                    log.warning("Block magic not placed correctly in .dat file.")
+                    break
+                stream.seek(4, os.SEEK_CUR)  # Block size
+
+                data = stream.read(80 if headers_only else block_size)
+                result.append(data)
+                total_size += len(data)
+                if max_bytes and total_size >= max_bytes:
+                    break
+    finally:
+        for stream in dat_files.values():
+            stream.close()
+
+    return result
+
+
 
 # 3. Block metadata
 def get_block_metadata(block_hash: bytes) -> BlockMetadata | None:
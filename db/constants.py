@@ -118,6 +118,22 @@ LMDB_ENV = lmdb.open(str(LMDB_DIR), map_size=MAP_SIZE, max_dbs=10)
 # Value : Tx Hash (32B) + Output Index (4B)
 
 
+# ---------------------
+# MEMPOOL DB
+# ---------------------
+# Key   : Tx Hash (32B)
+# Value :
+#   - time_added        : 8B
+#   - raw_tx            : Full Transaction
+
+
+# ---------------------
+# FEE_ESTIMATES DB
+# ---------------------
+# Key   : b"stats"
+# Value : Serialized `FeeEstimator` statistics (see `mining.fee_estimator`)
+
+
 with LMDB_ENV.begin(write=True) as txn:
     BLOCKS_DB     = LMDB_ENV.open_db(b"blocks", txn=txn, create=True)
     INDEX_DB      = LMDB_ENV.open_db(b"index", txn=txn, create=True)
@@ -127,3 +143,4 @@ with LMDB_ENV.begin(write=True) as txn:
     UTXO_DB       = LMDB_ENV.open_db(b"utxo", txn=txn, create=True)
     ADDR_DB       = LMDB_ENV.open_db(b"addr", txn=txn, create=True, dupsort=True)
     MEMPOOL_DB    = LMDB_ENV.open_db(b"mempool", txn=txn, create=True)
+    FEE_ESTIMATES_DB = LMDB_ENV.open_db(b"fee_estimates", txn=txn, create=True)
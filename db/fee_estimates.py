@@ -0,0 +1,13 @@
+from db.constants import LMDB_ENV, FEE_ESTIMATES_DB
+
+FEE_ESTIMATES_KEY = b"stats"
+
+
+def load_fee_estimates_lmdb() -> bytes | None:
+    with LMDB_ENV.begin(db=FEE_ESTIMATES_DB, write=False) as txn:
+        return txn.get(FEE_ESTIMATES_KEY)
+
+
+def save_fee_estimates_lmdb(data: bytes):
+    with LMDB_ENV.begin(db=FEE_ESTIMATES_DB, write=True) as txn:
+        txn.put(FEE_ESTIMATES_KEY, data)
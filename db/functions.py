@@ -10,9 +10,8 @@ from db.height import delete_height, get_blockchain_height, save_height
 from db.index import BlockIndex, generate_block_index, get_block_index, get_fork_index
 from db.tx_history import append_tx_history, delete_tx_history
 from db.utxo import backtrack_UTXO_set, update_UTXO_set
-from networking.constants import BLOCK_TYPE
-from networking.messages.types.inv import InvMessage
 from utils.config import APP_CONFIG
+from utils.events import BLOCK_CONNECTED, BLOCK_DISCONNECTED
 from utils.helper import encode_varint, int_to_bytes
 
 log = logging.getLogger(__name__)
@@ -51,7 +50,7 @@ def connect_block(block: Block, node):
     
     This includes
     - Updating the UTXO set
-    - Updating Mempool
+    - Updating Mempool and fee estimates
     - Updating support DBs like HEIGHT_DB & TX_HISTORY_DB
     """
     block_index = get_block_index(block.hash())
@@ -59,10 +58,12 @@ def connect_block(block: Block, node):
     
     # 1. Save to UTXO_DB (and ADDR_DB)
     update_UTXO_set(txs)
+    for tx in txs:
+        node.known_inventory.insert(tx.hash())
     
-    # 2. Refresh mempool
-    node.mempool.remove_mined_txs(txs)
-    node.mempool.revalidate_mempool()
+    # 2. Record how long the mined transactions waited, then refresh mempool
+    node.fee_estimator.process_block(block_index.height, [tx.hash() for tx in txs])
+    node.mempool.remove_for_block(txs)
     
     # 3. Save to HEIGHT_DB
     save_height(block_index.height, block.hash())
@@ -73,12 +74,10 @@ def connect_block(block: Block, node):
     # 5. Set as blockchain tip 
     node.set_tip(block_index)
     
-    # 6. Broadcast
-    node.broadcast(
-        InvMessage(
-            [(BLOCK_TYPE, block.hash())]
-        )
-    )
+    # 6. Broadcast, keeping the block ready for the peers that will request it
+    node.block_cache.add(block.hash(), block.serialize())
+    node.relay_block(block)
+    node.events.publish(BLOCK_CONNECTED, block_hash=block_index.hash, height=block_index.height)
     
     log.info(f"Block connected: {block.hash().hex()}")
 
@@ -88,6 +87,7 @@ def disconnect_block(block: Block, node):
     Backtracks `block` from the active blockchain
     """
     block_index = get_block_index(block.hash())
+    height = block_index.height
     txs = block.get_transactions()
     
     # 1. Backtrack UTXO set
@@ -107,6 +107,7 @@ def disconnect_block(block: Block, node):
     # 5. Set as blockchain tip 
     block_index = generate_block_index(block)
     node.set_tip(block_index)
+    node.events.publish(BLOCK_DISCONNECTED, block_hash=block.hash(), height=height)
     
     log.info(f"Block disconnected: {block.hash().hex()}")
     
@@ -120,6 +121,9 @@ def reorg_blockchain(old_tip_index: BlockIndex, new_tip_index: BlockIndex, node)
         block = Block.parse(get_raw_block(index.hash))
         disconnect_block(block, node)
         index = index.get_prev_index()
+    
+    # Transactions from the disconnected blocks are back, so the rest of the mempool is checked against them once
+    node.mempool.revalidate_mempool()
         
     # 2. Extend all blocks until new tip
     index = new_tip_index
@@ -1,18 +1,26 @@
+import time
+
 from crypto.hashing import HASH256
 from db.constants import LMDB_ENV, MEMPOOL_DB
+from utils.helper import bytes_to_int, int_to_bytes
 
 
-def load_mempool_lmdb() -> list[bytes]:
-    raw_txs = []
+def load_mempool_lmdb() -> list[tuple[bytes, int]]:
+    """Returns the saved (raw_tx, time added) pairs."""
+    saved_txs = []
+    now = int(time.time())
     with LMDB_ENV.begin(db=MEMPOOL_DB, write=False) as txn:
         cursor = txn.cursor()
-        for tx_hash, raw_tx in cursor:
-            raw_txs.append(raw_tx)
-    return raw_txs
+        for tx_hash, value in cursor:
+            if HASH256(value[8:]) == tx_hash:
+                saved_txs.append((value[8:], bytes_to_int(value[:8])))
+            else:  # Saved before times were kept; the transaction starts waiting again
+                saved_txs.append((value, now))
+    return saved_txs
     
     
-def save_mempool_lmdb(raw_txs: list[bytes]):
+def save_mempool_lmdb(saved_txs: list[tuple[bytes, int]]):
     with LMDB_ENV.begin(db=MEMPOOL_DB, write=True) as db:
         db.drop(MEMPOOL_DB, delete=False)  # clear existing entries
-        for raw_tx in raw_txs:
-            db.put(HASH256(raw_tx), raw_tx)
+        for raw_tx, time_added in saved_txs:
+            db.put(HASH256(raw_tx), int_to_bytes(time_added, 8) + bytes(raw_tx))
@@ -1,7 +1,6 @@
-import time
 import aiosqlite
 
-from utils.ip import ip_bytes_to_str, ip_convert_to_bytes
+from utils.ip import ip_convert_to_bytes
 from utils.config import APP_CONFIG
 
 from dataclasses import dataclass
@@ -15,60 +14,56 @@ class PeerMeta:
     added: int
     last_seen: int
     services: int
-    
+    tried: bool = False
+
     @property
     def ip_bytes(self):
         return ip_convert_to_bytes(self.ip)
-    
+
 
 
 
 PEERS_SQL = APP_CONFIG.get("path", "peers")
-async def save_peer_from_addr(addr_msg_data: tuple):
+async def open_peers_db() -> aiosqlite.Connection:
     """
-    Saves an address from `AddrMessage`
-    
-    `addr` should be as is from `AddrMessage` with 4 entries:
-        timestamp: int
-        services: int
-        ip: bytes
-        port: int
+    Opens a long-lived connection to peers.db for the address manager.
+    \nAdds the `tried` column to databases created before it existed.
     """
-    timestamp, services, ip, port = addr_msg_data
-    ip = ip_bytes_to_str(ip)
-    
-    # Insert if ip does not exist, otherwise ignore
-    async with aiosqlite.connect(PEERS_SQL) as db:
-        await db.execute(
-            """
-            INSERT INTO peers (name, ip, port, added, last_seen, services)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(ip, port) DO UPDATE SET
-                last_seen = excluded.last_seen,
-                services = excluded.services;
-            """,
-            ("Peer", ip, port, int(time.time()), timestamp, services)
-        )
-        await db.commit()
+    db = await aiosqlite.connect(PEERS_SQL)
+    async with db.execute("PRAGMA table_info(peers)") as cur:
+        columns = [row[1] for row in await cur.fetchall()]
 
+    if "tried" not in columns:
+        await db.execute("ALTER TABLE peers ADD COLUMN tried INTEGER DEFAULT 0")
+        await db.commit()
+    return db
 
-async def load_all_peers():
-    async with aiosqlite.connect(PEERS_SQL) as db:
-        async with db.execute("SELECT * FROM peers ORDER BY last_seen DESC") as cur:
-            peers = await cur.fetchall()
-            
-    return [PeerMeta(*peer) for peer in peers]
 
+async def load_all_peers(db: aiosqlite.Connection) -> list[PeerMeta]:
+    async with db.execute(
+        "SELECT id, name, ip, port, added, last_seen, services, tried FROM peers ORDER BY last_seen DESC"
+    ) as cur:
+        peers = await cur.fetchall()
 
-async def load_all_active_peers():
-    latest_last_seen = int(time.time()) - APP_CONFIG.get("node", "peer_inactive_timeout")
-    async with aiosqlite.connect(PEERS_SQL) as db:
-        async with db.execute("SELECT * FROM peers WHERE last_seen > ? ORDER BY RANDOM()", (latest_last_seen, )) as cur:
-            peers = await cur.fetchall()
-    return [PeerMeta(*peer) for peer in peers]
+    return [PeerMeta(*peer[:7], bool(peer[7])) for peer in peers]
 
 
-async def set_last_seen(ip, port, last_seen):
-    async with aiosqlite.connect(PEERS_SQL) as db:
-        await db.execute("UPDATE peers SET last_seen = ? WHERE ip = ? AND port = ?;", (last_seen, ip, port))
-        
\ No newline at end of file
+async def save_peers(db: aiosqlite.Connection, peers: list[PeerMeta], removed: list[tuple[str, int]] = []):
+    """
+    Saves a batch of `peers` in a single transaction, keeping the added time of peers which already exist.
+    \nAddresses in `removed` are deleted.
+    """
+    await db.executemany(
+        """
+        INSERT INTO peers (name, ip, port, added, last_seen, services, tried)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(ip, port) DO UPDATE SET
+            name = excluded.name,
+            last_seen = excluded.last_seen,
+            services = excluded.services,
+            tried = excluded.tried;
+        """,
+        [(p.name, p.ip, p.port, p.added, p.last_seen, p.services, int(p.tried)) for p in peers]
+    )
+    await db.executemany("DELETE FROM peers WHERE ip = ? AND port = ?;", removed)
+    await db.commit()
@@ -31,6 +31,10 @@ class KhetcoinApp:
         self.root.title(f"{self.node.name}'s Node")
         self.root.geometry("800x600")
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
+        
+        # Node events reach the frames in Tk's thread, which is woken up by the event bus instead of polling the node
+        self.root.bind("<<NodeEvents>>", lambda _: self.node.events.dispatch())
+        self.node.events.start_notifier(lambda: self.root.event_generate("<<NodeEvents>>", when="tail"))
 
         self.view_container = tk.Frame(self.root)
         self.view_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -62,9 +66,15 @@ class KhetcoinApp:
             log.warning("Node is already running.")
             return
 
-        asyncio.run_coroutine_threadsafe(self.node.run(), self.node_loop)
+        asyncio.run_coroutine_threadsafe(self._run_node(), self.node_loop)
         log.info("Node start requested.")
 
+    async def _run_node(self):
+        """Runs the node, then stops the node's event loop so that the node thread can finish."""
+        await self.node.run()
+        self.node_loop.stop()
+        log.info("Loop stopped.")
+
     def close_node(self):
         """Signals the node to shut down gracefully."""
         self.node._shutdown_requested.set()
@@ -101,6 +111,8 @@ class KhetcoinApp:
         # 1. Get / Create frame
         frame = self.frames.get(frame_name)
         if frame is None or kwargs: 
+            if frame is not None:  # Replaced, which also unsubscribes it from node events
+                frame.destroy()
             frame_class = FRAMES_CONFIG[frame_name]
             frame = frame_class(parent=self.view_container, controller=self, node=self.node, **kwargs)
             frame.grid(row=0, column=0, sticky="nsew")
@@ -125,6 +137,7 @@ class KhetcoinApp:
             return
         
         try:
+            self.root.after_idle(self.node.events.dispatch)  # Events published before the main loop started
             self.root.mainloop()
         except KeyboardInterrupt:
             log.warning("Keyboard interrupt shutdown.")
@@ -9,7 +9,21 @@ from gui.bindings import bind_hierarchical, mousewheel_cb
 from gui.common.scrollable import create_scrollable_frame
 from gui.helper import center_popup, copy_to_clipboard
 from ktc_constants import KTC
-from utils.fmt import format_bytes, truncate_bytes
+from utils.fmt import format_age, format_bytes, truncate_bytes
+
+def mempool_tx_values(tx: Transaction, tx_hash: bytes, fee: int | None, received: int, now: float) -> tuple:
+    """Row values for `MEMPOOL_TX_COLS`. `fee` is None for orphans."""
+    from_ = tx.from_()
+    to = tx.to()
+    return (
+        truncate_bytes(tx_hash),
+        from_ if isinstance(from_, str) else truncate_bytes(from_),
+        to if isinstance(to, str) else truncate_bytes(to),
+        f"{sum(tx_out.value for tx_out in tx.outputs) / KTC:.8f} KTC",
+        "N/A" if fee is None else f"{fee / KTC:.8f} KTC",
+        format_age(now - received) + " ago"
+    )
+
 
 def tx_popup(parent, tx: Transaction, type_: str):
         """
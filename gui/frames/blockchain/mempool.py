@@ -1,15 +1,17 @@
-import time
 import tkinter as tk
+from time import time as time_now
 from tkinter import ttk
 from tkinter import messagebox
 
 from blockchain.transaction import Transaction
 from gui.common.columns import MEMPOOL_TX_COLS
-from gui.common.transaction import tx_popup
+from gui.common.transaction import mempool_tx_values, tx_popup
 from gui.common.scrollable import create_scrollable_treeview
+from gui.helper import subscribe_widget
 from ktc_constants import KTC
 from networking.node import Node
-from utils.fmt import format_age, format_bytes, truncate_bytes
+from utils.events import TX_ADDED, TX_REMOVED
+from utils.fmt import format_age, format_bytes
 
 
 _frame_id = 22
@@ -58,102 +60,94 @@ class MempoolFrame(tk.Frame):
         self.lf_metadata.columnconfigure(0, weight=1, uniform="metadata")
         self.lf_metadata.columnconfigure(1, weight=1, uniform="metadata")
 
-        # 3. Initial setup
+        self.labels_metadata: dict[str, tk.Label] = dict()
+        metadata_fields = (
+            "No. txs", "Total txs Size", "No. Valid txs", "Valid txs Size", "No. Orphan txs", "Orphan txs Size",
+            "Total Fees", "Min. Fee Rate", "Usage",
+        )
+        for r, field in enumerate(metadata_fields):
+            label_field = tk.Label(self.lf_metadata, text=field)
+            label_field.grid(row=r, column=0, sticky="w", padx=5, pady=5)
+
+            label_value = tk.Label(self.lf_metadata)
+            label_value.grid(row=r, column=1, sticky="w", padx=5, pady=5)
+            self.labels_metadata[field] = label_value
+
+        # 3. Initial setup; subscribed first, so that nothing changed while filling the treeviews is missed
         self._selected_tx: Transaction | None = None
-        self._generate_valid_txs_treeview()
-        self._generate_orphan_txs_treeview()
+        self._tx_times: dict[str, int] = dict()  # iid to time received, for the age column
+        self._metadata_pending = False
+        subscribe_widget(self, self.node.events, TX_ADDED, self._on_tx_added)
+        subscribe_widget(self, self.node.events, TX_REMOVED, self._on_tx_removed)
+        self._generate_txs_treeviews()
+        self._generate_metadata()
         
         self._is_active = True
+        self._update_id = None
     
     def on_hide(self):
         self._is_active = False
         
     def on_show(self):
         self._is_active = True
-        self._update()
+        if self._update_id is None:
+            self._update()
         
-    def _generate_valid_txs_treeview(self):
-        latest_txs = self.node.mempool.get_all_valid_tx()
-        tree_valid_tx_iids = list(self.tree_valid_txs.get_children())
-
-        # Update or insert rows
-        for tx in latest_txs:
-            tx_hash = tx.hash()
-            from_ = tx.from_()
-            to = tx.to()
-            values = (
-                truncate_bytes(tx_hash),
-                from_ if isinstance(from_, str) else truncate_bytes(from_),
-                to if isinstance(to, str) else truncate_bytes(to),
-                f"{sum(tx_out.value for tx_out in tx.outputs) / KTC:.8f} KTC",
-                f"{tx.fee() / KTC:.8f} KTC",
-                format_age(time.time() - self.node.mempool.get_tx_time(tx_hash)) + " ago"
-            )
-
-            if tx_hash.hex() in tree_valid_tx_iids:
-                self.tree_valid_txs.item(tx_hash.hex(), values=values)
-                tree_valid_tx_iids.remove(tx_hash.hex())
-            else:
-                self.tree_valid_txs.insert("", "end", iid=tx_hash.hex(), values=values)
-
-        # Remove extra old rows if new list is shorter
-        for iid in tree_valid_tx_iids:
-            self.tree_valid_txs.delete(iid)
-            
-
-    def _generate_orphan_txs_treeview(self):
-        latest_txs = self.node.mempool.get_all_orphan_tx()
-        tree_orphan_tx_iids = set(self.tree_orphan_txs.get_children())
-
-        for tx in latest_txs:
-            tx_hash = tx.hash()
-            from_ = tx.from_()
-            to = tx.to()
-            values = (
-                truncate_bytes(tx_hash),
-                from_ if isinstance(from_, str) else truncate_bytes(from_),
-                to if isinstance(to, str) else truncate_bytes(to),
-                f"{sum(tx_out.value for tx_out in tx.outputs) / KTC:.8f} KTC",
-                "N/A",
-                format_age(time.time() - self.node.mempool.get_tx_time(tx_hash)) + " ago"
-            )
-
-            if tx_hash.hex() in tree_orphan_tx_iids:
-                self.tree_orphan_txs.item(tx_hash.hex(), values=values)
-                tree_orphan_tx_iids.remove(tx_hash.hex())
+    def _generate_txs_treeviews(self):
+        mempool = self.node.mempool
+        for tx_hash, tx in mempool.iter_txs():
+            if entry := mempool.get_entry(tx_hash):
+                self._on_tx_added(tx_hash, tx, False, entry.time, entry.fee, update_metadata=False)
             else:
-                self.tree_orphan_txs.insert("", "end", iid=tx_hash.hex(), values=values)
-
-        # Remove items that no longer exist
-        for iid in tree_orphan_tx_iids:
-            self.tree_orphan_txs.delete(iid)
+                self._on_tx_added(tx_hash, tx, True, mempool.get_tx_time(tx_hash), None, update_metadata=False)
+
+    def _on_tx_added(self, tx_hash: bytes, tx: Transaction, orphan: bool, time: int, fee: int | None, update_metadata=True):
+        tree = self.tree_orphan_txs if orphan else self.tree_valid_txs
+        iid = tx_hash.hex()
+        values = mempool_tx_values(tx, tx_hash, fee, time, time_now())
+        if tree.exists(iid):
+            tree.item(iid, values=values)
+        else:
+            tree.insert("", "end", iid=iid, values=values)
+        self._tx_times[iid] = time
+        if update_metadata:
+            self._schedule_metadata()
+
+    def _on_tx_removed(self, tx_hash: bytes, orphan: bool):
+        tree = self.tree_orphan_txs if orphan else self.tree_valid_txs
+        iid = tx_hash.hex()
+        if tree.exists(iid):
+            tree.delete(iid)
+        # An adopted orphan is removed from the orphans after it is added to the valid txs
+        if not (self.tree_valid_txs.exists(iid) or self.tree_orphan_txs.exists(iid)):
+            self._tx_times.pop(iid, None)
+        self._schedule_metadata()
+
+    def _schedule_metadata(self):
+        """Regenerates the metadata once after a batch of events, rather than once per event."""
+        if not self._metadata_pending:
+            self._metadata_pending = True
+            self.after_idle(self._generate_metadata)
     
     def _generate_metadata(self):
-        valid_txs = self.node.mempool.get_all_valid_tx()
-        no_valid_txs = len(valid_txs)
-        size_valid_txs = sum(len(tx.serialize()) for tx in valid_txs)
-
-        orphan_txs = self.node.mempool.get_all_orphan_tx()
-        no_orphan_txs = len(orphan_txs)
-        size_orphan_txs = sum(len(tx.serialize()) for tx in orphan_txs)
-        
+        self._metadata_pending = False
+        stats = self.node.mempool.get_stats()
 
         details = {
-            "No. txs": no_valid_txs + no_orphan_txs,
-            "Total txs Size": format_bytes(size_valid_txs + size_orphan_txs),
-            "No. Valid txs": no_valid_txs,
-            "Valid txs Size": format_bytes(size_valid_txs),
-            "No. Orphan txs": no_orphan_txs,
-            "Orphan txs Size": format_bytes(size_orphan_txs),
+            "No. txs": stats.count + stats.orphan_count,
+            "Total txs Size": format_bytes(stats.size + stats.orphan_size),
+            "No. Valid txs": stats.count,
+            "Valid txs Size": format_bytes(stats.size),
+            "No. Orphan txs": stats.orphan_count,
+            "Orphan txs Size": format_bytes(stats.orphan_size),
+            "Total Fees": f"{stats.fee / KTC:.8f} KTC",
+            "Min. Fee Rate": f"{stats.min_fee_rate} khets/KB",
+            "Usage": f"{stats.usage:.1%} of {format_bytes(stats.max_size)}",
         }
 
         # Fee, Avg Fee, highest fee, highest fee incl, etc
-        for r, (field, value) in enumerate(details.items()):
-            label_field = tk.Label(self.lf_metadata, text=field)
-            label_field.grid(row=r, column=0, sticky="w", padx=5, pady=5)
-
-            label_value = tk.Label(self.lf_metadata, text=value)
-            label_value.grid(row=r, column=1, sticky="w", padx=5, pady=5)
+        for field, value in details.items():
+            self.labels_metadata[field].config(text=value)
  
     def _on_tx_select(self, type_: str):
         if type_ == "valid":
@@ -169,28 +163,14 @@ class MempoolFrame(tk.Frame):
         tx_popup(self, tx, type_)
 
     def _update(self):
+        """Ticks the age column while shown; rows themselves are only changed by mempool events."""
         if not self._is_active:
+            self._update_id = None
             return
         
-        # Time updating
-        for iid in self.tree_valid_txs.get_children():
-            tx_hash = bytes.fromhex(iid)     
-            tx_time = self.node.mempool.get_tx_time(tx_hash)
-            self.tree_valid_txs.set(iid, "received", format_age(time.time() - tx_time))
-
-        for iid in self.tree_orphan_txs.get_children():
-            tx_hash = bytes.fromhex(iid)    
-            tx_time = self.node.mempool.get_tx_time(tx_hash)
-            self.tree_orphan_txs.set(iid, "received", format_age(time.time() - tx_time))
-
-        # Valid Transaction listening
-        if self.node.mempool.check_update_valids(_frame_id):
-            self._generate_valid_txs_treeview()
-            self._generate_metadata()
-        
-        # Orphan Transaction listening
-        if self.node.mempool.check_update_orphans(_frame_id):
-            self._generate_orphan_txs_treeview()
-            self._generate_metadata()
+        now = time_now()
+        for tree in (self.tree_valid_txs, self.tree_orphan_txs):
+            for iid in tree.get_children():
+                tree.set(iid, "received", format_age(now - self._tx_times.get(iid, now)) + " ago")
 
-        self.after(500, self._update)
\ No newline at end of file
+        self._update_id = self.after(1000, self._update)
@@ -1,6 +1,7 @@
 import math
 import logging
 import time
+from time import time as now
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
@@ -8,22 +9,19 @@ from tkinter import messagebox
 from blockchain.block import Block, calculate_block_subsidy
 from blockchain.script import P2PKH_script_pubkey
 from blockchain.transaction import Transaction, TransactionOutput
-from db.block import calculate_block_target, get_block_height_at_hash
-from db.functions import connect_block, save_block_data
-from db.height import get_blockchain_height
 from gui.colours import BTN_NEUTRAL_BLUE, BTN_STOP_RED
 from gui.fonts import MonoFont, SansFont
 from gui.common.columns import MEMPOOL_TX_COLS
 from gui.common.scrollable import create_scrollable_treeview
-from gui.common.transaction import tx_popup
+from gui.common.transaction import mempool_tx_values, tx_popup
+from gui.helper import subscribe_widget
 from gui.vcmd import register_VMCD_KTC
 from ktc_constants import KTC, MAX_KTC
-from networking.constants import BLOCK_TYPE
-from networking.messages.types.inv import InvMessage
+from mining.block_assembler import BlockTemplate
 from networking.node import Node
 from utils.config import APP_CONFIG
-from utils.fmt import format_age, format_bytes, format_hashrate, truncate_bytes
-from utils.helper import target_to_bits
+from utils.events import BLOCK_CONNECTED, TX_ADDED, TX_REMOVED
+from utils.fmt import format_age, format_bytes, format_hashrate
 
 log = logging.getLogger(__name__)
 
@@ -176,9 +174,14 @@ class MiningFrame(tk.Frame):
         # This is different from Miner.is_mining; self._mining just means the button was pressed and will mine whenever mining conditions are reached.
         self._mining = False  
         self._mining_start_t = None
+        self._tx_times: dict[str, int] = dict()  # iid to time received, for the age column
+        subscribe_widget(self, self.node.events, TX_ADDED, self._on_tx_added)
+        subscribe_widget(self, self.node.events, TX_REMOVED, self._on_tx_removed)
+        subscribe_widget(self, self.node.events, BLOCK_CONNECTED, self._on_block_connected)
         self._generate_mempool_treeview()
         
         self._is_active = True
+        self._update_id = None
         self._update()
 
     def on_hide(self):
@@ -187,35 +190,41 @@ class MiningFrame(tk.Frame):
     def on_show(self):
         self._is_active = True
         self.label_miner_tag.config(text=APP_CONFIG.get("mining", "tag"))
+        if self._update_id is None:
+            self._update()
         
         
     def _generate_mempool_treeview(self):
-        latest_txs = self.node.mempool.get_all_valid_tx()
-        tree_valid_tx_iids = list(self.tree_mempool.get_children())
+        mempool = self.node.mempool
+        for tx_hash, tx in mempool.iter_txs():
+            if entry := mempool.get_entry(tx_hash):
+                self._on_tx_added(tx_hash, tx, False, entry.time, entry.fee)
 
-        # Update or insert rows
-        for tx in latest_txs:
-            tx_hash = tx.hash()
-            from_ = tx.from_()
-            to = tx.to()
-            values = (
-                truncate_bytes(tx_hash),
-                from_ if isinstance(from_, str) else truncate_bytes(from_),
-                to if isinstance(to, str) else truncate_bytes(to),
-                f"{sum(tx_out.value for tx_out in tx.outputs) / KTC:.8f} KTC",
-                f"{tx.fee() / KTC:.8f} KTC",
-                f"{format_age(time.time() - self.node.mempool.get_tx_time(tx_hash))} ago"
-            )
-
-            if tx_hash.hex() in tree_valid_tx_iids:
-                self.tree_mempool.item(tx_hash.hex(), values=values)
-                tree_valid_tx_iids.remove(tx_hash.hex())
-            else:
-                self.tree_mempool.insert("", "end", iid=tx_hash.hex(), values=values)
+    def _on_tx_added(self, tx_hash: bytes, tx: Transaction, orphan: bool, time: int, fee: int | None):
+        if orphan:
+            return
+        iid = tx_hash.hex()
+        values = mempool_tx_values(tx, tx_hash, fee, time, now())
+        if self.tree_mempool.exists(iid):
+            self.tree_mempool.item(iid, values=values)
+        else:
+            self.tree_mempool.insert("", "end", iid=iid, values=values)
+        self._tx_times[iid] = time
 
-        # Remove extra old rows if new list is shorter
-        for iid in tree_valid_tx_iids:
+    def _on_tx_removed(self, tx_hash: bytes, orphan: bool):
+        if orphan:
+            return
+        iid = tx_hash.hex()
+        if self.tree_mempool.exists(iid):
             self.tree_mempool.delete(iid)
+        self._tx_times.pop(iid, None)
+
+    def _on_block_connected(self, block_hash: bytes, height: int):
+        # Restart mining if someone else propagates a new valid block that extends the active chain
+        if self._mining and block_hash == self.node.block_tip_index.hash and block_hash != self._last_mined_block_hash:
+            log.info(f"Miner restarted as new block {block_hash.hex()} set as block tip.")
+            self.node.miner.shutdown()
+            self._start_miner()
             
     def _on_tx_select(self, _):
         selection = self.tree_mempool.selection()
@@ -226,9 +235,6 @@ class MiningFrame(tk.Frame):
         tx = self.node.mempool.get_valid_tx(tx_hash)
         tx_popup(self, tx, "valid")
             
-    def _generate_metadata(self):
-        return
-    
     def _toggle_mining_switch(self):
         if self._mining:  # Turn OFFF
             log.info("Stop Miner clicked.")
@@ -280,57 +286,41 @@ class MiningFrame(tk.Frame):
         if self.node.miner.stop_flag.value == 0:   # already mining
             return
         
-        if block := self._generate_candidate_block():
+        if template := self._get_block_template():
             # Default: Coinbase transaction to miner only.
-            total_fee = self.node.mempool.get_total_fee()
-            reward = calculate_block_subsidy(get_blockchain_height() + 1) + total_fee
             cb_outputs = [
-                TransactionOutput(reward, P2PKH_script_pubkey(self.node.pk_hash))
+                TransactionOutput(template.coinbase_value, P2PKH_script_pubkey(self.node.pk_hash))
             ]
-            self.node.miner.mine(block, cb_outputs)
+            self.node.miner.mine(template.create_block(), cb_outputs)
             
             self._remove_highlights()
-            self._highlight_mempool([tx.hash() for tx in block.get_transactions()])
+            self._highlight_mempool({entry.tx_hash for entry in template.entries})
         else:
             messagebox.showerror("Error", "Something went wrong when generating a candidate block for mining :(")
         
-    def _generate_candidate_block(self) -> Block | None:
-        tip_index = self.node.block_tip_index
-        txs = self.node.mempool.get_all_valid_tx(explicit_sort=True)
-        height = get_block_height_at_hash(tip_index.hash) + 1
+    def _get_block_template(self) -> BlockTemplate | None:
         try:
-            block = Block(
-                version=1,
-                prev_block=tip_index.hash,
-                timestamp=int(time.time()),
-                bits=target_to_bits(calculate_block_target(height, tip_index.prev_hash)),
-                nonce=0,
-                txs=txs
-            )
+            return self.node.block_assembler.get_template_threadsafe()
         except Exception as e:
             log.error(f"Failed to create candidate block: {e}")
             return None
         
-        return block
-        
     def _process_mined_block(self, block: Block):
         self._remove_highlights()
         
-        # 0. Verify block guard
-        if not block.verify():
+        # 1. Verify, save and connect the block in the node's event loop
+        try:
+            connected = self.node.process_block_threadsafe(block)
+        except Exception as e:
+            log.error(f"Failed to process mined block: {e}")
+            connected = False
+        if not connected:
             messagebox.showerror("Miner Error", "Something wrong happened with the miner")
             return
         
-        # 1. Save block
-        save_block_data(block)
-        connect_block(block, self.node)
-        
         self._last_mined_block_hash = block.hash()
  
-        # 2. Broadcast block
-        inventory = [(BLOCK_TYPE, block.hash())]
-        inv_msg = InvMessage(inventory)
-        self.node.broadcast(inv_msg)
+        # 2. Block is broadcasted by connect_block
         if self.var_notification.get():
             messagebox.showinfo("Block mined", f"Your have mined block no. {block.get_height()}")
         
@@ -357,46 +347,30 @@ class MiningFrame(tk.Frame):
     def _update(self):
         if self._is_active:
             # 1. Update Mempool Summary
-            no_txs = self.node.mempool.get_no_tx()
-            total_size = self.node.mempool.get_total_size()
-            total_fee = self.node.mempool.get_total_fee()
-            if no_txs != 0:
-                avg_size = total_size / no_txs
-                avg_fee = total_fee / no_txs
-            else:
-                avg_fee = avg_size = 0
-            
-            self.label_no_tx.config(text=f"No. Transactions: {no_txs}")
-            self.label_tx_size.config(text=f"Total Size: {format_bytes(total_size)} (average {format_bytes(avg_size)})")
-            self.label_tx_fee.config(text=f"Total Fee: {total_fee/KTC:.8f}KTC (average {avg_fee/KTC:.8f}KTC)")
-            reward = calculate_block_subsidy(get_blockchain_height() + 1) + total_fee
+            stats = self.node.mempool.get_stats()
+            self.label_no_tx.config(text=f"No. Transactions: {stats.count}")
+            self.label_tx_size.config(text=f"Total Size: {format_bytes(stats.size)} (average {format_bytes(stats.avg_size)})")
+            self.label_tx_fee.config(text=f"Total Fee: {stats.fee/KTC:.8f}KTC (average {stats.avg_fee/KTC:.8f}KTC)")
+            reward = calculate_block_subsidy(self.node.block_tip_index.height + 1) + stats.fee
             self.label_mining_reward.config(text=f"Mining Reward: {reward/KTC:.8f}KTC")
             
-            # 2. Age updates
+            # 2. Age updates; rows themselves are only changed by mempool events
+            t_now = now()
             for iid in self.tree_mempool.get_children():
-                tx_hash = bytes.fromhex(iid)     
-                tx_time = self.node.mempool.get_tx_time(tx_hash)
-                self.tree_mempool.set(iid, "received", format_age(time.time() - tx_time))
-            
-            # 3. Check mempool for any updates
-            if self.node.mempool.check_update_valids(_frame_id):
-                self._generate_mempool_treeview()
-                self._generate_metadata()
+                self.tree_mempool.set(iid, "received", format_age(t_now - self._tx_times.get(iid, t_now)) + " ago")
             
-            # 4. Mining updates
+            # 3. Mining updates
             self.label_hash_rate.config(text=format_hashrate(self.node.miner.get_hashrate()))
         
         # Allow mining in background
         if self._mining:
-            if self.node.check_updated_blockchain(_frame_id):  # Restart mining if someone else propagates a new valid block that extends the active chain
-                if self.node.block_tip_index.hash != self._last_mined_block_hash:
-                    log.info(f"Miner restarted as new block {self.node.block_tip_index.hash} set as block tip.")
-                    self.node.miner.shutdown()
-                    self._start_miner()
-                
             self._poll_miner()
             
-        self.after(500, self._update)
+        # Nothing to do while hidden and not mining
+        if self._is_active or self._mining:
+            self._update_id = self.after(500, self._update)
+        else:
+            self._update_id = None
     
     def _show_more_info(self):
         info_msg = """Mining in Khetcoin is the process of varying the candidate block's nonce and its coinbase transaction's script_sig until the block's 32-byte hash falls below the target value.
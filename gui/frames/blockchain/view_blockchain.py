@@ -15,9 +15,10 @@ from gui.bindings import bind_entry_prompt, bind_hierarchical, mousewheel_cb
 from gui.common.columns import BLOCK_LIST_COLS, TX_LIST_COLS
 from gui.common.transaction import script_popup
 from gui.common.scrollable import create_scrollable_frame, create_scrollable_treeview
-from gui.helper import reset_widget, attach_tooltip, copy_to_clipboard
+from gui.helper import reset_widget, attach_tooltip, copy_to_clipboard, subscribe_widget
 from ktc_constants import KTC
 from networking.node import Node
+from utils.events import BLOCK_CONNECTED, BLOCK_DISCONNECTED
 from utils.fmt import format_age, format_bytes, format_epoch, format_number, format_snake_case, truncate_bytes
 
 # TODO: Implement sort by ascending/descending for each column in block view
@@ -143,6 +144,12 @@ class ViewBlockchainFrame(tk.Frame):
         # Age field: (label, created)
         self._block_age_field = None
         self._tx_age_field = None
+        self._block_times: dict[str, int] = dict()  # Block list iid to block timestamp
+
+        # Block list refreshed after the blockchain changed, once per batch of blocks
+        self._blocks_changed = False
+        subscribe_widget(self, self.node.events, BLOCK_CONNECTED, self._on_blockchain_changed)
+        subscribe_widget(self, self.node.events, BLOCK_DISCONNECTED, self._on_blockchain_changed)
 
         # 6. Page initialization
         self._init_from = kwargs.get("init_from", None)
@@ -152,13 +159,34 @@ class ViewBlockchainFrame(tk.Frame):
             self._switch_to_block_list()
 
         self._is_active = True
+        self._update_id = None
     
     def on_hide(self):
         self._is_active = False
         
     def on_show(self):
         self._is_active = True
-        self._update()
+        if self._blocks_changed:
+            self._refresh_block_list()
+        if self._update_id is None:
+            self._update()
+
+    def _on_blockchain_changed(self, **_):
+        if not self._blocks_changed:
+            self._blocks_changed = True
+            if self._is_active:
+                self.after_idle(self._refresh_block_list)
+
+    def _refresh_block_list(self):
+        self._blocks_changed = False
+        self.no_block_rows = self.node.block_tip_index.height + 1
+        self.no_block_pages = ceil(self.no_block_rows / self.rows_per_page)
+        self.spinbox_block.config(to=self.no_block_pages)
+        self.label_max_block_page.config(text=f"of {self.no_block_pages}")
+
+        # Auto refresh block list view when a new block is added
+        if self._current_page == "block_list":
+            self._page_select_block()
 
     def _switch_to_block_list(self):
         self._current_page = "block_list"
@@ -245,6 +273,7 @@ class ViewBlockchainFrame(tk.Frame):
 
         # Refresh the block list first
         self.tree_block_list.delete(*self.tree_block_list.get_children())
+        self._block_times.clear()
         
         for depth in range(start_row, end_row):
             height = self.no_block_rows - depth - 1
@@ -265,6 +294,7 @@ class ViewBlockchainFrame(tk.Frame):
             )
 
             self.tree_block_list.insert("", "end", iid=height, values=values)
+            self._block_times[str(height)] = meta.timestamp
 
     def _page_select_tx(self, *_):
         page = int(self.tx_page.get())
@@ -632,28 +662,15 @@ class ViewBlockchainFrame(tk.Frame):
         btn_return.pack(anchor="se", padx=5, pady=5)
 
     def _update(self):
+        """Ticks the ages while shown; the block list itself is only changed by blockchain events."""
         if not self._is_active:
+            self._update_id = None
             return
-        
-        if self.node.check_updated_blockchain(_frame_id):
-            self.no_block_rows = self.node.block_tip_index.height + 1
-            self.no_block_pages = ceil(self.no_block_rows / self.rows_per_page)
-            self.spinbox_block.config(to=self.no_block_pages)
-            self.label_max_block_page.config(text=f"of {self.no_block_pages}")
-
-            # Auto refresh block list view when a new block is added
-            if self._current_page == "block_list":
-                self._page_select_block()
-
 
         if self._current_page == "block_list":
             for iid in self.tree_block_list.get_children():
-                height = int(self.tree_block_list.set(iid, "height"))
-                meta = get_block_metadata_at_height(height)
-                if meta is None:
-                    continue
-
-                self.tree_block_list.set(iid, "age", format_age(time.time() - meta.timestamp))
+                if (timestamp := self._block_times.get(iid)) is not None:
+                    self.tree_block_list.set(iid, "age", format_age(time.time() - timestamp))
 
         elif self._current_page == "block_details":
             label, created = self._block_age_field
@@ -667,5 +684,5 @@ class ViewBlockchainFrame(tk.Frame):
             pass
 
 
-        self.after(500, self._update)
+        self._update_id = self.after(500, self._update)
         
\ No newline at end of file
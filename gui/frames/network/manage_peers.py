@@ -1,5 +1,4 @@
 import logging
-import sqlite3
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox
@@ -9,14 +8,13 @@ from db.height import get_blockchain_height
 from gui.bindings import bind_hierarchical, mousewheel_cb
 
 from gui.common.scrollable import create_scrollable_frame, create_scrollable_treeview
-from gui.helper import center_popup
+from gui.helper import center_popup, subscribe_widget
 from networking.node import Node
 
-from utils.config import APP_CONFIG
+from utils.events import PEER_CONNECTED, PEER_DISCONNECTED
 from utils.fmt import format_age, format_bytes, services_to_str
 
 log = logging.getLogger(__name__)
-PEERS_SQL = APP_CONFIG.get("path", "peers")
 
 _frame_id = 42
 
@@ -93,8 +91,9 @@ class ManagePeersFrame(tk.Frame):
             "Services", "Version", "Transaction Relay", "Current Block", "Synced Blocks",
             "Connection Time",
             "Last Block", "Last Transaction", "Last Send", "Last Receive",
-            "Sent", "Received",
-            "Ping Time", "Min Ping", "Last Ping", "Avg. Ping", "Time Offset"
+            "Sent", "Received", "Compression", "Saved (Sent)", "Saved (Received)",
+            "Ping Time", "Min Ping", "Last Ping", "Avg. Ping", "Time Offset",
+            "Block Latency", "Receive Rate", "Invalid Data", "Score"
         ]
 
         for i, field_name in enumerate(detail_fields):
@@ -114,44 +113,53 @@ class ManagePeersFrame(tk.Frame):
         bind_hierarchical("<MouseWheel>", self.lf_details, lambda e: mousewheel_cb(e, cnv_details))
         
         # 3. Initital setup
+        subscribe_widget(self, self.node.events, PEER_CONNECTED, self._on_peer_connected)
+        subscribe_widget(self, self.node.events, PEER_DISCONNECTED, self._on_peer_disconnected)
         self._generate_peer_list_treeview()
         self._hide_peer_details()
         
         self._is_active = True
+        self._update_id = None
     
     def on_hide(self):
         self._is_active = False
         
     def on_show(self):
         self._is_active = True
-        self._update()
+        if self._update_id is None:
+            self._update()
         
     def _generate_peer_list_treeview(self):
-        latest_peers = list(self.node.peers)
-        tree_peers_iids = set(self.tree_peers.get_children())
-
-        # 1. Add or update peers
-        for peer in latest_peers:
-            values = (
-                peer.name or "N/A",
-                peer.str_ip,
-                peer.user_agent.decode(),
-                peer.direction.title(),
-                format_age(int(time.time() )- peer.time_created),
-                peer.latest_ping_time_ms or "N/A",
-            )
-            
-            if str(peer.session_id) in tree_peers_iids:
-                self.tree_peers.item(peer.session_id, values=values)
-                tree_peers_iids.remove(str(peer.session_id))
-            else:
-                self.tree_peers.insert("", "end", iid=peer.session_id, values=values)
+        for peer in list(self.node.peers):
+            self._on_peer_connected(peer.session_id)
+
+    def _on_peer_connected(self, peer_id: int):
+        peer = self.node.get_peer_by_id(peer_id)
+        if peer is None:
+            return
+        values = (
+            peer.name or "N/A",
+            peer.str_ip,
+            peer.user_agent.decode(),
+            peer.direction.title(),
+            format_age(int(time.time() )- peer.time_created),
+            peer.latest_ping_time_ms or "N/A",
+        )
         
-        for iid in tree_peers_iids:
-            self.tree_peers.delete(iid)
-            
-        # 2. Misc updates
-        self.label_connected_peers.config(text=f"Connected Peers: {len(latest_peers)}")
+        if self.tree_peers.exists(peer_id):
+            self.tree_peers.item(peer_id, values=values)
+        else:
+            self.tree_peers.insert("", "end", iid=peer_id, values=values)
+        self.label_connected_peers.config(text=f"Connected Peers: {len(self.tree_peers.get_children())}")
+
+    def _on_peer_disconnected(self, peer_id: int):
+        if self.tree_peers.exists(peer_id):
+            self.tree_peers.delete(peer_id)
+        self.label_connected_peers.config(text=f"Connected Peers: {len(self.tree_peers.get_children())}")
+        
+        if peer_id == self.selected_peer_id:
+            self.lf_details.config(text=self.lf_details.cget('text') + " (Disconnected)")
+            self.selected_peer = self.selected_peer_id = None
     
     def _on_peer_select(self, _):
         selection = self.tree_peers.selection() #
@@ -199,11 +207,18 @@ class ManagePeersFrame(tk.Frame):
             "Last Receive": format_age(peer.last_recv_ago) if peer.last_recv_timestamp != 0 else "Never",
             "Sent": format_bytes(peer.bytes_sent),
             "Received": format_bytes(peer.bytes_recv),
+            "Compression": "Yes" if peer.compression else "No",
+            "Saved (Sent)": format_bytes(max(peer.bytes_saved_sent, 0)),
+            "Saved (Received)": format_bytes(max(peer.bytes_saved_recv, 0)),
             "Ping Time": f"{peer.latest_ping_time_ms} ms",
-            "Min Ping": "N/A" if not peer.ping_times else f"{min(peer.ping_times)}ms",
-            "Last Ping": "N/A" if not peer.ping_times else f"{peer.ping_times[-1]}ms",
-            "Avg. Ping": "N/A" if not peer.ping_times else f"{round(sum(peer.ping_times)/len(peer.ping_times))}ms",
+            "Min Ping": "N/A" if not peer.stats.ping_times else f"{min(peer.stats.ping_times)}ms",
+            "Last Ping": "N/A" if not peer.stats.ping_times else f"{peer.stats.ping_times[-1]}ms",
+            "Avg. Ping": "N/A" if not peer.stats.ping_times else f"{round(sum(peer.stats.ping_times)/len(peer.stats.ping_times))}ms",
             "Time Offset": f"{peer.time_offset}s",
+            "Block Latency": "N/A" if peer.stats.mean_block_latency is None else f"{peer.stats.mean_block_latency:.2f}s",
+            "Receive Rate": f"{format_bytes(int(peer.stats.mean_recv_rate))}/s",
+            "Invalid Data": str(peer.stats.invalid_count),
+            "Score": f"{peer.stats.score():.2f}",
         }
 
         for field_name, label_widget in self.labels_peer_details.items():
@@ -244,28 +259,19 @@ class ManagePeersFrame(tk.Frame):
         if not name:
             messagebox.showwarning("Failed to save peer", "Name cannot be empty!")
         else:
-            with sqlite3.connect(PEERS_SQL) as con:
-                cur = con.cursor()
-                
-                cur.execute("SELECT id FROM peers WHERE ip = ? AND port = ?", (ip, port))
-                if cur.fetchone():
-                    messagebox.showwarning("Duplicate Entry", f"Peer with IP Address {ip}:{port} already saved.")
-                    return
-                
-                added = int(time.time())
-                cur.execute("""
-                    INSERT INTO peers (name, ip, port, added)
-                    VALUES (?, ?, ?, ?)
-                """, (name, ip, port, added))
+            info = self.node.addrman.entries.get((ip, port))
+            if info and info.name != "Peer":
+                messagebox.showwarning("Duplicate Entry", f"Peer with IP Address {ip}:{port} already saved.")
+                return
             
-                con.commit()
-                cur.execute("SELECT id FROM peers WHERE ip = ? and port = ?", (ip, port))
-
+            self.node.save_address(ip, port, name)
             win.destroy()
             messagebox.showinfo(title="Peer saved", message=f"Saved \"{name}\" to your peers.")
     
     def _update(self):
+        """Ticks the connection times and peer details while shown; the peer list itself is only changed by peer events."""
         if not self._is_active:
+            self._update_id = None
             return 
         
         # Time updating
@@ -273,16 +279,9 @@ class ManagePeersFrame(tk.Frame):
             peer = self.node.get_peer_by_id(int(iid))
             if peer:
                 self.tree_peers.set(iid, "connection_time", format_age(int(time.time() )- peer.time_created))
-                
-        # Peer list updating
-        if self.node.check_updated_peers(_frame_id):
-            self._generate_peer_list_treeview()
-            if self.node.get_peer_by_id(self.selected_peer_id) is None:  # Selected peer disconnected
-                self.lf_details.config(text=self.lf_details.cget('text') + " (Disconnected)")
-                self.selected_peer = self.selected_peer_id = None
             
         # Peer details updating
         if self.lf_details.winfo_ismapped():
             self._config_peer_details()
 
-        self.after(500, self._update)
+        self._update_id = self.after(500, self._update)
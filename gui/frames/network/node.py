@@ -88,6 +88,11 @@ class NodeFrame(tk.Frame):
         tk.Label(frame_right, text="Services:", anchor="w").grid(row=5, column=0, sticky="w", padx=5, pady=2)
         self.label_services = tk.Label(frame_right, text=services_to_str(SERVICES), anchor="w", padx=5)
         self.label_services.grid(row=5, column=1, sticky="w", padx=5, pady=2)
+        
+        # Recent block cache
+        tk.Label(frame_right, text="Block cache hits:", anchor="w").grid(row=6, column=0, sticky="w", padx=5, pady=2)
+        self.label_block_cache = tk.Label(frame_right, text="0 / 0", anchor="w", padx=5)
+        self.label_block_cache.grid(row=6, column=1, sticky="w", padx=5, pady=2)
 
 
         # Start periodic updates
@@ -127,6 +132,8 @@ class NodeFrame(tk.Frame):
         self.label_peers.configure(text=str(len(self.node.peers)))
         self.label_data_sent.configure(text=format_bytes(self.node.bytes_sent))
         self.label_data_received.configure(text=format_bytes(self.node.bytes_recv))
+        cache = self.node.block_cache
+        self.label_block_cache.configure(text=f"{cache.hits} / {cache.hits + cache.misses} ({cache.hit_rate:.0%})")
 
             
 
@@ -4,15 +4,10 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 
-import sqlite3
-
 from gui.common.scrollable import create_scrollable_treeview
 from gui.helper import center_popup, copy_to_clipboard
-from utils.config import APP_CONFIG
 from utils.fmt import format_age, format_epoch
 
-PEERS_SQL = APP_CONFIG.get("path", "peers")
-
 _frame_id = 43
 
 
@@ -117,20 +112,24 @@ class SavedPeersFrame(tk.Frame):
         self._update()
 
     def _load_peers(self):
-        # Synchronous code for loading peers
-        with sqlite3.connect(PEERS_SQL) as con:
-            cur = con.cursor()
-            cur.execute("SELECT * FROM peers")
-            rows = cur.fetchall()
-            return {row[0]: 
-                {
-                    "name": row[1],
-                    "ip": row[2],
-                    "port": row[3],
-                    "added": row[4],
-                    "last_seen": row[5]
-                } 
-            for row in rows}
+        # Read from the node's address manager, which peers.db is only a snapshot of
+        return {self._peer_iid(info.ip, info.port): 
+            {
+                "name": info.name,
+                "ip": info.ip,
+                "port": info.port,
+                "added": info.added,
+                "last_seen": info.last_seen
+            } 
+        for info in list(self.node.addrman.entries.values())}
+
+    @staticmethod
+    def _peer_iid(ip: str, port: int) -> str:
+        return f"{ip}/{port}"
+
+    def _is_saved(self, ip: str, port: int) -> bool:
+        info = self.node.addrman.entries.get((ip, port))
+        return info is not None and info.name != "Peer"
         
     def _generate_peers_treeview(self):
         for item in self.tree_peers.get_children():
@@ -163,7 +162,7 @@ class SavedPeersFrame(tk.Frame):
         if not selection:
             return
         
-        self._selected_iid = int(selection[0])
+        self._selected_iid = selection[0]
         self._selected_peer = self.peers[self._selected_iid]
         
         if not self.lf_peer_info.winfo_ismapped():
@@ -212,10 +211,10 @@ class SavedPeersFrame(tk.Frame):
     
     def _save_edit(self, field: str, entry: tk.Entry):
         value = entry.get().strip()
+        peer = self._selected_peer
         if field == "name":
             self.label_name.config(text=value)
             self.lf_peer_info.config(text=value)
-            cmd = "UPDATE peers SET name = ? WHERE id = ?"
         elif field == "ip":
             try:
                 ipaddress.ip_address(value)
@@ -223,7 +222,6 @@ class SavedPeersFrame(tk.Frame):
                 messagebox.showwarning("Failed to edit IP address", f"{value} is not a valid IP address.")
                 return
             self.label_ip.config(text=value)
-            cmd = "UPDATE peers SET ip = ? WHERE id = ?"
         elif field == "port":
             try:
                 value = int(value)
@@ -234,13 +232,29 @@ class SavedPeersFrame(tk.Frame):
                 messagebox.showwarning("Failed to edit port", "Network port must be a number!")
                 return
             self.label_port.config(text=value)
-            cmd = "UPDATE peers SET port = ? WHERE id = ?"
-                        
-        self.peers[self._selected_iid][field] = value
-        with sqlite3.connect(PEERS_SQL) as con:
-            cur = con.cursor()
-            cur.execute(cmd, (value, self._selected_iid))
-        self.tree_peers.set(self._selected_iid, field, value)
+
+        if field == "name":
+            self.node.save_address(peer["ip"], peer["port"], value)
+            peer["name"] = value
+            self.tree_peers.set(self._selected_iid, field, value)
+            return
+
+        # A new IP address or port is a different address, which replaces the old one
+        ip, port = (value, peer["port"]) if field == "ip" else (peer["ip"], value)
+        if (ip, port) == (peer["ip"], peer["port"]):
+            return
+        if self._is_saved(ip, port):
+            messagebox.showwarning("Duplicate Entry", f"Peer with IP Address {ip}:{port} already saved.")
+            return
+        self.node.remove_address(peer["ip"], peer["port"])
+        self.node.save_address(ip, port, peer["name"])
+
+        self.peers.pop(self._selected_iid)
+        peer[field] = value
+        self._selected_iid = self._peer_iid(ip, port)
+        self.peers[self._selected_iid] = peer
+        self._generate_peers_treeview()
+        self.tree_peers.selection_set(self._selected_iid)
         
     def _sort_addrs(self, *_):
         self._generate_peers_treeview()
@@ -301,30 +315,18 @@ class SavedPeersFrame(tk.Frame):
                 messagebox.showwarning("Failed to save peer", "Invalid IP address!")
                 return
             
-            with sqlite3.connect(PEERS_SQL) as con:
-                cur = con.cursor()
-                
-                cur.execute("SELECT id FROM peers WHERE ip = ? AND port = ?", (ip, port))
-                if cur.fetchone():
-                    messagebox.showwarning("Duplicate Entry", f"Peer with IP Address {ip}:{port} already saved.")
-                    return
-                
-                added = int(time.time())
-                cur.execute("""
-                    INSERT INTO peers (name, ip, port, added, last_seen, services)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (name, ip, port, added, int(time.time()), 0))
+            if self._is_saved(ip, port):
+                messagebox.showwarning("Duplicate Entry", f"Peer with IP Address {ip}:{port} already saved.")
+                return
             
-                con.commit()
-                cur.execute("SELECT id FROM peers WHERE ip = ? and port = ?", (ip, port))
-                iid = int(cur.fetchone()[0])
-                
-            self.peers[iid] = {
+            self.node.save_address(ip, port, name)
+            known = self.peers.get(self._peer_iid(ip, port))
+            self.peers[self._peer_iid(ip, port)] = {
                 "name": name,
                 "ip": ip,
                 "port": port,
-                "last_seen": 0,
-                "added": added
+                "last_seen": int(time.time()),
+                "added": known["added"] if known else int(time.time())
             }
             
             self._generate_peers_treeview()
@@ -335,10 +337,8 @@ class SavedPeersFrame(tk.Frame):
         iid = self._selected_iid
         name = self.peers[iid]['name']
         if messagebox.askokcancel(title="Confirm deletion", message=f"Are you sure you want to remove \"{name}\" from your peers?"):
-            with sqlite3.connect(PEERS_SQL) as con:
-                cur = con.cursor()
-                cur.execute("DELETE FROM peers WHERE id = ?", (iid,))
-            self.peers.pop(iid)
+            peer = self.peers.pop(iid)
+            self.node.remove_address(peer["ip"], peer["port"])
             self.tree_peers.delete(iid)
             messagebox.showinfo(title="Peer removed", message=f"\"{name}\" removed from peers.")
             self._hide_peer_info()
@@ -350,7 +350,7 @@ class SavedPeersFrame(tk.Frame):
             return
         
         for iid in self.tree_peers.get_children():
-            age = format_age(int(time.time()) - self.peers[int(iid)]["added"]) + " ago"
+            age = format_age(int(time.time()) - self.peers[iid]["added"]) + " ago"
             self.tree_peers.set(iid, "added", age)
         
         self.after(500, self._update)
@@ -14,13 +14,14 @@ from gui.bindings import bind_entry_prompt
 from gui.common.scrollable import create_scrollable_frame, create_scrollable_treeview
 from gui.common.transaction import tx_popup
 from gui.vcmd import register_VCMD_INT, register_VMCD_KTC
-from gui.helper import center_popup
+from gui.helper import center_popup, subscribe_widget
 from ktc_constants import KTC, MAX_KHETS
-from networking.messages.types.inv import InvMessage
+from mining.constants import FEE_ESTIMATE_MAX_TARGET
 from networking.node import Node
 from utils.config import APP_CONFIG
+from utils.events import BLOCK_CONNECTED, BLOCK_DISCONNECTED, TX_ADDED, TX_REMOVED
 from utils.helper import encode_varint
-from wallet.algorithm import get_recommended_fee_rate, select_utxos
+from wallet.algorithm import select_utxos
 
 log = logging.getLogger(__name__)
 ADDRESSES_SQL = APP_CONFIG.get("path", "addresses")
@@ -38,7 +39,7 @@ class PayFrame(tk.Frame):
         self.columnconfigure(0, weight=1)
         
         self.utxo_set_to_node = get_utxo_set_to_addr(self.node.pk_hash)
-        self.avail_utxo_set_to_node = (self.utxo_set_to_node - self.node.mempool.spent_mempool_utxos) | self.node.mempool.new_mempool_utxos_to_node
+        self.avail_utxo_set_to_node = self.node.mempool.get_available_utxos(self.utxo_set_to_node)
         
         # 0. Spinbox value input validator commands
         self.vcmd_khets = register_VCMD_INT(self)
@@ -62,14 +63,14 @@ class PayFrame(tk.Frame):
 
         self.rb_fee_recommended = tk.Radiobutton(self.frame_fee, text="Recommended", variable=self.fee_choice_var, value="recommended", command=self._toggle_fee_widgets_state)
         self.rb_fee_recommended.grid(row=0, column=0, sticky="w", padx=5, pady=2)
-        self.fee_recommended = get_recommended_fee_rate(node.mempool.get_all_valid_tx(), 6)
+        self.fee_recommended = self._get_recommended_fee_rate(6)
         self.label_fee_recommended_value = tk.Label(self.frame_fee, text=f"{self.fee_recommended} khets/KB")
         self.label_fee_recommended_value.grid(row=0, column=1, sticky="w", padx=5, pady=2)
         self.var_wait_blocks = tk.IntVar(value=6)
         self.var_wait_blocks.trace_add("write", self._update_recommended_fee)
         self.label_wait_blocks = tk.Label(self.frame_fee, text=f"Expected blocks until inclusion:")
         self.label_wait_blocks.grid(row=0, column=2, sticky="w", padx=5, pady=2)
-        self.spinbox_wait_blocks = tk.Spinbox(self.frame_fee, from_=1, to=1000, increment=1, textvariable=self.var_wait_blocks)
+        self.spinbox_wait_blocks = tk.Spinbox(self.frame_fee, from_=1, to=FEE_ESTIMATE_MAX_TARGET, increment=1, textvariable=self.var_wait_blocks)
         self.spinbox_wait_blocks.grid(row=0, column=3, sticky="w", padx=5, pady=5)
         
         self.rb_fee_custom = tk.Radiobutton(self.frame_fee, text="Custom", variable=self.fee_choice_var, value="custom", command=self._toggle_fee_widgets_state)
@@ -108,6 +109,11 @@ class PayFrame(tk.Frame):
         
         # For quick address lookup
         self._contacts = []
+        
+        # Refreshed when shown after the mempool or blockchain changed
+        self._stale = True
+        for name in (TX_ADDED, TX_REMOVED, BLOCK_CONNECTED, BLOCK_DISCONNECTED):
+            subscribe_widget(self, self.node.events, name, self._on_utxos_changed)
         self._is_active = True
     
     def on_hide(self):
@@ -115,7 +121,14 @@ class PayFrame(tk.Frame):
         
     def on_show(self):
         self._is_active = True
-        self._update()
+        if self._stale:
+            self._update()
+        
+    def _on_utxos_changed(self, **_):
+        if not self._stale:
+            self._stale = True
+            if self._is_active:
+                self.after_idle(self._update)
         
         with sqlite3.connect(ADDRESSES_SQL) as con:
             cur = con.cursor()
@@ -180,8 +193,15 @@ class PayFrame(tk.Frame):
 
     def _update_recommended_fee(self, *_):
         wait_blocks = self.var_wait_blocks.get()
-        self.fee_recommended = get_recommended_fee_rate(self.node.mempool.get_all_valid_tx(), wait_blocks)
+        self.fee_recommended = self._get_recommended_fee_rate(wait_blocks)
         self.label_fee_recommended_value.config(text=f"{self.fee_recommended} khets/KB")
+    
+    def _get_recommended_fee_rate(self, wait_blocks: int) -> int:
+        """
+        Returns fee in khet/KB to be mined within `wait_blocks` blocks, as learned from past blocks by the fee estimator.
+        Never below what the mempool currently accepts, which is also the fallback until enough blocks were seen.
+        """
+        return max(self.node.fee_estimator.estimate_fee_rate(wait_blocks) or 0, self.node.mempool.get_min_fee_rate())
         
     def _toggle_fee_widgets_state(self):
         choice = self.fee_choice_var.get()
@@ -226,12 +246,12 @@ class PayFrame(tk.Frame):
     def _get_fee_rate(self):
         """
         Returns fee rate in khet/B for calculation purposes
-        `Recommended`: returns based on reference to mempool
+        `Recommended`: returns based on the fee estimate for the expected blocks until inclusion
         `Custom`: self-explanatory
         """
         choice = self.fee_choice_var.get()
         if choice == "recommended":
-            return get_recommended_fee_rate(self.node.mempool.get_all_valid_tx()) / 1024
+            return self.fee_recommended / 1024
         else:
             fee = self.var_fee_custom.get()
             if self.var_fee_unit.get() == "KTC":
@@ -392,17 +412,20 @@ class PayFrame(tk.Frame):
             return None
     
     def _send_tx(self):
-        # 1. InvMessage creation
-        if len(self.node.peers) > 0:
-            self.node.broadcast(InvMessage([(1, self._selected_tx.hash())]))
-        else:
+        # 1. Peer check; the mempool announces the transaction to peers once added
+        if not self.node.peers:
             if not messagebox.askokcancel("No Peers", "Your node is not connected to any peers. Continuing will add the transaction only to your mempool. Proceed anyways?"):
                 return
                 
 
-        # 2. tx broadcasting and storage
-        if not self.node.mempool.add_tx(self._selected_tx):
-            messagebox.showwarning("Failed to add transaction to mempool", f"See {APP_CONFIG.get('path', 'log')} for more info.")
+        # 2. tx broadcasting and storage, in the node's event loop
+        try:
+            reason = self.node.add_tx_threadsafe(self._selected_tx)
+        except Exception as e:
+            log.error(f"Failed to add transaction to mempool: {e}")
+            reason = "the node did not respond"
+        if reason:
+            messagebox.showwarning("Failed to add transaction to mempool", f"Rejected: {reason}. See {APP_CONFIG.get('path', 'log')} for more info.")
         else:
             # 3. GUI notification
             messagebox.showinfo(title="Transaction Created!", message="Your transaction has been broadcasted.")
@@ -456,14 +479,10 @@ class PayFrame(tk.Frame):
         entry_addr.insert(0, self._contacts[iid][1])
     
     def _update(self):
-        if not self._is_active:
-            return
-        
-        if self.node.mempool.check_update_mempool(_frame_id):
-            self.utxo_set_to_node = get_utxo_set_to_addr(self.node.pk_hash)
-            self.avail_utxo_set_to_node = (self.utxo_set_to_node - self.node.mempool.spent_mempool_utxos) | self.node.mempool.new_mempool_utxos_to_node
-            
-            avail_balance = sum(utxo.value for utxo in self.avail_utxo_set_to_node)
-            self.label_avail_balance.config(text=f"{avail_balance/KTC:.8f}KTC")
+        self._stale = False
+        self.utxo_set_to_node = get_utxo_set_to_addr(self.node.pk_hash)
+        self.avail_utxo_set_to_node = self.node.mempool.get_available_utxos(self.utxo_set_to_node)
+        self._update_recommended_fee()
         
-        self.after(500, self._update)
\ No newline at end of file
+        avail_balance = sum(utxo.value for utxo in self.avail_utxo_set_to_node)
+        self.label_avail_balance.config(text=f"{avail_balance/KTC:.8f}KTC")
\ No newline at end of file
@@ -7,9 +7,10 @@ from db.tx_history import get_tx_history
 from gui.bindings import bind_hierarchical, mousewheel_cb
 from gui.common.scrollable import create_scrollable_frame
 from gui.fonts import MonoFont, SansFont
-from gui.helper import add_hover_effect, reset_widget
+from gui.helper import add_hover_effect, reset_widget, subscribe_widget
 from ktc_constants import KTC
 from networking.node import Node
+from utils.events import BLOCK_CONNECTED, BLOCK_DISCONNECTED
 from utils.fmt import truncate_bytes
 
 
@@ -39,6 +40,11 @@ class TransactionHistoryFrame(tk.Frame):
         self.frame_history, self.cnv_history = create_scrollable_frame(frame_main, xscroll=False)
         self.frame_history.columnconfigure(0, weight=1)
         
+        # Refreshed when shown after the blockchain changed
+        self._stale = True
+        for name in (BLOCK_CONNECTED, BLOCK_DISCONNECTED):
+            subscribe_widget(self, self.node.events, name, self._on_blockchain_changed)
+        
         self._is_active = True
     
     def on_hide(self):
@@ -46,7 +52,14 @@ class TransactionHistoryFrame(tk.Frame):
         
     def on_show(self):
         self._is_active = True
-        self._update()
+        if self._stale:
+            self._update()
+        
+    def _on_blockchain_changed(self, **_):
+        if not self._stale:
+            self._stale = True
+            if self._is_active:
+                self.after_idle(self._update)
         
     
     def _generate_tx_history(self):
@@ -117,11 +130,6 @@ class TransactionHistoryFrame(tk.Frame):
         
         
     def _update(self):
-        if not self._is_active:
-            return
-        
-        if self.node.check_updated_blockchain(_frame_id):
-            self.tx_history = get_tx_history()
-            self._generate_tx_history()
-            
-        self.after(500, self._update)
\ No newline at end of file
+        self._stale = False
+        self.tx_history = get_tx_history()
+        self._generate_tx_history()
\ No newline at end of file
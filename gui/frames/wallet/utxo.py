@@ -3,16 +3,16 @@ from tkinter import ttk
 
 from datetime import datetime
 
-from db.utxo import get_utxo_exists, get_utxo_set_to_addr, get_utxo_value_to_addr
+from db.utxo import get_utxo_set_to_addr, get_utxo_value_to_addr
 from gui.bindings import bind_hierarchical, mousewheel_cb
 from gui.common.scrollable import create_scrollable_frame
 from gui.common.transaction import tx_popup
 from gui.fonts import MonoFont, SansFont
-from gui.helper import add_hover_effect, reset_widget
+from gui.helper import add_hover_effect, reset_widget, subscribe_widget
 from ktc_constants import KTC
 from networking.node import Node
+from utils.events import BLOCK_CONNECTED, BLOCK_DISCONNECTED, TX_ADDED, TX_REMOVED
 from utils.fmt import truncate_bytes
-from utils.helper import int_to_bytes
 
 
 _frame_id = 32
@@ -25,8 +25,9 @@ class UTXOFrame(tk.Frame):
         self.node = node
         
         # Default is sort by value desc
-        self.utxos_spent = self.node.mempool.spent_mempool_utxos
-        self.utxos_to_node = (get_utxo_set_to_addr(self.node.pk_hash) - self.utxos_spent) | self.node.mempool.new_mempool_utxos_to_node
+        utxo_set_to_node = get_utxo_set_to_addr(self.node.pk_hash)
+        self.utxos_spent = self.node.mempool.get_spent_utxos(utxo_set_to_node)
+        self.utxos_to_node = self.node.mempool.get_available_utxos(utxo_set_to_node)
 
         self.balance = sum(utxo.value for utxo in self.utxos_to_node)
 
@@ -63,7 +64,10 @@ class UTXOFrame(tk.Frame):
         self.frame_utxo_grid.columnconfigure(1, weight=1, uniform="utxo_card")
         self.frame_utxo_grid.columnconfigure(2, weight=1, uniform="utxo_card")
 
-        # self._generate_utxo_set_cards()
+        # Refreshed when shown after the mempool or blockchain changed
+        self._stale = True
+        for name in (TX_ADDED, TX_REMOVED, BLOCK_CONNECTED, BLOCK_DISCONNECTED):
+            subscribe_widget(self, self.node.events, name, self._on_utxos_changed)
         
         self._is_active = True
     
@@ -72,7 +76,14 @@ class UTXOFrame(tk.Frame):
         
     def on_show(self):
         self._is_active = True
-        self._update()
+        if self._stale:
+            self._update()
+        
+    def _on_utxos_changed(self, **_):
+        if not self._stale:
+            self._stale = True
+            if self._is_active:
+                self.after_idle(self._update)
         
     def _generate_utxo_set_cards(self, *_):
         reset_widget(self.frame_utxo_grid)
@@ -81,11 +92,8 @@ class UTXOFrame(tk.Frame):
         
         reverse = (order == "Descending")
         
-        # This filtering ensures that spent utxos (grayed out) are on those that exists in the actual UTXO set
-        unavail_utxo_set_to_node = {
-            utxo for utxo in self.utxos_spent
-            if get_utxo_exists(utxo.tx_hash + int_to_bytes(utxo.index)) and utxo.owner == self.node.pk_hash
-        }
+        # Spent utxos (grayed out) are those of the actual UTXO set spent by mempool transactions
+        unavail_utxo_set_to_node = self.utxos_spent
 
         if var == "Time":
             avail_utxo_set_to_node = sorted(self.utxos_to_node, key=lambda utxo: utxo.timestamp, reverse=reverse)
@@ -137,7 +145,7 @@ class UTXOFrame(tk.Frame):
         label_utxo_from.pack(side="left")
 
         btn_bg = "#f0f8ff" if available else "#b8b8d0"
-        if utxo in self.node.mempool.new_mempool_utxos_to_node:
+        if self.node.mempool.get_valid_tx(utxo.tx_hash):
             btn_cmd = lambda: self.controller.switch_to_frame("mempool")
         else:
             btn_cmd = lambda q=utxo.tx_hash: self.controller.switch_to_frame(
@@ -169,16 +177,11 @@ class UTXOFrame(tk.Frame):
             
         
     def _update(self):
-        if not self._is_active:
-            return
-        
-        if self.node.mempool.check_update_mempool(_frame_id):
-            self.utxos_spent = self.node.mempool.spent_mempool_utxos
-            self.utxos_to_node = (get_utxo_set_to_addr(self.node.pk_hash) - self.utxos_spent) | self.node.mempool.new_mempool_utxos_to_node
+        self._stale = False
+        utxo_set_to_node = get_utxo_set_to_addr(self.node.pk_hash)
+        self.utxos_spent = self.node.mempool.get_spent_utxos(utxo_set_to_node)
+        self.utxos_to_node = self.node.mempool.get_available_utxos(utxo_set_to_node)
 
-            self.balance = sum(utxo.value for utxo in self.utxos_to_node)
-            self.label_balance_value.config(text=f"{self.balance/KTC:.8f}KTC")
-            self._generate_utxo_set_cards()
-            
-        
-        self.after(500, self._update)
\ No newline at end of file
+        self.balance = sum(utxo.value for utxo in self.utxos_to_node)
+        self.label_balance_value.config(text=f"{self.balance/KTC:.8f}KTC")
+        self._generate_utxo_set_cards()
\ No newline at end of file
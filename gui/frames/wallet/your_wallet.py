@@ -10,9 +10,10 @@ from db.tx_history import get_tx_history
 from gui.bindings import bind_hierarchical, mousewheel_cb
 from gui.common.scrollable import create_scrollable_frame
 from gui.fonts import MonoFont, SansFont
-from gui.helper import add_hover_effect, copy_to_clipboard, reset_widget
+from gui.helper import add_hover_effect, copy_to_clipboard, reset_widget, subscribe_widget
 from ktc_constants import KTC
 from networking.node import Node
+from utils.events import BLOCK_CONNECTED, BLOCK_DISCONNECTED, TX_ADDED, TX_REMOVED
 from utils.fmt import truncate_bytes
 
 
@@ -48,7 +49,7 @@ class YourWalletFrame(tk.Frame):
         btn_pk_wif_copy = ttk.Button(frame_pk_wif, text="Copy", command=lambda: copy_to_clipboard(self, wif_encode(self.node.pk_hash)))
         btn_pk_wif_copy.pack(side="left", padx=(10, 0))
 
-        avail_utxo_set_to_node = (self.utxo_set_to_node - self.node.mempool.spent_mempool_utxos) | self.node.mempool.new_mempool_utxos_to_node
+        avail_utxo_set_to_node = self.node.mempool.get_available_utxos(self.utxo_set_to_node)
         avail_balance = sum(utxo.value for utxo in avail_utxo_set_to_node)
         total_balance = sum(utxo.value for utxo in self.utxo_set_to_node)
         
@@ -108,6 +109,13 @@ class YourWalletFrame(tk.Frame):
         lf_recent_tx.rowconfigure(1, weight=1)
         lf_recent_tx.columnconfigure(0, weight=1)
 
+        # Refreshed when shown after the mempool or blockchain changed
+        self._stale_balance = True
+        self._stale_history = False
+        for name in (TX_ADDED, TX_REMOVED):
+            subscribe_widget(self, self.node.events, name, self._on_mempool_changed)
+        for name in (BLOCK_CONNECTED, BLOCK_DISCONNECTED):
+            subscribe_widget(self, self.node.events, name, self._on_blockchain_changed)
         self._display_recent_txs()
 
         self._is_active = True
@@ -119,6 +127,19 @@ class YourWalletFrame(tk.Frame):
         self._is_active = True
         self._update()
         
+    def _on_mempool_changed(self, **_):
+        self._mark_stale(balance=True)
+        
+    def _on_blockchain_changed(self, **_):
+        self._mark_stale(balance=True, history=True)
+        
+    def _mark_stale(self, balance=False, history=False):
+        pending = self._stale_balance or self._stale_history
+        self._stale_balance |= balance
+        self._stale_history |= history
+        if not pending and self._is_active:
+            self.after_idle(self._update)
+        
     def _display_recent_txs(self):
         reset_widget(self.frame_recent_txs)
         recent_txs = get_tx_history(up_to=30)
@@ -188,20 +209,17 @@ class YourWalletFrame(tk.Frame):
         add_hover_effect(btn_tx, "#f0f8ff", "#E0F0FF")
         
     def _update(self):
-        if not self._is_active:
-            return
-        
-        if self.node.mempool.check_update_valids(_frame_id) or self.node.mempool.check_update_orphans(_frame_id):
+        if self._stale_balance:
+            self._stale_balance = False
             self.utxo_set_to_node = get_utxo_set_to_addr(self.node.pk_hash)
             total_balance = sum(utxo.value for utxo in self.utxo_set_to_node)
             self.label_total_amount.config(text=f"{total_balance/KTC:.8f} KTC")
             self.label_utxo.config(text=f"From {len(self.utxo_set_to_node)} UTXO(s)")
             
-            avail_utxo_set_to_node = (self.utxo_set_to_node - self.node.mempool.spent_mempool_utxos) | self.node.mempool.new_mempool_utxos_to_node
+            avail_utxo_set_to_node = self.node.mempool.get_available_utxos(self.utxo_set_to_node)
             avail_balance = sum(utxo.value for utxo in avail_utxo_set_to_node)
             self.label_avail_amount.config(text=f"{avail_balance/KTC:.8f} KTC")
             
-        if self.node.check_updated_blockchain(_frame_id):
+        if self._stale_history:
+            self._stale_history = False
             self._display_recent_txs()
-        
-        self.after(500, self._update)
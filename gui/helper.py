@@ -2,6 +2,13 @@ import tkinter as tk
 from tkinter import messagebox
 
 from utils.config import APP_CONFIG
+from utils.events import EventBus
+
+def subscribe_widget(widget, events: EventBus, name: str, callback):
+    """Subscribes `callback` to node event `name` for as long as `widget` exists."""
+    events.subscribe(name, callback)
+    widget.bind("<Destroy>", lambda e: events.unsubscribe(name, callback) if e.widget is widget else None, add="+")
+
 
 def reset_widget(widget):
     for child in widget.winfo_children():
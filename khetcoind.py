@@ -0,0 +1,118 @@
+"""
+Headless Khetcoin node, for running on servers without a display.
+
+Runs the node as the main asyncio program without loading Tk or anything from `gui/`,
+and shuts it down gracefully on SIGINT or SIGTERM.
+
+First run (creates the key, folders and databases non-interactively):
+    python khetcoind.py --name alice
+    python khetcoind.py --name alice --import-key-file alice.key
+
+Later runs:
+    python khetcoind.py
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+from pathlib import Path
+
+from setup.functions import configure_logging
+from utils.config import APP_CONFIG
+
+log = logging.getLogger("khetcoind")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="khetcoind", description="Run a headless Khetcoin node.")
+    parser.add_argument("--name", help="Name of the node and its private key. Required for the first run.")
+    parser.add_argument("--import-key-file", type=Path, help="File with the private key (32 raw bytes or 64 hex characters) to set up with, instead of generating a new one.")
+    parser.add_argument("--port", type=int, help="Port to listen on. Defaults to the `port` in config.json.")
+    parser.add_argument("--external-ip", help="Public IP address to advertise to peers. Discovered with UPnP if not given.")
+    parser.add_argument("--no-upnp", action="store_true", help="Don't attempt UPnP port forwarding.")
+    parser.add_argument("--log-file", action="store_true", help="Log to the log file in config.json instead of stderr.")
+    return parser.parse_args(argv)
+
+
+def _read_key_file(path: Path) -> bytes:
+    data = path.read_bytes()
+    if len(data) == 32:
+        return data
+
+    try:
+        key = bytes.fromhex(data.decode("ascii").strip())
+    except ValueError:
+        key = b""
+    if len(key) != 32:
+        raise ValueError(f"{path} must contain a 32 byte private key, either raw or hex encoded")
+    return key
+
+
+def initial_setup(name: str, key_file: Path | None = None) -> None:
+    """Non-interactive equivalent of the GUI's `SetupApp`. Fonts are left as their defaults."""
+    from crypto.key import create_private_key, save_private_key
+    from setup.initializer import init_db, init_folders
+
+    init_folders()
+    priv_key = _read_key_file(key_file) if key_file else create_private_key()
+    save_private_key(priv_key, name)
+
+    APP_CONFIG.set("app", "name", name)
+    APP_CONFIG.set("mining", "tag", f"/{name}/")
+    init_db()
+    APP_CONFIG.set("app", "initial_setup", True)
+    log.info(f"Initial setup complete for '{name}'.")
+
+
+def _install_signal_handlers(loop: asyncio.AbstractEventLoop, node) -> None:
+    def request_shutdown(signame: str):
+        log.info(f"Received {signame}; shutting down...")
+        node._shutdown_requested.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, request_shutdown, sig.name)
+        except NotImplementedError:  # Windows event loops don't support signal handlers
+            signal.signal(sig, lambda signum, _: loop.call_soon_threadsafe(request_shutdown, signal.Signals(signum).name))
+
+
+async def run_node(args: argparse.Namespace) -> None:
+    from networking.node import Node
+    from utils.ip import setup_port_forwarding
+
+    name = APP_CONFIG.get("app", "name")
+    port = args.port or APP_CONFIG.get("node", "port")
+    loop = asyncio.get_running_loop()
+
+    node = Node(name, port, loop)
+    node.external_ip = args.external_ip
+    if node.external_ip is None and not args.no_upnp:
+        node.external_ip = await loop.run_in_executor(None, setup_port_forwarding, port, name)
+        if node.external_ip is None:
+            log.warning("UPnP port forwarding failed; peers may not be able to connect to this node.")
+
+    _install_signal_handlers(loop, node)
+    try:
+        await node.run()
+    finally:
+        node.miner.shutdown()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_logging(console=not args.log_file)
+
+    if not APP_CONFIG.get("app", "initial_setup"):
+        if not args.name:
+            log.error("This node hasn't been set up yet; run again with --name to create its private key.")
+            return 1
+        initial_setup(args.name, args.import_key_file)
+
+    asyncio.run(run_node(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+
+from blockchain.block import Block, calculate_block_subsidy
+from db.block import calculate_block_target
+from ktc_constants import MAX_BLOCK_SIZE
+from mining.constants import BLOCK_RESERVED_SIZE, MAX_CONSECUTIVE_PACKAGE_FAILURES
+from mining.mempool import Mempool, MempoolEntry
+from utils.helper import target_to_bits
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BlockTemplate:
+    """Transactions to mine on top of `prev_block`, in a valid order (parents before children), without the coinbase."""
+    prev_block: bytes
+    height: int
+    bits: bytes
+    entries: list[MempoolEntry] = field(default_factory=list)
+    size: int = 0
+    fee: int = 0
+    min_package_fee_rate: float | None = None  # Lowest fee rate (khets/KB) of the packages included
+    excluded: int = 0  # Valid mempool transactions which did not fit
+    sequence: int = 0  # Mempool sequence number the template is up to date with
+
+    @property
+    def coinbase_value(self) -> int:
+        return calculate_block_subsidy(self.height) + self.fee
+
+    def create_block(self) -> Block:
+        return Block(
+            version=1,
+            prev_block=self.prev_block,
+            timestamp=int(time.time()),
+            bits=self.bits,
+            nonce=0,
+            txs=[entry.tx for entry in self.entries],
+        )
+
+
+def select_transactions(mempool: Mempool, max_size: int) -> tuple[list[MempoolEntry], int, int, float | None]:
+    """
+    Greedily selects ancestor packages by fee rate until `max_size` bytes are filled, so that
+    a low fee parent is mined together with a high fee child spending it (CPFP).
+
+    Once a package is selected, the remaining descendants of its transactions are re-scored without them.
+    \nReturns the selected entries in a valid block order, with their total size, total fee and lowest package fee rate.
+    """
+    selected: list[MempoolEntry] = []
+    included: set[bytes] = set()
+    failed: set[bytes] = set()
+    size = fee = 0
+    min_package_fee_rate = None
+
+    # Package (size, fee) of entries with ancestors already selected, and a heap of them by package fee rate
+    modified: dict[bytes, tuple[int, int]] = dict()
+    modified_heap: list[tuple[float, bytes, int, int]] = []
+
+    candidates = mempool.iter_by_ancestor_fee_rate()
+    next_entry = next(candidates, None)
+    consecutive_failures = 0
+
+    while True:
+        # Skip candidates which were already handled, or whose package has changed
+        while next_entry and (next_entry.tx_hash in included or next_entry.tx_hash in failed or next_entry.tx_hash in modified):
+            next_entry = next(candidates, None)
+        while modified_heap and (
+            modified_heap[0][1] in included or modified_heap[0][1] in failed
+            or modified.get(modified_heap[0][1]) != modified_heap[0][2:]
+        ):
+            heapq.heappop(modified_heap)
+
+        if next_entry is None and not modified_heap:
+            break
+
+        if modified_heap and (next_entry is None or -modified_heap[0][0] > next_entry.ancestor_fee_rate):
+            _, tx_hash, package_size, package_fee = heapq.heappop(modified_heap)
+        else:
+            tx_hash, package_size, package_fee = next_entry.tx_hash, next_entry.ancestor_size, next_entry.ancestor_fee
+            next_entry = next(candidates, None)
+
+        if size + package_size > max_size:
+            failed.add(tx_hash)
+            consecutive_failures += 1
+            if consecutive_failures > MAX_CONSECUTIVE_PACKAGE_FAILURES and size > max_size - BLOCK_RESERVED_SIZE:
+                break
+            continue
+        consecutive_failures = 0
+
+        # Ancestors always have fewer ancestors than their descendants, which gives a valid order
+        package = [mempool.get_entry(ancestor_hash) for ancestor_hash in mempool.get_ancestors(tx_hash) if ancestor_hash not in included]
+        package.append(mempool.get_entry(tx_hash))
+        package.sort(key=lambda entry: entry.ancestor_count)
+
+        for entry in package:
+            selected.append(entry)
+            included.add(entry.tx_hash)
+            modified.pop(entry.tx_hash, None)
+
+        for entry in package:
+            for descendant_hash in mempool.get_descendants(entry.tx_hash):
+                if descendant_hash in included:
+                    continue
+                descendant = mempool.get_entry(descendant_hash)
+                d_size, d_fee = modified.get(descendant_hash, (descendant.ancestor_size, descendant.ancestor_fee))
+                modified[descendant_hash] = (d_size - entry.size, d_fee - entry.fee)
+                heapq.heappush(modified_heap, (-(d_fee - entry.fee) * 1024 / (d_size - entry.size), descendant_hash, d_size - entry.size, d_fee - entry.fee))
+
+        size += package_size
+        fee += package_fee
+        package_fee_rate = package_fee * 1024 / package_size
+        if min_package_fee_rate is None or package_fee_rate < min_package_fee_rate:
+            min_package_fee_rate = package_fee_rate
+
+    return selected, size, fee, min_package_fee_rate
+
+
+class BlockAssembler:
+    """
+    Builds block templates from the mempool for the miner and `getblocktemplate`, caching the last one.
+
+    The cached template is reused until the tip changes or a transaction leaves the mempool.
+    New transactions are appended to it while everything fits, and only trigger a rebuild once the block
+    is full if one of them could have displaced an included package.
+    \nMust be used from the node's event loop, where the mempool is updated; see `get_template_threadsafe`.
+    """
+    def __init__(self, node):
+        self.node = node
+        self.max_size = MAX_BLOCK_SIZE - BLOCK_RESERVED_SIZE
+        self._template: BlockTemplate | None = None
+
+    def get_template(self) -> BlockTemplate:
+        mempool: Mempool = self.node.mempool
+        tip_index = self.node.block_tip_index
+        template = self._template
+
+        if (
+            template is None
+            or template.prev_block != tip_index.hash
+            or mempool.last_removal_sequence > template.sequence
+        ):
+            self._template = self._build()
+        elif mempool.sequence > template.sequence and not self._update(template):
+            self._template = self._build()
+
+        return self._template
+
+    def get_template_threadsafe(self, timeout: float = 30) -> BlockTemplate:
+        """`get_template` for callers outside the node's event loop, such as the GUI."""
+        async def get_template():
+            return self.get_template()
+        return asyncio.run_coroutine_threadsafe(get_template(), self.node.loop).result(timeout)
+
+    def _build(self) -> BlockTemplate:
+        t_start = time.perf_counter()
+        mempool: Mempool = self.node.mempool
+        tip_index = self.node.block_tip_index
+
+        height = tip_index.height + 1
+        entries, size, fee, min_package_fee_rate = select_transactions(mempool, self.max_size)
+        template = BlockTemplate(
+            prev_block=tip_index.hash,
+            height=height,
+            bits=target_to_bits(calculate_block_target(height, tip_index.hash)),
+            entries=entries,
+            size=size,
+            fee=fee,
+            min_package_fee_rate=min_package_fee_rate,
+            excluded=mempool.get_no_tx() - len(entries),
+            sequence=mempool.sequence,
+        )
+        log.info(
+            f"Block template built with {len(entries)}/{mempool.get_no_tx()} transactions "
+            f"({size}B, {fee} khets) in {(time.perf_counter() - t_start) * 1e3:.1f}ms"
+        )
+        return template
+
+    def _update(self, template: BlockTemplate) -> bool:
+        """
+        Adds the transactions that arrived since `template` was built, if the result is what a rebuild would give.
+        \nReturns False if the template must be rebuilt instead.
+        """
+        mempool: Mempool = self.node.mempool
+        new_entries = list(mempool.iter_entries_since(template.sequence))
+        new_entries.reverse()  # Arrival order, parents first
+
+        if template.excluded and (
+            template.min_package_fee_rate is None
+            or any(entry.ancestor_fee_rate > template.min_package_fee_rate for entry in new_entries)
+        ):
+            # The block is full, and a new package could outbid an included one
+            return False
+
+        # Without that, a rebuild would select the new transactions after every included package, as long as they fit.
+        # While everything in the mempool is included, new transactions only depend on included ones
+        included = {entry.tx_hash for entry in template.entries} if template.excluded else None
+        for entry in new_entries:
+            if template.size + entry.size > self.max_size:
+                return False
+            if included is not None:
+                if not entry.parents <= included:
+                    return False
+                included.add(entry.tx_hash)
+            template.entries.append(entry)
+            template.size += entry.size
+            template.fee += entry.fee
+            if template.min_package_fee_rate is None or entry.fee_rate < template.min_package_fee_rate:
+                template.min_package_fee_rate = entry.fee_rate
+
+        template.sequence = mempool.sequence
+        return True
@@ -2,4 +2,27 @@
 
 MIN_RELAY_TX_FEE_RATE = 100  # Khets per KB
 
-MEMPOOL_EXPIRY = 72 * 3600  # 3 DAys
\ No newline at end of file
+BLOCK_RESERVED_SIZE = 1000  # Bytes of a block template kept free for the header, transaction count and coinbase
+MAX_CONSECUTIVE_PACKAGE_FAILURES = 1000  # Packages skipped in a row for not fitting, before a nearly full template is finished early
+
+MEMPOOL_EXPIRY = 72 * 3600  # 3 DAys
+MEMPOOL_EXPIRY_INTERVAL = 60  # Seconds between checks for expired mempool transactions
+ROLLING_FEE_HALFLIFE = 12 * 3600  # Half-life of the minimum fee rate raised by evictions
+
+# Lower bounds (khets/KB) of the fee rate histogram in `MempoolStats`
+FEE_RATE_BUCKETS = (0, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000)
+
+# Orphan pool (see `mining.orphan_pool`)
+MAX_ORPHAN_TXS = 100           # Orphans kept in total, evicted at random beyond it
+MAX_ORPHAN_TXS_PER_PEER = 25   # Orphans kept from any one peer
+MAX_ORPHAN_TX_SIZE = 100_000   # Bytes; larger orphans are not kept at all
+ORPHAN_TX_EXPIRY = 20 * 60     # Seconds an orphan waits for its parents before it is dropped
+
+# Fee estimation (see `mining.fee_estimator`)
+FEE_ESTIMATE_MAX_TARGET = 48             # Blocks; the longest confirmation target estimated
+FEE_ESTIMATE_DECAY = 0.995               # Weight kept by past observations per block, a half-life of about a day
+FEE_ESTIMATE_BUCKET_SPACING = 1.1        # Ratio between the fee rates of consecutive buckets
+FEE_ESTIMATE_MAX_FEE_RATE = 10_000_000   # Khets per KB; higher fee rates are counted in the last bucket
+FEE_ESTIMATE_SUCCESS_THRESHOLD = 0.85    # Share of transactions confirmed within the target for a fee rate to be recommended
+FEE_ESTIMATE_SUFFICIENT_TXS = 0.1        # Transactions per block, on average, a range of buckets needs before its success rate is trusted
+FEE_ESTIMATE_FLUSH_INTERVAL = 3600       # Seconds between snapshots of the fee estimates to LMDB
@@ -0,0 +1,200 @@
+import bisect
+import logging
+import math
+import struct
+
+from db.fee_estimates import load_fee_estimates_lmdb, save_fee_estimates_lmdb
+from mining.constants import (
+    FEE_ESTIMATE_BUCKET_SPACING, FEE_ESTIMATE_DECAY, FEE_ESTIMATE_MAX_FEE_RATE, FEE_ESTIMATE_MAX_TARGET,
+    FEE_ESTIMATE_SUCCESS_THRESHOLD, FEE_ESTIMATE_SUFFICIENT_TXS, MIN_RELAY_TX_FEE_RATE,
+)
+
+log = logging.getLogger(__name__)
+
+FEE_ESTIMATES_VERSION = 1
+_HEADER = struct.Struct("<BqIId")  # version, best_height, no. of buckets, max target, decay
+
+
+def _fee_rate_buckets() -> list[float]:
+    """Lower bounds (khets/KB) of the fee rate buckets, spaced geometrically from the minimum relay fee rate."""
+    buckets = []
+    fee_rate = float(MIN_RELAY_TX_FEE_RATE)
+    while fee_rate < FEE_ESTIMATE_MAX_FEE_RATE:
+        buckets.append(fee_rate)
+        fee_rate *= FEE_ESTIMATE_BUCKET_SPACING
+    return buckets
+
+
+class FeeEstimator:
+    """
+    Estimates the fee rate needed to confirm within a number of blocks, from how quickly mempool transactions were mined.
+
+    Every transaction entering the mempool is tracked with the height it entered at and its fee rate bucket. When a block
+    confirms it, the no. of blocks it waited is counted for every target it met; when it leaves the mempool unmined,
+    e.g. on expiry or eviction, it is counted as a failure for every target it had already missed. All counts decay by
+    `FEE_ESTIMATE_DECAY` per block, so that recent blocks weigh the most.
+    \nEstimates for every target are recomputed once per block, so `estimate_fee_rate` is a lookup.
+    Only transactions without unconfirmed parents are tracked, as the others are mined for their package's fee rate.
+    """
+    def __init__(self):
+        self.buckets: list[float] = _fee_rate_buckets()
+        self.best_height: int = -1  # Height of the last block processed
+        n_buckets = len(self.buckets)
+
+        # Decayed per bucket: confirmed transactions, the sum of their fee rates, and per target (index `target - 1`),
+        # those confirmed within the target and those that left the mempool after missing it
+        self._tx_counts: list[float] = [0.0] * n_buckets
+        self._fee_rate_sums: list[float] = [0.0] * n_buckets
+        self._confirmed: list[list[float]] = [[0.0] * n_buckets for _ in range(FEE_ESTIMATE_MAX_TARGET)]
+        self._failed: list[list[float]] = [[0.0] * n_buckets for _ in range(FEE_ESTIMATE_MAX_TARGET)]
+
+        self._tracked: dict[bytes, tuple[int, int, float]] = dict()  # Mempool tx_hash to (entry height, bucket, fee rate)
+        self._estimates: list[int | None] = [None] * (FEE_ESTIMATE_MAX_TARGET + 1)  # Indexed by target
+
+    def _get_bucket(self, fee_rate: float) -> int:
+        return max(bisect.bisect_right(self.buckets, fee_rate) - 1, 0)
+
+    def process_transaction(self, tx_hash: bytes, fee_rate: float, height: int):
+        """Starts tracking a transaction which entered the mempool while the tip was at `height`."""
+        if tx_hash not in self._tracked:
+            self._tracked[tx_hash] = (height, self._get_bucket(fee_rate), fee_rate)
+
+    def remove_tx(self, tx_hash: bytes, height: int):
+        """Stops tracking a transaction which left the mempool without being mined, while the tip was at `height`."""
+        if (tracked := self._tracked.pop(tx_hash, None)) is None:
+            return
+        entry_height, bucket, _ = tracked
+        for t in range(min(height - entry_height, FEE_ESTIMATE_MAX_TARGET)):
+            self._failed[t][bucket] += 1
+
+    def retain(self, tx_hashes):
+        """Stops tracking, without counting failures, every transaction not in `tx_hashes`, e.g. after the mempool is rebuilt."""
+        self._tracked = {tx_hash: tracked for tx_hash, tracked in self._tracked.items() if tx_hash in tx_hashes}
+
+    def process_block(self, height: int, tx_hashes: list[bytes]):
+        """
+        Records the confirmation of the tracked transactions among `tx_hashes`, mined at `height`, and updates the estimates.
+        \nBlocks at or below the last height processed, i.e. reconnected after a reorg, only stop the tracking of their
+        transactions, so that nothing is counted twice.
+        """
+        confirmed = [tracked for tx_hash in tx_hashes if (tracked := self._tracked.pop(tx_hash, None))]
+        if height <= self.best_height:
+            return
+        self.best_height = height
+
+        for i in range(len(self.buckets)):
+            self._tx_counts[i] *= FEE_ESTIMATE_DECAY
+            self._fee_rate_sums[i] *= FEE_ESTIMATE_DECAY
+        for t in range(FEE_ESTIMATE_MAX_TARGET):
+            confirmed_t, failed_t = self._confirmed[t], self._failed[t]
+            for i in range(len(self.buckets)):
+                confirmed_t[i] *= FEE_ESTIMATE_DECAY
+                failed_t[i] *= FEE_ESTIMATE_DECAY
+
+        for entry_height, bucket, fee_rate in confirmed:
+            blocks_to_confirm = height - entry_height
+            if blocks_to_confirm < 1:
+                continue
+            self._tx_counts[bucket] += 1
+            self._fee_rate_sums[bucket] += fee_rate
+            for t in range(blocks_to_confirm - 1, FEE_ESTIMATE_MAX_TARGET):
+                self._confirmed[t][bucket] += 1
+
+        self._update_estimates()
+
+    def _update_estimates(self):
+        n_buckets = len(self.buckets)
+
+        # Tracked transactions still waiting are failures for every target they already missed
+        waiting = [[0] * n_buckets for _ in range(FEE_ESTIMATE_MAX_TARGET + 1)]  # Indexed by blocks waited, capped
+        for entry_height, bucket, _ in self._tracked.values():
+            waiting[min(max(self.best_height - entry_height, 0), FEE_ESTIMATE_MAX_TARGET)][bucket] += 1
+        missed = [0] * n_buckets
+        for target in range(FEE_ESTIMATE_MAX_TARGET, 0, -1):
+            for i in range(n_buckets):
+                missed[i] += waiting[target][i]
+            self._estimates[target] = self._estimate(target, missed)
+
+    def _estimate(self, target: int, missed: list[int]) -> int | None:
+        """
+        Walks the buckets from the highest fee rate down, grouping them into ranges with enough data, and stops at the
+        first range that confirms less than `FEE_ESTIMATE_SUCCESS_THRESHOLD` within `target`. Returns the average
+        fee rate of the transactions confirmed in the lowest passing range, or None without enough data.
+        """
+        confirmed_t, failed_t = self._confirmed[target - 1], self._failed[target - 1]
+        sufficient_txs = FEE_ESTIMATE_SUFFICIENT_TXS / (1 - FEE_ESTIMATE_DECAY)
+
+        best_range = None
+        range_end = len(self.buckets)
+        n_confirmed = n_total = n_failed = 0.0
+        for i in range(len(self.buckets) - 1, -1, -1):
+            n_confirmed += confirmed_t[i]
+            n_total += self._tx_counts[i]
+            n_failed += failed_t[i] + missed[i]
+            if n_total < sufficient_txs:
+                continue
+            if n_confirmed / (n_total + n_failed) < FEE_ESTIMATE_SUCCESS_THRESHOLD:
+                break
+            best_range = (i, range_end)
+            range_end = i
+            n_confirmed = n_total = n_failed = 0.0
+
+        if best_range is None:
+            return None
+        start, end = best_range
+        tx_count = sum(self._tx_counts[start:end])
+        return math.ceil(sum(self._fee_rate_sums[start:end]) / tx_count)
+
+    def estimate_fee_rate(self, target: int) -> int | None:
+        """
+        Returns the fee rate (khets/KB) to confirm within `target` blocks, capped to `FEE_ESTIMATE_MAX_TARGET`,
+        or None if too few transactions were seen confirming.
+        """
+        return self._estimates[min(max(target, 1), FEE_ESTIMATE_MAX_TARGET)]
+
+    def serialize(self) -> bytes:
+        n_buckets = len(self.buckets)
+        values = (
+            self.buckets + self._tx_counts + self._fee_rate_sums
+            + [value for row in self._confirmed for value in row]
+            + [value for row in self._failed for value in row]
+        )
+        return (
+            _HEADER.pack(FEE_ESTIMATES_VERSION, self.best_height, n_buckets, FEE_ESTIMATE_MAX_TARGET, FEE_ESTIMATE_DECAY)
+            + struct.pack(f"<{len(values)}d", *values)
+        )
+
+    def parse(self, data: bytes) -> bool:
+        """
+        Restores statistics saved by `serialize`. Returns False, leaving the estimator empty, if they were saved
+        with a different version or bucket layout.
+        """
+        try:
+            version, best_height, n_buckets, max_target, decay = _HEADER.unpack_from(data)
+        except struct.error:
+            return False
+        if (version, n_buckets, max_target, decay) != (FEE_ESTIMATES_VERSION, len(self.buckets), FEE_ESTIMATE_MAX_TARGET, FEE_ESTIMATE_DECAY):
+            return False
+        n_values = n_buckets * (3 + 2 * max_target)
+        if len(data) != _HEADER.size + 8 * n_values:
+            return False
+
+        values = struct.unpack_from(f"<{n_values}d", data, _HEADER.size)
+        if list(values[:n_buckets]) != self.buckets:
+            return False
+        rows = [list(values[i:i + n_buckets]) for i in range(n_buckets, n_values, n_buckets)]
+        self._tx_counts, self._fee_rate_sums = rows[0], rows[1]
+        self._confirmed = rows[2:2 + max_target]
+        self._failed = rows[2 + max_target:]
+        self.best_height = best_height
+        self._update_estimates()
+        return True
+
+    def load(self):
+        if (data := load_fee_estimates_lmdb()) is None:
+            return
+        if not self.parse(data):
+            log.warning("Saved fee estimates discarded, as their format has changed.")
+
+    def save(self):
+        save_fee_estimates_lmdb(self.serialize())
@@ -1,17 +1,104 @@
+import bisect
 import logging
 import time
+from collections import deque
+from dataclasses import dataclass, field
 
 from blockchain.transaction import Transaction
 from db.mempool import load_mempool_lmdb, save_mempool_lmdb
-from db.tx import get_tx_exists, get_tx_timestamp
+from db.tx import get_tx_exists
 from db.utxo import UTXO, get_utxo
+from mining.constants import FEE_RATE_BUCKETS, MEMPOOL_EXPIRY, ORPHAN_TX_EXPIRY, ROLLING_FEE_HALFLIFE
+from mining.orphan_pool import OrphanPool
 from networking.constants import TX_TYPE
-from networking.messages.types.inv import InvMessage
 from utils.config import APP_CONFIG
+from utils.events import TX_ADDED, TX_REMOVED
 from utils.helper import int_to_bytes
+from utils.sorted_index import SortedIndex
 
 log = logging.getLogger(__name__)
 
+# Reasons `Mempool.add_tx` refuses a transaction
+REJECT_DUPLICATE = "duplicate"                 # Already in the blockchain, the mempool or the orphan pool
+REJECT_INVALID = "invalid"                     # Fails validation, or spends an output a mempool transaction already spends
+REJECT_INSUFFICIENT_FEE = "insufficient fee"   # Below the mempool's minimum fee rate
+REJECT_ORPHAN_NOT_STORED = "orphan not stored" # Valid so far, but not kept by the orphan pool
+REJECT_MEMPOOL_FULL = "mempool full"           # Evicted right after admission
+
+# Reasons which stay true for the same transaction until the tip changes, so that it need not be downloaded again
+RECENT_REJECT_REASONS = frozenset({REJECT_INVALID, REJECT_INSUFFICIENT_FEE})
+
+
+@dataclass(eq=False, slots=True)
+class MempoolEntry:
+    """
+    A valid mempool transaction, with its size and fee computed once at admission.
+
+    Ancestor aggregates include the transaction itself and every unconfirmed transaction it spends from,
+    directly or indirectly; descendant aggregates include it and every transaction spending from it.
+    """
+    tx: Transaction
+    tx_hash: bytes
+    size: int
+    fee: int
+    time: int
+    sequence: int = 0  # Mempool sequence number when added
+    parents: set[bytes] = field(default_factory=set)   # In-mempool transactions this one spends from
+    children: set[bytes] = field(default_factory=set)  # In-mempool transactions spending from this one
+
+    ancestor_count: int = 1
+    ancestor_size: int = 0
+    ancestor_fee: int = 0
+    descendant_count: int = 1
+    descendant_size: int = 0
+    descendant_fee: int = 0
+
+    def __post_init__(self):
+        self.ancestor_size = self.descendant_size = self.size
+        self.ancestor_fee = self.descendant_fee = self.fee
+
+    @property
+    def fee_rate(self) -> float:
+        """khets/KB"""
+        return self.fee * 1024 / self.size
+
+    @property
+    def ancestor_fee_rate(self) -> float:
+        """Fee rate (khets/KB) of this transaction together with its ancestors, i.e. its CPFP package."""
+        return self.ancestor_fee * 1024 / self.ancestor_size
+
+    @property
+    def descendant_fee_rate(self) -> float:
+        return self.descendant_fee * 1024 / self.descendant_size
+
+
+@dataclass(frozen=True, slots=True)
+class MempoolStats:
+    """Snapshot of the mempool's running totals, taken in O(1)."""
+    count: int
+    size: int  # B
+    fee: int
+    orphan_count: int
+    orphan_size: int
+    min_fee_rate: int  # khets/KB
+    max_size: int
+    # (lower bound of fee rate (khets/KB), no. txs, size) for every bucket in `FEE_RATE_BUCKETS`
+    fee_rate_histogram: tuple[tuple[int, int, int], ...]
+
+    @property
+    def avg_size(self) -> float:
+        return self.size / self.count if self.count else 0
+
+    @property
+    def avg_fee(self) -> float:
+        return self.fee / self.count if self.count else 0
+
+    @property
+    def usage(self) -> float:
+        """Fraction of the maximum size in use."""
+        return self.size / self.max_size if self.max_size else 0
+
+
 class Mempool:
     """
     A Mempool object that stores verified & unconfirmed transactions. 
@@ -20,102 +107,141 @@ class Mempool:
     def __init__(self, node) -> None:
         self.node = node
         
-        # 1. Validated transactions are stored in mempool
-        self._valid_txs: dict[bytes, Transaction] = dict()
+        # 1. Validated transactions are stored in mempool, indexed by fee rate and by ancestor (package) fee rate
+        self._entries: dict[bytes, MempoolEntry] = dict()
+        self._by_fee_rate = SortedIndex()           # (fee_rate, tx_hash)
+        self._by_ancestor_fee_rate = SortedIndex()  # (ancestor_fee_rate, tx_hash)
+        self._by_descendant_fee_rate = SortedIndex()  # (descendant_fee_rate, tx_hash), for eviction
+        self._by_time = SortedIndex()  # (time, tx_hash), for expiry
+        self._total_size: int = 0
+        self._total_fee: int = 0
+        self._histogram_count: list[int] = [0] * len(FEE_RATE_BUCKETS)  # By `FEE_RATE_BUCKETS`
+        self._histogram_size: list[int] = [0] * len(FEE_RATE_BUCKETS)
 
-        # 2. Orphan transactions & utility variables
-        self._orphan_txs:          dict[bytes, Transaction]            = dict()  # tx_hash to Transaction
-        self._orphan_missing_utxo: dict[bytes, set[tuple[bytes, int]]] = dict()  # tx_hash to outpoint
-        self._orphan_registry:     dict[tuple[bytes, int], bytes]      = dict()  # outpoint to tx_hash
+        # Incremented on every change to the valid entries, so that cached block templates can tell what changed since
+        self.sequence: int = 0
+        self.last_removal_sequence: int = 0
 
-        # 3. Time where transaction was added to mempool / orphan pool
-        self._time_log: dict[bytes, int] = dict()
+        # 2. Orphan transactions, waiting for their parents
+        self._orphans = OrphanPool(on_remove=self._on_orphan_removed)
 
-        # 3. Stores UTXOs spent in current mempool
-        self.spent_mempool_utxos: set[UTXO] = set() 
-        self.new_mempool_utxos_to_node: set[UTXO] = set()
+        # 3. Outpoints spent by valid transactions, to the spending tx_hash, and outputs of valid transactions paying this node
+        self._spenders:   dict[tuple[bytes, int], bytes] = dict()
+        self._node_utxos: dict[tuple[bytes, int], UTXO] = dict()
         
-        # 4. Transient variables for efficient GUI updating
-        self._updated_valids = 0
-        self._updated_orphans = 0
+        # 4. Raised above the configured minimum fee rate when transactions are evicted for space, decaying back over time
+        self._rolling_min_fee_rate: float = 0
+        self._rolling_min_fee_updated: float = time.time()
 
-    def add_tx(self, tx: Transaction) -> bool:
+    def add_tx(self, tx: Transaction, peer_id: int | None = None, time_added: int | None = None) -> str | None:
+        """
+        Adds a new transaction to the mempool, or to the orphan pool if some of its parents are unknown,
+        then adopts the orphans it was the last missing parent of.
+        \n`peer_id` is the session ID of the peer which relayed it, if any, so that no peer can fill the orphan pool.
+        `time_added` is when it first arrived, for transactions added again after a reorg or restart; defaults to now.
+        \nReturns None if the transaction was stored, otherwise the `REJECT_*` reason it was refused for.
+        """
+        if reason := self._accept_tx(tx, peer_id, time_added):
+            return reason
+        tx_hash = tx.hash()
+        if tx_hash in self._entries:
+            self._adopt_orphans([tx_hash])
+        return None
+
+    def _accept_tx(self, tx: Transaction, peer_id: int | None, time_added: int | None = None) -> str | None:
         tx_hash = tx.hash()
         log.info(f"Attempting to add tx to mempool: <{tx_hash.hex()}>")
         
-        if get_tx_exists(tx_hash) or (tx_hash in self._valid_txs.keys()) or (tx_hash in self._orphan_txs.keys()):
+        if get_tx_exists(tx_hash) or (tx_hash in self._entries) or (tx_hash in self._orphans):
             log.info("Tx already exists.")
-            return False
+            return REJECT_DUPLICATE
+        
+        # Refuse low fee transactions before verifying any scripts, as spam is most likely when the mempool is full
+        if (fee_rate := self._get_unverified_fee_rate(tx)) is not None and fee_rate < self.get_min_fee_rate():
+            log.info(f"Transaction <{tx_hash.hex()}> rejected as fee rate ({fee_rate:.2f} khets/KB) is too low.")
+            return REJECT_INSUFFICIENT_FEE
         
         tx_in_statuses = self.get_mempool_eligibility(tx)
         if "invalid" in tx_in_statuses:
             log.info("Invalid Tx.")
-            return False
+            return REJECT_INVALID
         
         is_orphan = "orphan" in tx_in_statuses
+        
+        # Orphan fees are unknown until their parents arrive, at which point they are added again
+        if not is_orphan:
+            fee, size = tx.fee(), tx.size()
+            fee_rate = fee * 1024 / size
+            if fee_rate < self.get_min_fee_rate():
+                log.info(f"Valid transaction <{tx_hash.hex()}> rejected as fee rate ({fee_rate:.2f} khets/KB) is too low.")
+                return REJECT_INSUFFICIENT_FEE
+        
         if not tx.verify(allow_orphan=is_orphan):
             log.warning(f"Failed to verify tx: ({is_orphan=})")
-            return False
+            return REJECT_INVALID
         
         
+        if time_added is None:
+            time_added = int(time.time())
         if is_orphan:
-            self._orphan_txs[tx_hash] = tx
-            self._updated_orphans = 0
+            missing = {tx_in.prev_tx_hash for tx_in, status in zip(tx.inputs, tx_in_statuses) if status == "orphan"}
+            if not self._orphans.add(tx, tx_hash, missing, time_added, peer_id):
+                return REJECT_ORPHAN_NOT_STORED
+            self.node.events.publish(TX_ADDED, tx_hash=tx_hash, tx=tx, orphan=True, time=time_added, fee=None)
             log.info("Successfully saved to orphan pool")
         else:
-            # if (fee_rate := tx.fee_rate() * 1024) < APP_CONFIG.get("node", "min_relay_fee_rate"):
-            #     log.info(f"Valid transaction <{tx.hash().hex()}> rejected as fee rate ({fee_rate} khets/KB) is too low.")
-            #     return False
-            
-            self._valid_txs[tx_hash] = tx
-            self._updated_valids = 0
+            entry = MempoolEntry(tx, tx_hash, size, fee, time_added)
+            self._add_entry(entry)
+            self.node.events.publish(TX_ADDED, tx_hash=tx_hash, tx=tx, orphan=False, time=time_added, fee=fee)
+            self.trim_to_size()
+            if tx_hash not in self._entries:
+                log.info(f"Transaction <{tx_hash.hex()}> evicted right away, as the mempool is full.")
+                return REJECT_MEMPOOL_FULL
             log.info("Successfully saved to mempool")
             
-            self.node.broadcast(
-                InvMessage(
-                    [(TX_TYPE, tx_hash)]
-                )
-            )  # exclude=peer... too lazy to implement...
+            # Children of mempool transactions are mined for their package's fee rate, not their own
+            if entry.ancestor_count == 1:
+                self.node.fee_estimator.process_transaction(tx_hash, fee_rate, self.node.block_tip_index.height)
             
+            self.node.relay_inventory(TX_TYPE, tx_hash, fee_rate)
             
-        time_added = int(time.time())
-        self._time_log[tx_hash] = time_added
-        
-        for i, tx_in in enumerate(tx.inputs):
-            status = tx_in_statuses[i]
-            outpoint = (tx_in.prev_tx_hash, tx_in.prev_index)
-    
-            if status == "orphan":
-                self._orphan_registry[outpoint] = tx_hash
-                self._orphan_missing_utxo.setdefault(tx_hash, set()).add(outpoint)
-
-            prev_tx_out = tx_in.fetch_tx_output() or self._valid_txs.get(tx_in.prev_tx_hash)[tx_in.prev_index]
-            script_pk = prev_tx_out.script_pubkey
-            timestamp = get_tx_timestamp(tx_in.prev_tx_hash) or self._time_log.get(tx_in.prev_tx_hash, 0) or 0
-            utxo = UTXO(script_pk.get_script_pubkey_receiver(), tx_in.fetch_value(), tx_in.prev_tx_hash, tx_in.prev_index, timestamp, script_pk)
-            self.spent_mempool_utxos.add(utxo)
-            self.new_mempool_utxos_to_node.discard(utxo)
-                    
-        for i, tx_out in enumerate(tx.outputs):
-            script_pk = tx_out.script_pubkey
-            owner = script_pk.get_script_pubkey_receiver()
-            if owner == self.node.pk_hash:
-                utxo = UTXO(owner, tx_out.value, tx_hash, i, time_added, script_pk)
-                self.new_mempool_utxos_to_node.add(utxo)
+            for i, tx_out in enumerate(tx.outputs):
+                script_pk = tx_out.script_pubkey
+                owner = script_pk.get_script_pubkey_receiver()
+                if owner == self.node.pk_hash:
+                    self._node_utxos[(tx_hash, i)] = UTXO(owner, tx_out.value, tx_hash, i, time_added, script_pk)
             
-            # Check if any outputs satisfy as parents to orphan txs
-            outpoint = (tx_hash, i)
-            if orphan_tx_hash := self._orphan_registry.get(outpoint):
-                self._orphan_missing_utxo[orphan_tx_hash].remove(outpoint)
+        self.node.known_inventory.insert(tx_hash)
+        return None
+
+    def _adopt_orphans(self, parent_hashes: list[bytes]):
+        """
+        Moves the orphans whose parents have all arrived into the mempool, if they are valid.
+        \nWorks through a queue rather than recursing, as each adopted orphan can complete the parents of more.
+        """
+        queue = deque(parent_hashes)
+        while queue:
+            for orphan in self._orphans.pop_ready(queue.popleft()):
+                if self._accept_tx(orphan.tx, orphan.peer_id) is None and orphan.tx_hash in self._entries:
+                    queue.append(orphan.tx_hash)
+
+    def remove_orphans_from_peer(self, peer_id: int):
+        """Drops the orphans relayed by a disconnected peer, which will not send their parents."""
+        if n_removed := self._orphans.remove_for_peer(peer_id):
+            log.info(f"Removed {n_removed} orphans from peer No. {peer_id}")
 
-                if not self._orphan_missing_utxo[orphan_tx_hash]:
-                    adopted_tx = self._orphan_txs[orphan_tx_hash]
-                    self.add_tx(adopted_tx)
-                    del self._orphan_missing_utxo[orphan_tx_hash]
-                    del self._orphan_txs[orphan_tx_hash]
+    def _on_orphan_removed(self, tx_hash: bytes):
+        self.node.events.publish(TX_REMOVED, tx_hash=tx_hash, orphan=True)
 
-                del self._orphan_registry[outpoint]
-        return True
+    def _get_unverified_fee_rate(self, tx: Transaction) -> float | None:
+        """Returns the fee rate (khets/KB) of `tx` from the outputs it spends, without verifying it. None if any are unknown."""
+        for tx_in in tx.inputs:
+            if entry := self._entries.get(tx_in.prev_tx_hash):
+                if tx_in.prev_index < len(entry.tx.outputs):
+                    tx_in._prev_output = entry.tx.outputs[tx_in.prev_index]
+        if (fee := tx.fee()) is None:
+            return None
+        return fee * 1024 / tx.size()
 
     def get_mempool_eligibility(self, tx: Transaction) -> str:
         """
@@ -141,9 +267,6 @@ class Mempool:
             
             # 1. Does prev_tx exist?
             if get_tx_exists(prev_tx_hash):
-                script_pk = tx_in.fetch_script_pubkey()
-                timestamp = get_tx_timestamp(tx_hash) or 0
-                utxo = UTXO(script_pk.get_script_pubkey_receiver(), tx_in.fetch_value(), prev_tx_hash, prev_id, timestamp, script_pk) 
                 # 1.1 YES prev_tx | NO prev_id 
                 if tx_in.fetch_tx_output() is None:
                     log.info("Outpoint references a valid transaction but an invalid index. Rejected.")
@@ -155,7 +278,7 @@ class Mempool:
                 if utxo := get_utxo(outpoint_bytes):
                     
                 # 1.2.1 YES prev_tx | YES prev_id | YES outpoint in utxo set | NO mempool unspent
-                    if utxo in self.spent_mempool_utxos:
+                    if (prev_tx_hash, prev_id) in self._spenders:
                         log.warning(f"Input[{i}] double-spends mempool tx output: {(prev_tx_hash.hex(), prev_id)}")
                         tx_in_statuses.append("invalid")
                         continue
@@ -174,23 +297,29 @@ class Mempool:
                 # 1.3 YES prev_tx | YES prev_id | NO outpoint in utxo set
                 else:
                     log.warning(f"Outpoint references a spent UTXO ({(prev_tx_hash.hex(), prev_id)}). Rejected.")
-                    tx_in_statuses.append("valid")
+                    tx_in_statuses.append("invalid")
                 
             # 2. NO prev_tx
             else: 
                 log.info(f"Input[{i}] outpoint does not refer to any transaction in the blockchain. Checking mempool now...")
                 
                 # 2.1 NO prev_tx | YES prev_tx in mempool
-                if mempool_tx := self._valid_txs.get(prev_tx_hash):
+                if mempool_entry := self._entries.get(prev_tx_hash):
+                    mempool_tx = mempool_entry.tx
                     
                 # 2.1.1 NO prev_tx | YES prev_tx in mempool | NO prev_id in mempool
                     try:
                         tx_out = mempool_tx.outputs[prev_id]
-                    except KeyError:
+                    except IndexError:
                         log.warning(f"Mempool UTXO index referenced by Input[{i}] is out of bounds.")
                         tx_in_statuses.append("invalid")
                         continue
                     
+                    if (prev_tx_hash, prev_id) in self._spenders:
+                        log.warning(f"Input[{i}] double-spends mempool tx output: {(prev_tx_hash.hex(), prev_id)}")
+                        tx_in_statuses.append("invalid")
+                        continue
+                    
                 # 2.1.2 NO prev_tx | YES prev_tx in mempool | YES prev_id in mempool | NO verified
                     if not tx.verify_input(i, tx_out.script_pubkey):
                         tx_in_statuses.append("invalid")
@@ -210,98 +339,363 @@ class Mempool:
 
         return tx_in_statuses
 
+    # Entries and their ancestor/descendant aggregates
+    def _add_entry(self, entry: MempoolEntry):
+        tx_hash = entry.tx_hash
+        entry.parents = {tx_in.prev_tx_hash for tx_in in entry.tx.inputs if tx_in.prev_tx_hash in self._entries}
+        ancestors = self._get_relatives(entry.parents, "parents")
+
+        for ancestor_hash in ancestors:
+            ancestor = self._entries[ancestor_hash]
+            entry.ancestor_count += 1
+            entry.ancestor_size += ancestor.size
+            entry.ancestor_fee += ancestor.fee
+            self._by_descendant_fee_rate.remove((ancestor.descendant_fee_rate, ancestor_hash))
+            ancestor.descendant_count += 1
+            ancestor.descendant_size += entry.size
+            ancestor.descendant_fee += entry.fee
+            self._by_descendant_fee_rate.add((ancestor.descendant_fee_rate, ancestor_hash))
+        for parent_hash in entry.parents:
+            self._entries[parent_hash].children.add(tx_hash)
+        for tx_in in entry.tx.inputs:
+            self._spenders[(tx_in.prev_tx_hash, tx_in.prev_index)] = tx_hash
+
+        self.sequence += 1
+        entry.sequence = self.sequence
+        self._entries[tx_hash] = entry
+        self._by_fee_rate.add((entry.fee_rate, tx_hash))
+        self._by_ancestor_fee_rate.add((entry.ancestor_fee_rate, tx_hash))
+        self._by_descendant_fee_rate.add((entry.descendant_fee_rate, tx_hash))
+        self._by_time.add((entry.time, tx_hash))
+        self._total_size += entry.size
+        self._total_fee += entry.fee
+        bucket = self._get_fee_rate_bucket(entry.fee_rate)
+        self._histogram_count[bucket] += 1
+        self._histogram_size[bucket] += entry.size
+
+    def _remove_entry(self, tx_hash: bytes) -> MempoolEntry | None:
+        """
+        Removes a single entry, taking it out of the aggregates of its remaining relatives.
+        \nRemoving a transaction without its descendants is only valid once it is confirmed.
+        When removing a transaction with its descendants, remove the descendants first, as the links through it are cut.
+        """
+        entry = self._entries.pop(tx_hash, None)
+        if entry is None:
+            return None
+
+        for ancestor_hash in self._get_relatives(entry.parents, "parents"):
+            ancestor = self._entries[ancestor_hash]
+            self._by_descendant_fee_rate.remove((ancestor.descendant_fee_rate, ancestor_hash))
+            ancestor.descendant_count -= 1
+            ancestor.descendant_size -= entry.size
+            ancestor.descendant_fee -= entry.fee
+            self._by_descendant_fee_rate.add((ancestor.descendant_fee_rate, ancestor_hash))
+        for descendant_hash in self._get_relatives(entry.children, "children"):
+            descendant = self._entries[descendant_hash]
+            self._by_ancestor_fee_rate.remove((descendant.ancestor_fee_rate, descendant_hash))
+            descendant.ancestor_count -= 1
+            descendant.ancestor_size -= entry.size
+            descendant.ancestor_fee -= entry.fee
+            self._by_ancestor_fee_rate.add((descendant.ancestor_fee_rate, descendant_hash))
+
+        for parent_hash in entry.parents:
+            self._entries[parent_hash].children.discard(tx_hash)
+        for child_hash in entry.children:
+            self._entries[child_hash].parents.discard(tx_hash)
+        for tx_in in entry.tx.inputs:
+            self._spenders.pop((tx_in.prev_tx_hash, tx_in.prev_index), None)
+        for i in range(len(entry.tx.outputs)):
+            self._node_utxos.pop((tx_hash, i), None)
+
+        self._by_fee_rate.remove((entry.fee_rate, tx_hash))
+        self._by_ancestor_fee_rate.remove((entry.ancestor_fee_rate, tx_hash))
+        self._by_descendant_fee_rate.remove((entry.descendant_fee_rate, tx_hash))
+        self._by_time.remove((entry.time, tx_hash))
+        self._total_size -= entry.size
+        self._total_fee -= entry.fee
+        bucket = self._get_fee_rate_bucket(entry.fee_rate)
+        self._histogram_count[bucket] -= 1
+        self._histogram_size[bucket] -= entry.size
+        self.sequence += 1
+        self.last_removal_sequence = self.sequence
+        self.node.fee_estimator.remove_tx(tx_hash, self.node.block_tip_index.height)
+        self.node.events.publish(TX_REMOVED, tx_hash=tx_hash, orphan=False)
+        return entry
+
+    @staticmethod
+    def _get_fee_rate_bucket(fee_rate: float) -> int:
+        return max(bisect.bisect_right(FEE_RATE_BUCKETS, fee_rate) - 1, 0)
+
+    def _get_relatives(self, start: set[bytes], direction: str) -> set[bytes]:
+        """Returns every entry reachable from `start` by following the `direction` ("parents" | "children") links, including `start`."""
+        result = set(start)
+        stack = list(start)
+        while stack:
+            for tx_hash in getattr(self._entries[stack.pop()], direction):
+                if tx_hash not in result:
+                    result.add(tx_hash)
+                    stack.append(tx_hash)
+        return result
+
+    def get_ancestors(self, tx_hash: bytes) -> set[bytes]:
+        """Returns the hashes of the in-mempool ancestors of a valid transaction, excluding itself."""
+        return self._get_relatives(self._entries[tx_hash].parents, "parents")
+
+    def get_descendants(self, tx_hash: bytes) -> set[bytes]:
+        """Returns the hashes of the in-mempool descendants of a valid transaction, excluding itself."""
+        return self._get_relatives(self._entries[tx_hash].children, "children")
+
+    # Getters
+    def get_entry(self, tx_hash: bytes) -> MempoolEntry | None:
+        return self._entries.get(tx_hash)
+
     def get_valid_tx(self, tx_hash: bytes) -> Transaction | None:
-        return self._valid_txs.get(tx_hash, None)
+        if entry := self._entries.get(tx_hash):
+            return entry.tx
+        return None
     
     def get_orphan_tx(self, tx_hash: bytes) -> Transaction | None:
-        return self._orphan_txs.get(tx_hash, None)
+        if orphan := self._orphans.get(tx_hash):
+            return orphan.tx
+        return None
+
+    def iter_entries_since(self, sequence: int):
+        """Yields the valid entries added after mempool sequence number `sequence`, newest first."""
+        for entry in reversed(self._entries.values()):
+            if entry.sequence <= sequence:
+                break
+            yield entry
 
     def get_all_valid_tx(self, explicit_sort=False) -> list[Transaction]:
         if explicit_sort:  # Used for block mining; transaction order must follow mempool addition order
-            return list(sorted(self._valid_txs.values(), key=lambda tx: self._time_log[tx.hash()]))
-        else:  # Although addition order is already preserved in self._valid_txs for python versions > 3.7
-            return list(self._valid_txs.values())
+            return [entry.tx for entry in sorted(self._entries.values(), key=lambda entry: entry.time)]
+        else:  # Although addition order is already preserved in self._entries for python versions > 3.7
+            return [entry.tx for entry in self._entries.values()]
+
+    def iter_by_fee_rate(self):
+        """Yields valid entries from the highest fee rate to the lowest."""
+        for _, tx_hash in list(reversed(self._by_fee_rate)):
+            yield self._entries[tx_hash]
+
+    def iter_by_ancestor_fee_rate(self):
+        """Yields valid entries from the highest ancestor fee rate to the lowest."""
+        for _, tx_hash in list(reversed(self._by_ancestor_fee_rate)):
+            yield self._entries[tx_hash]
+
+    def iter_txs(self):
+        """Yields (tx_hash, tx) for every valid and orphan transaction."""
+        for tx_hash, entry in self._entries.items():
+            yield tx_hash, entry.tx
+        for orphan in self._orphans:
+            yield orphan.tx_hash, orphan.tx
+
+    def get_spender(self, tx_hash: bytes, index: int) -> bytes | None:
+        """Returns the hash of the valid mempool transaction spending outpoint (`tx_hash`, `index`), if any."""
+        return self._spenders.get((tx_hash, index))
+
+    def get_conflicts(self, tx: Transaction) -> set[bytes]:
+        """Returns the hashes of the valid mempool transactions spending any of the outpoints `tx` spends."""
+        return {
+            spender for tx_in in tx.inputs
+            if (spender := self._spenders.get((tx_in.prev_tx_hash, tx_in.prev_index))) is not None
+        }
+
+    def get_available_utxos(self, confirmed_utxos: set[UTXO]) -> set[UTXO]:
+        """Returns `confirmed_utxos` not spent in the mempool, together with the unspent mempool outputs paying this node."""
+        available = {utxo for utxo in confirmed_utxos if (utxo.tx_hash, utxo.index) not in self._spenders}
+        available.update(utxo for outpoint, utxo in self._node_utxos.items() if outpoint not in self._spenders)
+        return available
+
+    def get_spent_utxos(self, confirmed_utxos: set[UTXO]) -> set[UTXO]:
+        """Returns `confirmed_utxos` already spent by a mempool transaction."""
+        return {utxo for utxo in confirmed_utxos if (utxo.tx_hash, utxo.index) in self._spenders}
 
     def get_all_orphan_tx(self) -> list[Transaction]:
-        return list(self._orphan_txs.values())
+        return [orphan.tx for orphan in self._orphans]
+
+    def get_fee_rate(self, tx_hash: bytes) -> float | None:
+        """Returns the fee rate (khets/KB) of a valid mempool transaction."""
+        if entry := self._entries.get(tx_hash):
+            return entry.fee_rate
+        return None
+    
+    def get_min_fee_rate(self) -> int:
+        """
+        Returns the minimum fee rate (khets/KB) for a transaction to be accepted into the mempool.
+        \nThis is the configured minimum, or the rolling minimum after evictions, which halves every `ROLLING_FEE_HALFLIFE`
+        (faster while the mempool is far from full).
+        \nThis only reads the rolling minimum, so it may be called from any thread.
+        """
+        return max(APP_CONFIG.get("node", "min_relay_fee_rate"), round(self._decayed_min_fee_rate(time.time())))
+
+    def _decayed_min_fee_rate(self, now: float) -> float:
+        """Returns the rolling minimum fee rate decayed until `now`, or 0 once it falls under half the configured minimum."""
+        if not self._rolling_min_fee_rate:
+            return 0
+        half_life = ROLLING_FEE_HALFLIFE
+        if self._total_size < self.get_max_size() / 4:
+            half_life /= 4
+        elif self._total_size < self.get_max_size() / 2:
+            half_life /= 2
+
+        fee_rate = self._rolling_min_fee_rate * 0.5 ** ((now - self._rolling_min_fee_updated) / half_life)
+        if fee_rate < APP_CONFIG.get("node", "min_relay_fee_rate") / 2:
+            return 0
+        return fee_rate
+
+    def _decay_min_fee_rate(self, now: float):
+        """Stores the rolling minimum fee rate decayed until `now`. Only called on the node loop, by `trim_to_size` and `expire`."""
+        self._rolling_min_fee_rate = self._decayed_min_fee_rate(now)
+        self._rolling_min_fee_updated = now
+
+    def get_max_size(self) -> int:
+        """Returns the maximum total size (B) of valid transactions."""
+        return APP_CONFIG.get("node", "max_mempool_size") * (1 << 20)
 
     def get_tx_time(self, tx_hash: bytes) -> int:
         """Returns the epoch time of when a transaction is added to the mempool, both valid and orphan."""
-        return self._time_log.get(tx_hash, 0)
+        if entry := self._entries.get(tx_hash) or self._orphans.get(tx_hash):
+            return entry.time
+        return 0
 
-    def get_total_fee(self) -> float:
-        return sum(tx.fee() for tx in self._valid_txs.values())
+    def get_total_fee(self) -> int:
+        return self._total_fee
     
-    def get_total_size(self) -> float:
-        if self._valid_txs:
-            return sum(len(tx.serialize()) for tx in self._valid_txs.values())
-        return 0
+    def get_total_size(self) -> int:
+        return self._total_size
     
     def get_no_tx(self):
-        return len(self._valid_txs.values())
+        return len(self._entries)
+
+    def get_stats(self) -> MempoolStats:
+        return MempoolStats(
+            count=len(self._entries),
+            size=self._total_size,
+            fee=self._total_fee,
+            orphan_count=len(self._orphans),
+            orphan_size=self._orphans.get_total_size(),
+            min_fee_rate=self.get_min_fee_rate(),
+            max_size=self.get_max_size(),
+            fee_rate_histogram=tuple(zip(FEE_RATE_BUCKETS, self._histogram_count, self._histogram_size)),
+        )
         
-    def remove_mined_txs(self, txs: list[Transaction]):
-        for tx in txs:
-            tx_hash = tx.hash()
-            if self._valid_txs.pop(tx_hash, None) is None:
-                self._orphan_txs.pop(tx_hash, None)
+    def remove_with_descendants(self, tx_hash: bytes) -> list[MempoolEntry]:
+        """Removes a valid transaction and every transaction spending from it. Returns the removed entries."""
+        to_remove = self.get_descendants(tx_hash) | {tx_hash}
+        # Descendants first, see `_remove_entry`
+        removed = [
+            self._remove_entry(removed_hash)
+            for removed_hash in sorted(to_remove, key=lambda removed_hash: self._entries[removed_hash].ancestor_count, reverse=True)
+        ]
+        return removed
+
+    def trim_to_size(self):
+        """
+        Evicts the transactions with the lowest descendant fee rate, with their descendants, until the mempool fits in its maximum size.
+        The rolling minimum fee rate is raised above the evicted rates, so that similar transactions are refused without verification.
+        """
+        max_size = self.get_max_size()
+        while self._total_size > max_size and (lowest := self._by_descendant_fee_rate.first()):
+            descendant_fee_rate, tx_hash = lowest
+            removed = self.remove_with_descendants(tx_hash)
+            log.info(f"Mempool full; evicted {len(removed)} txs with a fee rate of {descendant_fee_rate:.2f} khets/KB")
+
+            self._decay_min_fee_rate(time.time())
+            new_min_fee_rate = descendant_fee_rate + APP_CONFIG.get("node", "min_relay_fee_rate")
+            if new_min_fee_rate > self._rolling_min_fee_rate:
+                self._rolling_min_fee_rate = new_min_fee_rate
+
+    def expire(self, now: float | None = None):
+        """Removes the valid transactions (with their descendants) older than `MEMPOOL_EXPIRY`, and orphans older than `ORPHAN_TX_EXPIRY`."""
+        now = now or time.time()
+        cutoff = now - MEMPOOL_EXPIRY
+
+        expired = []
+        for entry_time, tx_hash in self._by_time:
+            if entry_time >= cutoff:
+                break
+            expired.append(tx_hash)
+        n_expired = 0
+        for tx_hash in expired:
+            if tx_hash in self._entries:
+                n_expired += len(self.remove_with_descendants(tx_hash))
+
+        n_expired_orphans = self._orphans.expire(now - ORPHAN_TX_EXPIRY)
+        if n_expired or n_expired_orphans:
+            log.info(f"Expired {n_expired} txs and {n_expired_orphans} orphans from the mempool.")
+
+        self._decay_min_fee_rate(now)
+
+    def remove_for_block(self, txs: list[Transaction]):
+        """
+        Updates the mempool for a newly connected block, after the UTXO set has been updated.
+        \nRemoves the mined transactions, and those spending the same outpoints as the block (found with the spend index)
+        together with their descendants,
+        and adopts the orphans whose missing parents were mined. Every other transaction is left as is, without revalidation.
+        """
+        tx_hashes = [tx.hash() for tx in txs]
+        for tx, tx_hash in zip(txs, tx_hashes):
+            if not self._remove_entry(tx_hash):  # Its parents are mined before it, so it has no ancestors left
+                self._orphans.remove(tx_hash)
+            if tx.is_coinbase():
+                continue
+
+            for tx_in in tx.inputs:
+                if conflict_hash := self._spenders.get((tx_in.prev_tx_hash, tx_in.prev_index)):
+                    log.info(f"Mempool tx <{conflict_hash.hex()}> conflicts with mined tx <{tx_hash.hex()}>. Removed with its descendants.")
+                    self.remove_with_descendants(conflict_hash)
+
+        self._adopt_orphans(tx_hashes)
         
     def revalidate_mempool(self):
         """
-        Used to completely revalidate every single transaction in the mempool. Used when blocks are added/removed
+        Used to completely revalidate every single transaction in the mempool. Used after blocks are disconnected in a reorg;
+        connected blocks are handled incrementally by `remove_for_block`.
         \nThis function should ONLY be called after the UTXO set has updated to the latest version.
+        Transactions keep the time they first arrived, so that revalidation does not postpone their expiry.
         """
-        all_txs = list(self._valid_txs.values()) + list(self._orphan_txs.values())
+        valid_entries = sorted(self._entries.values(), key=lambda entry: entry.time)
+        orphans = list(self._orphans)
+        for tx_hash in self._entries:
+            self.node.events.publish(TX_REMOVED, tx_hash=tx_hash, orphan=False)
+        for orphan in orphans:
+            self.node.events.publish(TX_REMOVED, tx_hash=orphan.tx_hash, orphan=True)
 
-        self.spent_mempool_utxos = set()
-        self.new_mempool_utxos_to_node = set()
+        self._spenders = dict()
+        self._node_utxos = dict()
         
-        self._valid_txs = dict()
-        self._orphan_txs = dict()
-        self._orphan_missing_utxo = dict()
-        self._orphan_registry = dict()
+        self._entries = dict()
+        self._by_fee_rate = SortedIndex()
+        self._by_ancestor_fee_rate = SortedIndex()
+        self._by_descendant_fee_rate = SortedIndex()
+        self._by_time = SortedIndex()
+        self._total_size = self._total_fee = 0
+        self._histogram_count = [0] * len(FEE_RATE_BUCKETS)
+        self._histogram_size = [0] * len(FEE_RATE_BUCKETS)
+        self.sequence += 1
+        self.last_removal_sequence = self.sequence
+        self._orphans = OrphanPool(on_remove=self._on_orphan_removed)
         
-        self._updated_valids = self._updated_orphans = 0
-        
-        for tx in all_txs:
-            self.add_tx(tx)
+        for entry in valid_entries:
+            self.add_tx(entry.tx, time_added=entry.time)
+        for orphan in orphans:
+            self.add_tx(orphan.tx, orphan.peer_id, orphan.time)
+        self.node.fee_estimator.retain(self._entries)
         
 
     def load_mempool(self):
-        raw_txs = load_mempool_lmdb()
-        for raw_tx in raw_txs:
+        # In order of arrival, so that parents are added before their children
+        saved_txs = sorted(load_mempool_lmdb(), key=lambda saved: saved[1])
+        for raw_tx, time_added in saved_txs:
             try:
                 tx = Transaction.parse(raw_tx)
-                self.add_tx(tx)
+                self.add_tx(tx, time_added=time_added)
             except:
                 pass
         
     def save_mempool(self):
-        txs = list(self._valid_txs.values()) + list(self._orphan_txs.values())
-        raw_txs = [tx.serialize() for tx in txs]
-        save_mempool_lmdb(raw_txs)
-        
-        
-    # Modifiers for transient GUI variables
-    def check_update_valids(self, i=1):
-        """
-        Checks if any transactions were added or removd from self._mempool from the last time this function was called.
-        \n`i` is used as an ID for different frames.
-        """
-        updated = (self._updated_valids >> i) & 1 == 0
-        self._updated_valids |= (1 << i)
-        return updated
+        """Saves the valid and orphan transactions with the time they arrived, so that they still expire after a restart."""
+        saved_txs = [(entry.tx.serialize(), entry.time) for entry in sorted(self._entries.values(), key=lambda entry: entry.time)]
+        saved_txs += [(orphan.tx.serialize(), orphan.time) for orphan in self._orphans]
+        save_mempool_lmdb(saved_txs)
 
-    def check_update_orphans(self, i=1):
-        """
-        Checks if any transactions were added or removd from self._orphan_txs from the last time this function was called.
-        \n`i` is used as an ID for different frames.
-        """
-        updated = (self._updated_orphans >> i) & 1 == 0
-        self._updated_orphans |= (1 << i)
-        return updated
-    
-    def check_update_mempool(self, i=1):
-        update_valids = self.check_update_valids(i)
-        update_orphans = self.check_update_orphans(i)
-        return update_valids or update_orphans
\ No newline at end of file
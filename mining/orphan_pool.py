@@ -0,0 +1,124 @@
+import logging
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from blockchain.transaction import Transaction
+from mining.constants import MAX_ORPHAN_TX_SIZE, MAX_ORPHAN_TXS, MAX_ORPHAN_TXS_PER_PEER
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(eq=False, slots=True)
+class OrphanEntry:
+    """A transaction spending outputs of transactions which are neither confirmed nor in the mempool."""
+    tx: Transaction
+    tx_hash: bytes
+    size: int
+    time: int
+    peer_id: int | None  # Session ID of the peer it came from, None if local
+    missing: set[bytes] = field(default_factory=set)  # Hashes of the parent transactions still unknown
+
+
+class OrphanPool:
+    """
+    Bounded store of orphan transactions, indexed by the parents they wait for.
+
+    At most `MAX_ORPHAN_TXS_PER_PEER` orphans are kept from each peer and `MAX_ORPHAN_TXS` in total,
+    with random eviction beyond either, so that no peer can predict or choose which orphans are dropped.
+    \n`on_remove` is called with the hash of every orphan removed, for any reason.
+    """
+    def __init__(self, on_remove: Callable[[bytes], None] | None = None):
+        self.on_remove = on_remove
+        self._entries: dict[bytes, OrphanEntry] = dict()
+        self._by_parent: dict[bytes, set[bytes]] = dict()  # Missing parent tx_hash to the orphans waiting for it
+        self._by_peer: dict[int, set[bytes]] = dict()
+        self._total_size: int = 0
+
+    def add(self, tx: Transaction, tx_hash: bytes, missing: set[bytes], time: int, peer_id: int | None = None) -> bool:
+        """Stores an orphan waiting for the `missing` parents. Returns False if it is already stored or too large to keep."""
+        if tx_hash in self._entries:
+            return False
+        size = tx.size()
+        if size > MAX_ORPHAN_TX_SIZE:
+            log.info(f"Orphan <{tx_hash.hex()}> not stored, as it is too large ({size}B)")
+            return False
+
+        if peer_id is not None and len(self._by_peer.get(peer_id, ())) >= MAX_ORPHAN_TXS_PER_PEER:
+            self.remove(random.choice(list(self._by_peer[peer_id])))
+        if len(self._entries) >= MAX_ORPHAN_TXS:
+            evicted_hash = random.choice(list(self._entries))
+            log.info(f"Orphan pool full; evicted <{evicted_hash.hex()}>")
+            self.remove(evicted_hash)
+
+        self._entries[tx_hash] = OrphanEntry(tx, tx_hash, size, time, peer_id, set(missing))
+        for parent_hash in missing:
+            self._by_parent.setdefault(parent_hash, set()).add(tx_hash)
+        if peer_id is not None:
+            self._by_peer.setdefault(peer_id, set()).add(tx_hash)
+        self._total_size += size
+        return True
+
+    def remove(self, tx_hash: bytes) -> OrphanEntry | None:
+        entry = self._entries.pop(tx_hash, None)
+        if entry is None:
+            return None
+
+        for parent_hash in entry.missing:
+            children = self._by_parent[parent_hash]
+            children.discard(tx_hash)
+            if not children:
+                del self._by_parent[parent_hash]
+        if entry.peer_id is not None:
+            peer_orphans = self._by_peer[entry.peer_id]
+            peer_orphans.discard(tx_hash)
+            if not peer_orphans:
+                del self._by_peer[entry.peer_id]
+        self._total_size -= entry.size
+        if self.on_remove:
+            self.on_remove(tx_hash)
+        return entry
+
+    def pop_ready(self, parent_hash: bytes) -> list[OrphanEntry]:
+        """
+        Marks `parent_hash` as no longer missing.
+        \nRemoves and returns the orphans which were waiting for it and have no missing parents left, in order of arrival.
+        """
+        ready = []
+        for tx_hash in self._by_parent.pop(parent_hash, ()):
+            entry = self._entries[tx_hash]
+            entry.missing.discard(parent_hash)
+            if not entry.missing:
+                ready.append(self.remove(tx_hash))
+        ready.sort(key=lambda entry: entry.time)
+        return ready
+
+    def remove_for_peer(self, peer_id: int) -> int:
+        """Removes every orphan received from a peer. Returns how many were removed."""
+        tx_hashes = self._by_peer.get(peer_id, set()).copy()
+        for tx_hash in tx_hashes:
+            self.remove(tx_hash)
+        return len(tx_hashes)
+
+    def expire(self, cutoff: float) -> int:
+        """Removes the orphans received before `cutoff`. Returns how many were removed."""
+        # Orphans re-added after a reorg or restart keep their original time, so they are not in order of time
+        expired = [tx_hash for tx_hash, entry in self._entries.items() if entry.time < cutoff]
+        for tx_hash in expired:
+            self.remove(tx_hash)
+        return len(expired)
+
+    def get(self, tx_hash: bytes) -> OrphanEntry | None:
+        return self._entries.get(tx_hash)
+
+    def get_total_size(self) -> int:
+        return self._total_size
+
+    def __contains__(self, tx_hash: bytes) -> bool:
+        return tx_hash in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[OrphanEntry]:
+        return iter(list(self._entries.values()))
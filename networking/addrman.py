@@ -0,0 +1,343 @@
+"""
+In-memory address manager, loosely following Bitcoin Core's `addrman`.
+
+Addresses we have only heard about live in the "new" table, and addresses we have successfully connected to
+are moved to the "tried" table. Each table is split into buckets chosen by a keyed hash of the address' network group
+(and, for new addresses, the group of the peer that sent it), so that a single peer or network cannot fill the table.
+
+Addresses are kept in memory and written to peers.db in batched snapshots through one long-lived connection.
+"""
+
+import hashlib
+import ipaddress
+from itertools import islice
+import logging
+import os
+import random
+import time
+
+import aiosqlite
+
+from db.peers import PeerMeta, load_all_peers, open_peers_db, save_peers
+from networking.constants import ADDRMAN_BUCKET_SIZE, ADDRMAN_HORIZON, ADDRMAN_MAX_FAILURES, ADDRMAN_NEW_BUCKETS, ADDRMAN_TRIED_BUCKETS
+from utils.ip import ip_bytes_to_str
+
+log = logging.getLogger(__name__)
+
+
+class AddrInfo:
+    __slots__ = ("ip", "port", "name", "added", "last_seen", "services", "tried", "last_try", "last_success", "attempts")
+
+    def __init__(self, ip: str, port: int, name: str, added: int, last_seen: int, services: int, tried: bool = False):
+        self.ip = ip
+        self.port = port
+        self.name = name
+        self.added = added
+        self.last_seen = last_seen
+        self.services = services
+        self.tried = tried
+
+        # Connection attempts, only kept for this session
+        self.last_try: float = 0
+        self.last_success: float = 0
+        self.attempts: int = 0
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return (self.ip, self.port)
+
+    def is_terrible(self, now: float) -> bool:
+        """Returns True if the address is not worth keeping, and should be the first to be evicted."""
+        if self.last_try and now - self.last_try < 60:  # Never evict an address that was just tried
+            return False
+        if self.last_seen > now + 600:  # Timestamp from the future
+            return True
+        if self.last_seen and now - self.last_seen > ADDRMAN_HORIZON:
+            return True
+        return self.attempts >= ADDRMAN_MAX_FAILURES and now - self.last_success > 7 * 86400
+
+    def chance(self, now: float) -> float:
+        """Relative chance of the address being selected, lowered after recent or repeated failed attempts."""
+        chance = 1.0
+        if now - self.last_try < 600:
+            chance *= 0.01
+        return chance * 0.66 ** min(self.attempts, 8)
+
+
+class _IndexedSet:
+    """A set of address keys supporting O(1) insertion, removal and uniform random choice."""
+    def __init__(self):
+        self._items: list[tuple[str, int]] = []
+        self._index: dict[tuple[str, int], int] = dict()
+
+    def add(self, key: tuple[str, int]):
+        if key not in self._index:
+            self._index[key] = len(self._items)
+            self._items.append(key)
+
+    def discard(self, key: tuple[str, int]):
+        index = self._index.pop(key, None)
+        if index is None:
+            return
+        last = self._items.pop()
+        if index < len(self._items):  # Move the last item into the freed slot
+            self._items[index] = last
+            self._index[last] = index
+
+    def choice(self) -> tuple[str, int]:
+        return random.choice(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class AddrMan:
+    def __init__(self):
+        self._key = os.urandom(16)  # Random key so that peers cannot predict which bucket an address lands in
+        self.entries: dict[tuple[str, int], AddrInfo] = dict()
+
+        self._new = _IndexedSet()
+        self._tried = _IndexedSet()
+        self._new_buckets: dict[int, set[tuple[str, int]]] = dict()
+        self._tried_buckets: dict[int, set[tuple[str, int]]] = dict()
+        self._bucket_of: dict[tuple[str, int], int] = dict()
+
+        # Changes since the last snapshot to peers.db
+        self._dirty: set[tuple[str, int]] = set()
+        self._removed: set[tuple[str, int]] = set()
+        self.db: aiosqlite.Connection | None = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def new_count(self) -> int:
+        return len(self._new)
+
+    @property
+    def tried_count(self) -> int:
+        return len(self._tried)
+
+    # Bucketing
+    def _hash(self, *parts) -> int:
+        data = b"|".join(str(part).encode() for part in parts)
+        return int.from_bytes(hashlib.blake2b(data, key=self._key, digest_size=8).digest(), "big")
+
+    @staticmethod
+    def _group(ip: str) -> str:
+        """The network group of `ip`: its /16 for IPv4, or its /32 for IPv6."""
+        if ":" not in ip:
+            return ip.rsplit(".", 2)[0]
+        try:
+            ip_obj = ipaddress.ip_address(ip)
+        except ValueError:
+            return ip
+        return ip_obj.packed[:4].hex()
+
+    def _new_bucket(self, key: tuple[str, int], source: str) -> int:
+        # Addresses from one source group spread over at most 64 buckets
+        group, source_group = self._group(key[0]), self._group(source)
+        return self._hash("new", source_group, self._hash(group, source_group) % 64) % ADDRMAN_NEW_BUCKETS
+
+    def _tried_bucket(self, key: tuple[str, int]) -> int:
+        # Addresses from one group spread over at most 8 buckets
+        return self._hash("tried", self._group(key[0]), self._hash(*key) % 8) % ADDRMAN_TRIED_BUCKETS
+
+    def _insert(self, info: AddrInfo, bucket: int):
+        """Places `info` in `bucket` of its table, evicting another address first if the bucket is full."""
+        key = info.key
+        buckets = self._tried_buckets if info.tried else self._new_buckets
+        entries = buckets.setdefault(bucket, set())
+        if len(entries) >= ADDRMAN_BUCKET_SIZE:
+            self._evict_from(entries, time.time())
+
+        entries.add(key)
+        self._bucket_of[key] = bucket
+        (self._tried if info.tried else self._new).add(key)
+        self.entries[key] = info
+        self._dirty.add(key)
+
+    def _evict_from(self, bucket: set[tuple[str, int]], now: float):
+        """Evicts a terrible address from a few in a full `bucket`, or otherwise the least recently seen of them."""
+        candidates = [self.entries[key] for key in islice(bucket, 8)]
+        victim = min(candidates, key=lambda info: (not info.is_terrible(now), info.last_seen)).key
+
+        info = self.entries[victim]
+        if info.tried:
+            # Evicted tried addresses get another chance in the new table
+            self._unlink(info)
+            info.tried = False
+            self._insert(info, self._new_bucket(victim, victim[0]))
+        else:
+            self._remove(info)
+
+    def _unlink(self, info: AddrInfo):
+        key = info.key
+        buckets = self._tried_buckets if info.tried else self._new_buckets
+        bucket = self._bucket_of.pop(key, None)
+        if bucket is not None:
+            buckets[bucket].discard(key)
+        (self._tried if info.tried else self._new).discard(key)
+
+    def _remove(self, info: AddrInfo):
+        self._unlink(info)
+        key = info.key
+        del self.entries[key]
+        self._dirty.discard(key)
+        if info.name == "Peer":  # Addresses named by the user stay in peers.db until they remove them
+            self._removed.add(key)
+
+    # Public interface
+    def add(self, addresses: list[tuple], source: str, name: str = "Peer") -> int:
+        """
+        Adds addresses from an `AddrMessage` (timestamp, services, ip, port) sent by the peer at `source`.
+        \nAddresses saved by the user are given their `name`, which is also set on addresses already known.
+        Returns the number of addresses that were new.
+        """
+        now = int(time.time())
+        added = 0
+        for timestamp, services, ip, port in addresses:
+            ip = ip_bytes_to_str(ip)
+            if not ip:
+                continue
+
+            if timestamp > now + 600:  # Don't trust timestamps from the future
+                timestamp = now - 5 * 86400
+
+            key = (ip, port)
+            info = self.entries.get(key)
+            if info:
+                if timestamp > info.last_seen or services != info.services or (name != "Peer" and name != info.name):
+                    info.last_seen = max(info.last_seen, timestamp)
+                    info.services = services
+                    if name != "Peer":
+                        info.name = name
+                    self._dirty.add(key)
+                continue
+
+            info = AddrInfo(ip, port, name, now, timestamp, services)
+            self._insert(info, self._new_bucket(key, source))
+            self._removed.discard(key)
+            added += 1
+
+        return added
+
+    def remove(self, ip: str, port: int):
+        """Forgets the address, also deleting it from peers.db on the next flush, e.g. when the user removes it."""
+        if info := self.entries.get((ip, port)):
+            self._unlink(info)
+            del self.entries[info.key]
+            self._dirty.discard(info.key)
+        self._removed.add((ip, port))
+
+    def attempt(self, ip: str, port: int):
+        """Records a connection attempt to the address."""
+        if info := self.entries.get((ip, port)):
+            info.last_try = time.time()
+            info.attempts += 1
+
+    def good(self, ip: str, port: int, services: int):
+        """Records a successful outbound connection, moving the address into the tried table."""
+        key = (ip, port)
+        now = time.time()
+        info = self.entries.get(key)
+        if info is None:
+            info = AddrInfo(ip, port, "Peer", int(now), int(now), services)
+            self._removed.discard(key)
+        else:
+            self._unlink(info)
+
+        info.last_success = now
+        info.last_seen = int(now)
+        info.services = services
+        info.attempts = 0
+        info.tried = True
+        self._insert(info, self._tried_bucket(key))
+
+    def connected(self, ip: str, port: int, last_seen: int):
+        """Updates when the address was last heard from, e.g. when the connection to it closes."""
+        key = (ip, port)
+        if (info := self.entries.get(key)) and last_seen > info.last_seen:
+            info.last_seen = last_seen
+            self._dirty.add(key)
+
+    def select(self, new_only: bool = False) -> AddrInfo | None:
+        """
+        Chooses an address to connect to, from either table with equal probability.
+        \nAddresses that were recently tried or keep failing are less likely to be chosen.
+        """
+        if not self._new and (new_only or not self._tried):
+            return None
+
+        now = time.time()
+        factor = 1.0
+        while True:
+            use_tried = self._tried and (new_only is False) and (not self._new or random.random() < 0.5)
+            key = (self._tried if use_tried else self._new).choice()
+            info = self.entries[key]
+            if random.random() < info.chance(now) * factor:
+                return info
+            factor *= 1.2
+
+    def get_addresses(self, count: int, max_age: int) -> list[AddrInfo]:
+        """Returns up to `count` distinct random addresses seen within the last `max_age` seconds, to answer `getaddr`."""
+        min_last_seen = time.time() - max_age
+        keys = list(self.entries) if len(self.entries) <= 4 * count else None
+        result: dict[tuple[str, int], AddrInfo] = dict()
+
+        # Sample a few times more than needed rather than shuffling the whole table
+        for _ in range(4 * count):
+            if len(result) >= count or not self.entries:
+                break
+            if keys is not None:
+                if not keys:
+                    break
+                key = keys.pop(random.randrange(len(keys)))
+            else:
+                key = (self._tried if self._tried and random.random() < 0.5 else self._new).choice()
+
+            info = self.entries[key]
+            if info.last_seen > min_last_seen:
+                result[key] = info
+
+        return list(result.values())
+
+    # Persistence
+    async def open(self):
+        """Opens peers.db and loads every saved address."""
+        self.db = await open_peers_db()
+        now = time.time()
+        for peer_meta in await load_all_peers(self.db):
+            info = AddrInfo(peer_meta.ip, peer_meta.port, peer_meta.name, peer_meta.added, peer_meta.last_seen, peer_meta.services, peer_meta.tried)
+            if info.is_terrible(now) and info.name == "Peer":
+                self._removed.add(info.key)
+                continue
+            bucket = self._tried_bucket(info.key) if info.tried else self._new_bucket(info.key, info.ip)
+            self._insert(info, bucket)
+
+        self._dirty.clear()
+        log.info(f"Address manager loaded {len(self._new)} new and {len(self._tried)} tried addresses.")
+
+    async def flush(self):
+        """Writes every address changed since the last flush to peers.db in a single batch."""
+        if self.db is None or not (self._dirty or self._removed):
+            return
+
+        dirty = [self.entries[key] for key in self._dirty]
+        removed = list(self._removed)
+        self._dirty.clear()
+        self._removed.clear()
+
+        await save_peers(
+            self.db,
+            [PeerMeta(0, info.name, info.ip, info.port, info.added, info.last_seen, info.services, info.tried) for info in dirty],
+            removed
+        )
+        log.debug(f"Address manager saved {len(dirty)} and removed {len(removed)} addresses.")
+
+    async def close(self):
+        if self.db is None:
+            return
+        await self.flush()
+        await self.db.close()
+        self.db = None
@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+
+from networking.messages.envelope import MessageEnvelope
+from networking.messages.types.block import BlockMessage
+
+
+class BlockCache:
+    """
+    LRU of ready-to-send `block` envelopes for the most recently connected blocks.
+
+    Peers request a new block within seconds of it being announced, so serving it from here skips
+    the database and block file reads, and each envelope is serialized only once (see `MessageEnvelope.serialize`).
+    \nThread-safe, as mined blocks are connected from the GUI thread.
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self._envelopes: OrderedDict[bytes, MessageEnvelope] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def add(self, block_hash: bytes, block_raw: bytes):
+        envelope = MessageEnvelope(BlockMessage(block_raw))
+        with self._lock:
+            self._envelopes[block_hash] = envelope
+            self._envelopes.move_to_end(block_hash)
+            while len(self._envelopes) > self.size:
+                self._envelopes.popitem(last=False)
+
+    def get(self, block_hash: bytes) -> MessageEnvelope | None:
+        with self._lock:
+            envelope = self._envelopes.get(block_hash)
+            if envelope is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._envelopes.move_to_end(block_hash)
+            return envelope
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def __len__(self):
+        return len(self._envelopes)
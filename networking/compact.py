@@ -0,0 +1,95 @@
+"""
+Compact block relay, loosely following BIP152.
+
+A new block is sent as its header, a 6B short ID per transaction and the prefilled coinbase.
+The receiver rebuilds the block from its own mempool, and only requests the transactions it is missing with `getblocktxn`.
+
+Short IDs use keyed BLAKE2b instead of SipHash, keyed with the block header and a random nonce
+so that colliding transactions cannot be crafted in advance.
+"""
+
+import hashlib
+import random
+
+from blockchain.block import Block
+from blockchain.header import Header
+from blockchain.transaction import Transaction
+from crypto.hashing import HASH256
+from networking.constants import SHORT_ID_SIZE
+from networking.messages.types.cmpctblock import CmpctBlockMessage
+from utils.helper import int_to_bytes
+
+
+def short_id_key(header: bytes, nonce: int) -> bytes:
+    return HASH256(header + int_to_bytes(nonce, 8))[:16]
+
+
+def short_id(key: bytes, tx_hash: bytes) -> bytes:
+    return hashlib.blake2b(tx_hash, key=key, digest_size=SHORT_ID_SIZE).digest()
+
+
+def build_compact_block(block: Block) -> CmpctBlockMessage:
+    """Builds a `cmpctblock` for `block`, prefilling only the coinbase transaction."""
+    header = block.header.serialize()
+    nonce = random.getrandbits(64)
+    key = short_id_key(header, nonce)
+
+    txs = block.get_transactions()
+    short_ids = [short_id(key, tx_hash) for tx_hash in block.get_tx_hashes()[1:]]
+    return CmpctBlockMessage(header, nonce, short_ids, [(0, txs[0])])
+
+
+class PartialBlock:
+    """
+    A block being reconstructed from a `cmpctblock` and the transactions in the local mempool.
+    \nRaises `ValueError` if the compact block is malformed or has colliding short IDs; the full block should be requested instead.
+    """
+    def __init__(self, msg: CmpctBlockMessage, mempool, peer):
+        self.header = Header.parse(msg.header)
+        self.block_hash = self.header.hash()
+        self.peer = peer
+
+        self.txs: list[Transaction | None] = [None] * msg.tx_count
+        for index, tx in msg.prefilled:
+            if index >= msg.tx_count:
+                raise ValueError(f"Prefilled transaction index {index} out of range")
+            self.txs[index] = tx
+
+        # Map each short ID to the position of its transaction in the block
+        key = short_id_key(msg.header, msg.nonce)
+        empty_slots = (i for i, tx in enumerate(self.txs) if tx is None)
+        slots: dict[bytes, int] = dict()
+        for sid, index in zip(msg.short_ids, empty_slots):
+            if sid in slots:
+                raise ValueError("Short ID collision within compact block")
+            slots[sid] = index
+
+        for tx_hash, tx in mempool.iter_txs():
+            index = slots.get(short_id(key, tx_hash))
+            if index is not None and self.txs[index] is None:
+                self.txs[index] = tx
+
+    @property
+    def missing(self) -> list[int]:
+        """Block indexes of transactions not found in the mempool."""
+        return [i for i, tx in enumerate(self.txs) if tx is None]
+
+    def fill(self, txs: list[Transaction]) -> bool:
+        """Fills the missing transactions, in order, with `txs` from a `blocktxn`. Returns False if the count doesn't match."""
+        missing = self.missing
+        if len(missing) != len(txs):
+            return False
+        for index, tx in zip(missing, txs):
+            self.txs[index] = tx
+        return True
+
+    def to_block(self) -> Block | None:
+        """Returns the reconstructed block, or None if it is incomplete or its merkle root doesn't match the header."""
+        if any(tx is None for tx in self.txs):
+            return None
+
+        header = self.header
+        block = Block(header.version, header.prev_block, header.timestamp, header.bits, header.nonce, self.txs)
+        if block.merkle_root != header.merkle_root:
+            return None
+        return block
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import random
+import time
+
+from networking.constants import CONNMAN_INTERVAL, DIAL_BACKOFF_BASE, DIAL_BACKOFF_MAX, MAX_PARALLEL_DIALS, PEER_EVICTION_MIN_AGE
+from networking.peer import Peer
+from utils.config import APP_CONFIG
+
+log = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """
+    Keeps the node connected to `max_outbound_peers` outbound peers, and limits inbound peers to `max_inbound_peers`.
+
+    Missing outbound slots are refilled with addresses from the address manager as soon as a peer disconnects,
+    dialing up to `MAX_PARALLEL_DIALS` addresses at once. Addresses that fail are retried with exponential backoff.
+    """
+    def __init__(self, node):
+        self.node = node
+        self.max_outbound: int = APP_CONFIG.get("node", "max_outbound_peers")
+        self.max_inbound: int = APP_CONFIG.get("node", "max_inbound_peers")
+
+        self.pending: set[tuple[str, int]] = set()  # Addresses being dialed
+        self._backoff: dict[tuple[str, int], tuple[float, int]] = dict()  # Address to (next allowed dial, failures)
+        self._dial_slots = asyncio.Semaphore(MAX_PARALLEL_DIALS)
+        self._wakeup = asyncio.Event()
+
+    @property
+    def outbound_count(self) -> int:
+        return sum(1 for peer in self.node.peers if peer.direction == "outbound")
+
+    @property
+    def inbound_count(self) -> int:
+        return sum(1 for peer in self.node.peers if peer.direction == "inbound")
+
+    def can_accept_inbound(self) -> bool:
+        return self.inbound_count < self.max_inbound
+
+    def can_connect_outbound(self) -> bool:
+        return self.outbound_count < self.max_outbound
+
+    def select_inbound_to_evict(self) -> Peer | None:
+        """
+        Returns the lowest scoring inbound peer to make room for a newcomer, or None if every inbound peer
+        is too new to have been judged.
+        """
+        candidates = [
+            peer for peer in self.node.peers
+            if peer.direction == "inbound" and peer.connection_time >= PEER_EVICTION_MIN_AGE
+        ]
+        return min(candidates, key=lambda peer: peer.stats.score(), default=None)
+
+    def on_peer_removed(self, peer: Peer):
+        if peer.direction == "outbound":
+            self._wakeup.set()
+
+    async def run(self):
+        """Running loop to refill outbound slots, woken up early whenever an outbound peer disconnects or a dial fails."""
+        while True:
+            self._fill_outbound()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=CONNMAN_INTERVAL)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _fill_outbound(self):
+        missing = self.max_outbound - self.outbound_count - len(self.pending)
+        if missing <= 0 or not len(self.node.addrman):
+            return
+
+        now = time.time()
+        connected = {(peer.ip, peer.port) for peer in self.node.peers}
+        own_addr = (self.node.external_ip, self.node.port)
+        initial = not self.node.peers  # Ask the first peers for their mempool
+
+        # The address manager favours addresses which haven't failed recently, so a few tries are enough
+        for _ in range(10 * missing):
+            if missing <= 0:
+                break
+
+            info = self.node.addrman.select()
+            if info is None:
+                break
+
+            addr = info.key
+            if addr in self.pending or addr in connected or addr == own_addr:
+                continue
+            if self._backoff.get(addr, (0, 0))[0] > now:
+                continue
+
+            self.pending.add(addr)
+            self.node.spawn(self._dial(addr, info.name, initial))
+            missing -= 1
+
+    async def _dial(self, addr: tuple[str, int], name: str, initial: bool):
+        success = False
+        try:
+            async with self._dial_slots:
+                success = await self.node._connect_to_peer(addr, name, initial=initial)
+        finally:
+            self.pending.discard(addr)
+            if success:
+                self._backoff.pop(addr, None)
+            else:
+                self._record_failure(addr)
+                self._wakeup.set()  # Try another address straight away
+
+    def _record_failure(self, addr: tuple[str, int]):
+        _, failures = self._backoff.get(addr, (0, 0))
+        failures += 1
+        delay = min(DIAL_BACKOFF_BASE * 2 ** (failures - 1), DIAL_BACKOFF_MAX)
+        self._backoff[addr] = (time.time() + delay * random.uniform(0.5, 1), failures)
@@ -9,9 +9,10 @@ NETWORK_PORT = 8666
 
 PROTOCOL_VERSION = 201  # Current Khetcoin protocol version
 
-_SVC_FULL = 0x01  # Full node
-_SVC_BETA = 0x08  # Beta node (Khetcoin v0.x.x)
-SERVICES = _SVC_FULL | _SVC_BETA
+_SVC_FULL = 0x01      # Full node
+_SVC_BETA = 0x08      # Beta node (Khetcoin v0.x.x)
+_SVC_COMPRESS = 0x10  # Supports zlib compressed payloads (see `COMPRESSIBLE_COMMANDS`)
+SERVICES = _SVC_FULL | _SVC_BETA | _SVC_COMPRESS
 
 USER_AGENT = b"/Khetcoin:0.1/"
 ####################################
@@ -21,18 +22,57 @@ CONNECTION_TIMEOUT = 10
 PING_TIMEOUT = 10
 MAX_PEERS = 8
 
+# Outbound connection manager (see `networking.connman`)
+MAX_PARALLEL_DIALS = 4    # Max no. of outbound connection attempts at once
+DIAL_BACKOFF_BASE = 10    # Seconds before retrying an address after its first failed attempt, doubled per failure
+DIAL_BACKOFF_MAX = 3600   # Max seconds before retrying an address
+CONNMAN_INTERVAL = 5      # Seconds between checks for missing outbound peers
 
-MAX_MESSAGE_SIZE = 8 * (1 << 10)  # Maximum allowable payload size (bytes) for messages = 8MB
+# Peer performance scoring (see `networking.peer_stats`)
+PEER_STATS_WINDOW = 32       # No. of recent samples kept per statistic
+PEER_STATS_INTERVAL = 10     # Seconds between receive rate samples
+INVALID_DATA_WINDOW = 3600   # Seconds that invalid data counts against a peer's score
+PEER_EVICTION_MIN_AGE = 60   # Seconds an inbound peer must be connected before it can be evicted for a newcomer
+
+# Bandwidth limits (see `max_upload_rate`, `upload_target` etc. in config.json)
+HISTORICAL_BLOCK_DEPTH = 144  # Blocks this deep below the tip are served as bulk traffic, subject to upload limits
+UPLOAD_TARGET_CYCLE = 86400   # Seconds per `upload_target` cycle
+
+
+MAX_MESSAGE_SIZE = 8 * (1 << 20)  # Maximum allowable payload size (bytes) for messages = 8MB
 MAX_TIME_DELTA = 10  # Maximum default allowable time differential (seconds) for messages
 
+# Payload compression, used only when both peers advertise `_SVC_COMPRESS`
+COMPRESSIBLE_COMMANDS = {b"block", b"headers", b"inv"}
+COMPRESSION_THRESHOLD = 1024  # Min payload size (bytes) worth compressing
+COMPRESSION_LEVEL = 6
+
 ADDR_LIMIT = 100  # Max no. of addresses allowed to be received in ADDR messages
 INV_LIMIT = 10_000
 
-GETADDR_LIMIT = 8  # Max no. of active addr to retrieve randomly from peers.db
+PEER_KNOWN_INVENTORY_SIZE = 50_000  # No. of recent inventory hashes remembered per peer
+INV_TRICKLE_INBOUND = 5   # Average delay (seconds) between batched tx announcements to inbound peers
+INV_TRICKLE_OUTBOUND = 2  # Average delay (seconds) between batched tx announcements to outbound peers
+
+TX_REQUEST_TIMEOUT = 20     # Seconds to wait for a requested tx before requesting it from another peer
+BLOCK_REQUEST_TIMEOUT = 60  # Seconds without block deliveries before requesting blocks from another peer
+
+GETADDR_LIMIT = 8  # Max no. of active addr to retrieve randomly from the address manager
 GETBLOCKS_LIMIT = 500
 GETHEADERS_LIMIT = 400
 
+# Address manager (see `networking.addrman`)
+ADDRMAN_NEW_BUCKETS = 256     # Buckets for addresses heard about but never connected to
+ADDRMAN_TRIED_BUCKETS = 64    # Buckets for addresses we have successfully connected to
+ADDRMAN_BUCKET_SIZE = 64      # Max no. of addresses per bucket
+ADDRMAN_HORIZON = 30 * 86400  # Addresses not seen for this long (seconds) are evicted first
+ADDRMAN_MAX_FAILURES = 3      # Failed attempts after which an address never connected to is evicted first
+ADDRMAN_FLUSH_INTERVAL = 300  # Seconds between snapshots of the address manager to peers.db
+
 TX_TYPE = 0x01
 BLOCK_TYPE = 0x02
 
+SHORT_ID_SIZE = 6       # Bytes per transaction short ID in compact blocks
+MAX_PARTIAL_BLOCKS = 8  # Max no. of compact blocks waiting on `blocktxn` at once
+
 
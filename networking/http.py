@@ -0,0 +1,160 @@
+"""
+Minimal asyncio HTTP/1.1 server used by the JSON-RPC and REST servers, supporting keep-alive connections,
+chunked responses and basic auth.
+"""
+
+import asyncio
+import base64
+import hmac
+import logging
+from http import HTTPStatus
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+MAX_HEADER_SIZE = 8 * 1024
+MAX_BODY_SIZE = 32 * (1 << 20)
+KEEP_ALIVE_TIMEOUT = 30  # Seconds to wait for the next request on an idle connection
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class HTTPRequest:
+    __slots__ = ("method", "path", "version", "headers", "body")
+
+    def __init__(self, method: str, path: str, version: str, headers: dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers  # Lowercase names
+        self.body = body
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+async def read_request(reader: asyncio.StreamReader) -> HTTPRequest | None:
+    """Reads one request from `reader`. Returns None if the client closed the connection first."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+    if len(head) > MAX_HEADER_SIZE:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = dict()
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length < 0 or length > MAX_BODY_SIZE:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+    body = await reader.readexactly(length) if length else b""
+    return HTTPRequest(method, path, version, headers, body)
+
+
+def build_response_head(
+    status: HTTPStatus,
+    content_type: str = "text/plain",
+    keep_alive: bool = True,
+    headers: dict[str, str] | None = None
+) -> bytes:
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def build_response(
+    status: HTTPStatus,
+    body: bytes = b"",
+    content_type: str = "text/plain",
+    keep_alive: bool = True,
+    headers: dict[str, str] | None = None
+) -> bytes:
+    headers = {"Content-Length": str(len(body)), **(headers or {})}
+    return build_response_head(status, content_type, keep_alive, headers) + body
+
+
+def build_chunk(data: bytes) -> bytes:
+    """Frames `data` for a response sent with `Transfer-Encoding: chunked`. An empty chunk ends the response."""
+    return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+
+def check_basic_auth(request: HTTPRequest, user: str, password: str) -> bool:
+    """Returns True if `request` carries the given basic auth credentials, or if no password is set."""
+    if not password:
+        return True
+    scheme, _, encoded = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        credentials = base64.b64decode(encoded)
+    except (ValueError, UnicodeDecodeError):
+        return False
+    # Compared as bytes, as `compare_digest` only accepts ASCII strings
+    return hmac.compare_digest(credentials, f"{user}:{password}".encode())
+
+
+Handler = Callable[[HTTPRequest, asyncio.StreamWriter], Awaitable[bool]]
+
+
+def http_connection_handler(handler: Handler, name: str = "HTTP"):
+    """
+    Wraps `handler` into a callback for `asyncio.start_server`, serving requests until the client disconnects.
+    \n`handler` writes its response and returns whether the connection may be kept alive.
+    """
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), timeout=KEEP_ALIVE_TIMEOUT)
+                except HTTPError as e:
+                    writer.write(build_response(e.status, str(e).encode(), keep_alive=False))
+                    await writer.drain()
+                    break
+
+                if request is None:
+                    break
+                if not await handler(request, writer) or not request.keep_alive:
+                    break
+
+        except (TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            log.exception(f"[{name}] Error serving {peer}: {e}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    return on_connection
@@ -0,0 +1,126 @@
+"""
+Shared encoders/decoders for vector messages (inv, getdata, notfound, headers, addr).
+
+Payloads are built into a single preallocated `bytearray` with `struct.pack_into`,
+and parsed by slicing a `memoryview` over the remaining payload instead of issuing
+one `stream.read` per field. All integers are big-endian, like the rest of Khetcoin.
+"""
+
+import struct
+from io import BytesIO
+from typing import BinaryIO, Iterable
+
+from utils.helper import encode_varint
+
+
+INV_ITEM = struct.Struct(">I32s")        # inv_type (4B) + inv_hash (32B)
+ADDR_ITEM = struct.Struct(">IQ16sH")     # timestamp (4B) + services (8B) + ip (16B) + port (2B)
+HEADER_SIZE = 80
+HEADER_ITEM_SIZE = HEADER_SIZE + 1       # header + tx count (always 0 for headers messages)
+
+
+# 1. Helpers
+def _remaining(stream: BinaryIO) -> memoryview:
+    """
+    Returns a memoryview over everything left in `stream` and moves the stream to its end.
+    \n`BytesIO` streams are viewed in place (no copy); any other stream is read once.
+    """
+    if isinstance(stream, BytesIO):
+        pos = stream.tell()
+        view = stream.getbuffer()[pos:]
+        stream.seek(0, 2)
+        return view
+    return memoryview(stream.read())
+
+
+def read_varint_view(view: memoryview, offset: int = 0) -> tuple[int, int]:
+    """Reads a variable integer from `view` at `offset`. Returns (value, new offset). Raises `ValueError` if `view` ends first."""
+    if offset >= len(view):
+        raise ValueError("Payload too short for varint")
+    i = view[offset]
+    match i:
+        case 0xfd:
+            size = 2
+        case 0xfe:
+            size = 4
+        case 0xff:
+            size = 8
+        case _:
+            return i, offset + 1
+    start = offset + 1
+    if len(view) - start < size:
+        raise ValueError("Payload too short for varint")
+    return int.from_bytes(view[start:start + size], "big"), start + size
+
+
+def _alloc(count: int, item_size: int) -> tuple[bytearray, int]:
+    """Allocates a payload buffer with the varint `count` already written. Returns (buffer, offset)."""
+    prefix = encode_varint(count)
+    buf = bytearray(len(prefix) + count * item_size)
+    buf[:len(prefix)] = prefix
+    return buf, len(prefix)
+
+
+def _read_count(stream: BinaryIO, item_size: int, limit: int | None = None) -> tuple[memoryview, int, int]:
+    """
+    Reads the leading varint count of a vector payload. Returns (view, offset, count).
+    \nRaises `ValueError` if `count` exceeds `limit` or the payload is too short for the count or `count` items.
+    """
+    view = _remaining(stream)
+    count, offset = read_varint_view(view)
+    if limit is not None and count > limit:
+        raise ValueError(f"Vector of {count} items exceeds limit of {limit}")
+    if len(view) - offset < count * item_size:
+        raise ValueError(f"Payload too short for {count} items of {item_size}B")
+    return view, offset, count
+
+
+# 2. Inventory vectors (inv, getdata, notfound)
+def encode_inventory(inventory: list[tuple[int, bytes]]) -> bytes:
+    buf, offset = _alloc(len(inventory), INV_ITEM.size)
+    pack_into = INV_ITEM.pack_into
+    for inv_type, inv_hash in inventory:
+        pack_into(buf, offset, inv_type, inv_hash)
+        offset += INV_ITEM.size
+    return bytes(buf)
+
+
+def decode_inventory(stream: BinaryIO, limit: int | None = None) -> list[tuple[int, bytes]]:
+    view, offset, count = _read_count(stream, INV_ITEM.size, limit)
+    end = offset + count * INV_ITEM.size
+    return list(INV_ITEM.iter_unpack(view[offset:end]))
+
+
+# 3. Headers
+def encode_headers(headers: list[bytes]) -> bytes:
+    buf, offset = _alloc(len(headers), HEADER_ITEM_SIZE)
+    for header in headers:
+        buf[offset:offset + HEADER_SIZE] = header
+        offset += HEADER_ITEM_SIZE  # tx count byte is already zeroed
+    return bytes(buf)
+
+
+def decode_headers(stream: BinaryIO, limit: int | None = None) -> list[bytes]:
+    view, offset, count = _read_count(stream, HEADER_ITEM_SIZE, limit)
+    return [
+        bytes(view[start:start + HEADER_SIZE])
+        for start in range(offset, offset + count * HEADER_ITEM_SIZE, HEADER_ITEM_SIZE)
+    ]
+
+
+# 4. Network addresses
+def encode_addresses(addresses: Iterable[tuple[int, int, bytes, int]]) -> bytes:
+    """`addresses` are (timestamp, services, 16B ip, port) tuples."""
+    addresses = list(addresses)
+    buf, offset = _alloc(len(addresses), ADDR_ITEM.size)
+    pack_into = ADDR_ITEM.pack_into
+    for timestamp, services, ip, port in addresses:
+        pack_into(buf, offset, timestamp, services, ip, port)
+        offset += ADDR_ITEM.size
+    return bytes(buf)
+
+
+def decode_addresses(stream: BinaryIO, limit: int | None = None) -> list[tuple[int, int, bytes, int]]:
+    view, offset, count = _read_count(stream, ADDR_ITEM.size, limit)
+    end = offset + count * ADDR_ITEM.size
+    return list(ADDR_ITEM.iter_unpack(view[offset:end]))
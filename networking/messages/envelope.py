@@ -1,20 +1,30 @@
 import asyncio
 from io import BytesIO
 import logging
+import zlib
 from typing import BinaryIO
 from crypto.hashing import HASH256
-from networking.constants import NETWORK_MAGIC
+from networking.constants import COMPRESSIBLE_COMMANDS, COMPRESSION_LEVEL, COMPRESSION_THRESHOLD, MAX_MESSAGE_SIZE, NETWORK_MAGIC
 from networking.messages.types import COMMAND_MAP
 from utils.helper import int_to_bytes, bytes_to_int
 
 log = logging.getLogger(__name__)
 
+HEADER_SIZE = 24  # magic (4B) + command (12B) + payload length (4B) + checksum (4B)
+
+# When compression is negotiated, payloads of `COMPRESSIBLE_COMMANDS` are prefixed with one of these flags
+_RAW = b"\x00"
+_ZLIB = b"\x01"
+
+
 class MessageEnvelope:
     def __init__(self, message):
         self.message = message
         self.command = message.command
         self.payload = message.payload
-        
+        self.wire_size: int | None = None  # Size as received, if parsed from the network
+        self._serialized: dict[bool, bytes] = dict()  # Cached by whether it was compressed, for envelopes sent many times
+
     def __str__(self):
         result = f"{self.message}\n"
         result += f"Length: {len(self.payload)}\n"
@@ -22,7 +32,7 @@ class MessageEnvelope:
         return result
 
     @classmethod
-    def parse(cls, stream: BinaryIO) -> "MessageEnvelope":
+    def parse(cls, stream: BinaryIO, compression: bool = False) -> "MessageEnvelope":
         magic = stream.read(4)
         if magic != NETWORK_MAGIC:
             raise RuntimeError("Invalid network magic")
@@ -31,20 +41,10 @@ class MessageEnvelope:
         len_payload = bytes_to_int(stream.read(4))
         checksum = stream.read(4)
         payload = stream.read(len_payload)
-
-        if HASH256(payload)[:4] != checksum:
-            raise RuntimeError("Checksum mismatch")
-        
-        message_class = COMMAND_MAP.get(command)
-        if not message_class:
-            log.warning(f"Received message with unknown command!: {command.decode('ascii')}")
-            raise ValueError
-        
-        message = message_class.parse(BytesIO(payload))
-        return cls(message)
+        return cls._from_payload(command, payload, checksum, compression)
 
     @classmethod
-    async def parse_async(cls, reader: asyncio.StreamReader) -> "MessageEnvelope":
+    async def parse_async(cls, reader: asyncio.StreamReader, compression: bool = False) -> "MessageEnvelope":
         magic = await reader.readexactly(4)
         if not magic:
             raise EOFError("Peer disconnected")
@@ -56,31 +56,79 @@ class MessageEnvelope:
         len_payload = bytes_to_int(await reader.readexactly(4))
         checksum = await reader.readexactly(4)
         payload = await reader.readexactly(len_payload)
+        return cls._from_payload(command, payload, checksum, compression)
 
+    @classmethod
+    def _from_payload(cls, command: bytes, payload: bytes, checksum: bytes, compression: bool) -> "MessageEnvelope":
         if HASH256(payload)[:4] != checksum:
             raise RuntimeError("Checksum mismatch")
+        wire_size = HEADER_SIZE + len(payload)
 
         message_class = COMMAND_MAP.get(command)
         if not message_class:
             log.warning(f"Received message with unknown command!: {command.decode('ascii')}")
             raise ValueError
-        
+
+        if compression and command in COMPRESSIBLE_COMMANDS:
+            payload = decompress_payload(payload)
+
         message = message_class.parse(BytesIO(payload))
-        return cls(message)
-    
-    def serialize(self) -> bytes:
+        envelope = cls(message)
+        envelope.wire_size = wire_size
+        return envelope
+
+    def serialize(self, compression: bool = False) -> bytes:
+        """Serializes the envelope. If `compression` was negotiated with the peer, large payloads are zlib compressed."""
+        compression = compression and self.command in COMPRESSIBLE_COMMANDS
+        if cached := self._serialized.get(compression):
+            return cached
+        
+        payload = self.payload
+        if compression:
+            payload = compress_payload(payload)
+
         result: bytes = NETWORK_MAGIC
         result += self.command.ljust(12, b"\x00")
-        result += int_to_bytes(len(self.payload), 4)
-        result += HASH256(self.payload)[:4]  # checksum
-        result += self.payload
+        result += int_to_bytes(len(payload), 4)
+        result += HASH256(payload)[:4]  # checksum
+        result += payload
+        self._serialized[compression] = result
         return result
 
     @property
     def payload_stream(self):
         return BytesIO(self.payload)
-    
-    
-    @property 
+
+
+    @property
     def payload_size(self) -> int:
-        return len(self.serialize())
+        """Size of the full uncompressed envelope"""
+        return HEADER_SIZE + len(self.payload)
+
+
+def compress_payload(payload: bytes) -> bytes:
+    """Compresses `payload` if it is large enough and compression actually helps, and prefixes it with its flag."""
+    if len(payload) >= COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(payload, COMPRESSION_LEVEL)
+        if len(compressed) < len(payload):
+            return _ZLIB + compressed
+    return _RAW + payload
+
+
+def decompress_payload(payload: bytes) -> bytes:
+    """Reverses `compress_payload`, refusing to inflate anything past `MAX_MESSAGE_SIZE`."""
+    flag, data = payload[:1], payload[1:]
+    if flag == _RAW:
+        return data
+
+    if flag == _ZLIB:
+        decompressor = zlib.decompressobj()
+        try:
+            result = decompressor.decompress(data, MAX_MESSAGE_SIZE)
+        except zlib.error as e:
+            raise ValueError(f"Invalid compressed payload: {e}")
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError("Compressed payload is truncated or too large")
+        return result
+
+    raise ValueError(f"Unknown payload compression flag: {flag.hex()}")
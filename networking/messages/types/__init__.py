@@ -14,6 +14,12 @@ from .notfound import NotFoundMessage
 from .mempool import MempoolMessage
 from .ping import PingMessage
 from .pong import PongMessage
+from .sendcmpct import SendCmpctMessage
+from .cmpctblock import CmpctBlockMessage
+from .getblocktxn import GetBlockTxnMessage
+from .blocktxn import BlockTxnMessage
+from .sendheaders import SendHeadersMessage
+from .feefilter import FeeFilterMessage
  
 # Grouped by protocol function for documentation
 CORE_MESSAGES = (
@@ -31,7 +37,13 @@ CORE_MESSAGES = (
     NotFoundMessage,
     MempoolMessage,
     PingMessage,
-    PongMessage
+    PongMessage,
+    SendCmpctMessage,
+    CmpctBlockMessage,
+    GetBlockTxnMessage,
+    BlockTxnMessage,
+    SendHeadersMessage,
+    FeeFilterMessage,
 )
 
 __all__ = [
@@ -50,6 +62,12 @@ __all__ = [
     "MempoolMessage",
     "PingMessage",
     "PongMessage",
+    "SendCmpctMessage",
+    "CmpctBlockMessage",
+    "GetBlockTxnMessage",
+    "BlockTxnMessage",
+    "SendHeadersMessage",
+    "FeeFilterMessage",
 ]
 
 COMMAND_MAP = {msg.command: msg for msg in CORE_MESSAGES}
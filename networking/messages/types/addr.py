@@ -1,21 +1,20 @@
 from typing import BinaryIO, List
+
+from networking.constants import ADDR_LIMIT
+from networking.messages.codec import decode_addresses, encode_addresses
 from utils.fmt import services_to_str
-from utils.helper import encode_ip, format_ip, int_to_bytes, bytes_to_int, read_varint
+from utils.helper import format_ip
 
 
 class AddrMessage:
     command = b"addr"
 
     def __init__(self, addresses: List[tuple]):
+        """
+        addresses | List[tuple]: (timestamp, services, ip, port) for each address, with `ip` in 16B form
+        """
         self.addresses = addresses
-
-        self.payload = int_to_bytes(len(addresses), 1)
-
-        for timestamp, services, ip, port in addresses:
-            self.payload += int_to_bytes(timestamp, 4)
-            self.payload += int_to_bytes(services, 8)
-            self.payload += encode_ip(ip)
-            self.payload += port.to_bytes(2)
+        self.payload = encode_addresses(addresses)
 
     def __str__(self):
         lines = [f"[addr]"]
@@ -29,12 +28,4 @@ class AddrMessage:
         
     @classmethod
     def parse(cls, stream: BinaryIO):
-        count = read_varint(stream)
-        addresses = []
-        for _ in range(count):
-            timestamp = bytes_to_int(stream.read(4))
-            services = bytes_to_int(stream.read(8))
-            ip = stream.read(16)
-            port = bytes_to_int(stream.read(2))
-            addresses.append((timestamp, services, ip, port))
-        return cls(addresses)
+        return cls(decode_addresses(stream, ADDR_LIMIT))
@@ -0,0 +1,26 @@
+from typing import BinaryIO, List
+
+from blockchain.transaction import Transaction
+from utils.helper import encode_varint, read_varint
+
+
+class BlockTxnMessage:
+    """Response to `getblocktxn`, with the requested transactions in the order they were requested."""
+    command = b"blocktxn"
+
+    def __init__(self, block_hash: bytes, txs: List[Transaction]):
+        self.block_hash = block_hash
+        self.txs = txs
+        self.payload = block_hash + encode_varint(len(txs)) + b"".join(tx.serialize() for tx in txs)
+
+    def __str__(self):
+        lines = [f"[blocktxn] -> Block: {self.block_hash.hex()}"]
+        for i, tx in enumerate(self.txs):
+            lines.append(f"  Tx {i}: {tx.hash().hex()}")
+        return "\n".join(lines)
+
+    @classmethod
+    def parse(cls, stream: BinaryIO):
+        block_hash = stream.read(32)
+        txs = [Transaction.parse(stream) for _ in range(read_varint(stream))]
+        return cls(block_hash, txs)
@@ -0,0 +1,68 @@
+from typing import BinaryIO, List
+
+from blockchain.transaction import Transaction
+from networking.constants import SHORT_ID_SIZE
+from utils.helper import encode_varint, int_to_bytes, bytes_to_int, read_varint
+
+
+class CmpctBlockMessage:
+    """
+    A compact block: the block header, a short ID for each transaction, and a few prefilled transactions
+    (at least the coinbase) which the receiver is not expected to have in its mempool.
+    """
+    command = b"cmpctblock"
+
+    def __init__(self, header: bytes, nonce: int, short_ids: List[bytes], prefilled: List[tuple[int, Transaction]]):
+        """
+        header | bytes: 80B block header
+        nonce | int: Random 8B integer used to salt the short IDs
+        short_ids | List[bytes]: 6B short ID for every non-prefilled transaction, in block order
+        prefilled | List[tuple[int, Transaction]]: (index in block, transaction) sorted by index
+        """
+        self.header = header
+        self.nonce = nonce
+        self.short_ids = short_ids
+        self.prefilled = prefilled
+
+        self.payload = header + int_to_bytes(nonce, 8)
+        self.payload += encode_varint(len(short_ids)) + b"".join(short_ids)
+        self.payload += encode_varint(len(prefilled))
+
+        # Indexes are differentially encoded, as in BIP152
+        last_index = -1
+        for index, tx in prefilled:
+            self.payload += encode_varint(index - last_index - 1) + tx.serialize()
+            last_index = index
+
+    def __str__(self):
+        lines = [
+            "[cmpctblock]",
+            f"  Header:    {self.header.hex()}",
+            f"  Nonce:     {self.nonce}",
+            f"  Short IDs: {len(self.short_ids)}",
+        ]
+        for index, tx in self.prefilled:
+            lines.append(f"  Prefilled {index}: {tx.hash().hex()}")
+        return "\n".join(lines)
+
+    @classmethod
+    def parse(cls, stream: BinaryIO):
+        header = stream.read(80)
+        nonce = bytes_to_int(stream.read(8))
+
+        count = read_varint(stream)
+        raw_ids = stream.read(count * SHORT_ID_SIZE)
+        short_ids = [raw_ids[i:i + SHORT_ID_SIZE] for i in range(0, len(raw_ids), SHORT_ID_SIZE)]
+
+        prefilled = []
+        last_index = -1
+        for _ in range(read_varint(stream)):
+            index = last_index + read_varint(stream) + 1
+            prefilled.append((index, Transaction.parse(stream)))
+            last_index = index
+
+        return cls(header, nonce, short_ids, prefilled)
+
+    @property
+    def tx_count(self) -> int:
+        return len(self.short_ids) + len(self.prefilled)
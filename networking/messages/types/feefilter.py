@@ -0,0 +1,23 @@
+from typing import BinaryIO
+
+from utils.helper import int_to_bytes, bytes_to_int
+
+
+class FeeFilterMessage:
+    """
+    Asks the peer not to announce transactions with a fee rate below `fee_rate` (khets/KB),
+    as this node would reject them from its mempool anyway.
+    """
+    command = b"feefilter"
+
+    def __init__(self, fee_rate: int):
+        self.fee_rate = fee_rate
+        self.payload = int_to_bytes(fee_rate, 8)
+
+    def __str__(self):
+        return f"[feefilter] -> Fee rate: {self.fee_rate} khets/KB"
+
+    @classmethod
+    def parse(cls, stream: BinaryIO):
+        fee_rate = bytes_to_int(stream.read(8))
+        return cls(fee_rate)
@@ -0,0 +1,32 @@
+from typing import BinaryIO, List
+
+from utils.helper import encode_varint, read_varint
+
+
+class GetBlockTxnMessage:
+    """Requests the transactions at `indexes` of a block, after a `cmpctblock` could not be fully reconstructed."""
+    command = b"getblocktxn"
+
+    def __init__(self, block_hash: bytes, indexes: List[int]):
+        self.block_hash = block_hash
+        self.indexes = indexes
+
+        # Indexes are differentially encoded, as in BIP152
+        self.payload = block_hash + encode_varint(len(indexes))
+        last_index = -1
+        for index in indexes:
+            self.payload += encode_varint(index - last_index - 1)
+            last_index = index
+
+    def __str__(self):
+        return f"[getblocktxn] -> Block: {self.block_hash.hex()}, Indexes: {self.indexes}"
+
+    @classmethod
+    def parse(cls, stream: BinaryIO):
+        block_hash = stream.read(32)
+        indexes = []
+        last_index = -1
+        for _ in range(read_varint(stream)):
+            last_index += read_varint(stream) + 1
+            indexes.append(last_index)
+        return cls(block_hash, indexes)
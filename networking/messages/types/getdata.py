@@ -1,7 +1,7 @@
 from typing import BinaryIO, List
 
-from crypto.hashing import HASH256
-from utils.helper import encode_varint, int_to_bytes, bytes_to_int
+from networking.constants import INV_LIMIT
+from networking.messages.codec import decode_inventory, encode_inventory
 
 
 class GetDataMessage:
@@ -9,10 +9,7 @@ class GetDataMessage:
 
     def __init__(self, inventory: List[tuple]):
         self.inventory = inventory
-
-        self.payload = encode_varint(len(self.inventory))
-        for inv_type, inv_hash in inventory:
-            self.payload += int_to_bytes(inv_type, 4) + inv_hash
+        self.payload = encode_inventory(inventory)
 
     def __str__(self):
         lines = [f"[getdata]"]
@@ -24,10 +21,4 @@ class GetDataMessage:
 
     @classmethod
     def parse(cls, stream: BinaryIO):
-        count = bytes_to_int(stream.read(1))
-        inventory = []
-        for _ in range(count):
-            inv_type = bytes_to_int(stream.read(4))
-            inv_hash = stream.read(32)
-            inventory.append((inv_type, inv_hash))
-        return cls(inventory)
+        return cls(decode_inventory(stream, INV_LIMIT))
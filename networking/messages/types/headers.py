@@ -1,16 +1,14 @@
 from typing import BinaryIO, List
 
-from utils.helper import encode_varint, read_varint
+from networking.constants import GETHEADERS_LIMIT
+from networking.messages.codec import decode_headers, encode_headers
 
 
 class HeadersMessage:
     command = b"headers"
     def __init__(self, headers: List[bytes]):
         self.headers = headers
-
-        self.payload = encode_varint(len(headers))
-        for header in headers:
-            self.payload += header
+        self.payload = encode_headers(headers)  # Each header is followed by a tx count of 0
             
     def __str__(self):
         lines = [f"[headers]"]
@@ -20,11 +18,4 @@ class HeadersMessage:
     
     @classmethod
     def parse(cls, stream: BinaryIO):
-        count = read_varint(stream)
-        headers = []
-        for _ in range(count):
-            header_bytes = stream.read(80)
-            stream.read(1)  # tx count for headers message is always 0
-            headers.append(header_bytes)
-
-        return cls(headers)
\ No newline at end of file
+        return cls(decode_headers(stream, GETHEADERS_LIMIT))
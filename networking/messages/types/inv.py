@@ -1,7 +1,7 @@
 from typing import BinaryIO
 
 from networking.constants import INV_LIMIT
-from utils.helper import encode_varint, int_to_bytes, bytes_to_int, read_varint
+from networking.messages.codec import decode_inventory, encode_inventory
 
 
 class InvMessage:
@@ -19,10 +19,7 @@ class InvMessage:
         - 2: Block
         """
         self.inventory = inventory
-
-        self.payload = encode_varint(len(inventory))
-        for inv_type, inv_hash in inventory:
-            self.payload += int_to_bytes(inv_type, 4) + inv_hash
+        self.payload = encode_inventory(inventory)
 
     def __str__(self):
         lines = [f"[inv]"]
@@ -33,18 +30,9 @@ class InvMessage:
 
     @classmethod
     def parse(cls, stream: BinaryIO):
-        count = read_varint(stream)
-        if count > INV_LIMIT:
-            # TODO: BANNNN
-            return cls([])
-
-        inventory = []
         # 0 - Error
         # 1 - Msg TX
         # 2 - Msg Block
         # 3 - Msg Merkle Block (SPV not implemented yet)
-        for _ in range(count):
-            inv_type = bytes_to_int(stream.read(4))
-            inv_hash = stream.read(32)
-            inventory.append((inv_type, inv_hash))
-        return cls(inventory)
+        # Oversized inventories raise ValueError, which drops the peer
+        return cls(decode_inventory(stream, INV_LIMIT))
@@ -1,5 +1,7 @@
 from typing import BinaryIO
-from utils.helper import encode_varint, int_to_bytes, bytes_to_int, read_varint
+
+from networking.constants import INV_LIMIT
+from networking.messages.codec import decode_inventory, encode_inventory
 
 
 class NotFoundMessage:
@@ -10,12 +12,8 @@ class NotFoundMessage:
     command = b"notfound"
 
     def __init__(self, inventory: list[tuple[int, bytes]]):
-        self.inventory = inventory
-
-        self.payload = encode_varint(len(inventory))
-        for inv_type, inv_hash in inventory:
-            # inv_type: 1=Transaction, 2=Block
-            self.payload += int_to_bytes(inv_type, 4) + inv_hash
+        self.inventory = inventory  # inv_type: 1=Transaction, 2=Block
+        self.payload = encode_inventory(inventory)
 
     def __str__(self):
         lines = [f"[notfound]"]
@@ -26,11 +24,4 @@ class NotFoundMessage:
     
     @classmethod
     def parse(cls, stream: BinaryIO):
-        count = read_varint(stream)
-            
-        inventory = []
-        for _ in range(count):
-            inv_type = bytes_to_int(stream.read(4))
-            inv_hash = stream.read(32)
-            inventory.append((inv_type, inv_hash))
-        return cls(inventory)
+        return cls(decode_inventory(stream, INV_LIMIT))
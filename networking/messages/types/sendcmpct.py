@@ -0,0 +1,25 @@
+from typing import BinaryIO
+
+from utils.helper import int_to_bytes, bytes_to_int
+
+
+class SendCmpctMessage:
+    """
+    Sent after the handshake to signal that this node understands compact blocks.
+    If `announce` is set, the peer should announce new blocks by pushing `cmpctblock` directly instead of `inv`.
+    """
+    command = b"sendcmpct"
+
+    def __init__(self, announce: bool = True, version: int = 1):
+        self.announce = announce
+        self.version = version
+        self.payload = int_to_bytes(self.announce, 1) + int_to_bytes(self.version, 8)
+
+    def __str__(self):
+        return f"[sendcmpct] -> Announce: {self.announce}, Version: {self.version}"
+
+    @classmethod
+    def parse(cls, stream: BinaryIO):
+        announce = bool(bytes_to_int(stream.read(1)))
+        version = bytes_to_int(stream.read(8))
+        return cls(announce, version)
@@ -0,0 +1,19 @@
+from typing import BinaryIO
+
+
+class SendHeadersMessage:
+    """
+    Sent after the handshake to ask the peer to announce new blocks 
+    by pushing their `headers` directly, instead of sending an `inv`.
+    """
+    command = b"sendheaders"
+
+    def __init__(self):
+        self.payload = b""
+
+    def __str__(self):
+        return "[sendheaders]"
+
+    @classmethod
+    def parse(cls, _stream: BinaryIO):
+        return cls()
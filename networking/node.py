@@ -3,20 +3,43 @@ import logging
 import random
 import time
 
+from collections import OrderedDict
+
 from blockchain.block import Block
+from blockchain.transaction import Transaction
 from crypto.hashing import HASH160
 from crypto.key import get_public_key
 from db.index import BlockIndex, get_block_tip_index
-from db.peers import load_all_peers
+from db.block import get_block_exists
+from db.functions import process_new_block
+from db.tx import get_tx_exists
+from mining.block_assembler import BlockAssembler
+from mining.constants import FEE_ESTIMATE_FLUSH_INTERVAL, MEMPOOL_EXPIRY_INTERVAL
+from mining.fee_estimator import FeeEstimator
 from mining.mempool import Mempool
 from mining.miner import Miner
-from networking.constants import CONNECTION_TIMEOUT, HANDSHAKE_TIMEOUT
+from networking.addrman import AddrMan
+from networking.block_cache import BlockCache
+from networking.connman import ConnectionManager
+from networking.compact import PartialBlock, build_compact_block
+from networking.constants import ADDRMAN_FLUSH_INTERVAL, BLOCK_TYPE, CONNECTION_TIMEOUT, HANDSHAKE_TIMEOUT, MAX_PARTIAL_BLOCKS, PEER_STATS_INTERVAL, TX_TYPE, UPLOAD_TARGET_CYCLE
 from networking.messages.envelope import MessageEnvelope
 from networking.messages.types.getaddr import GetAddrMessage
+from networking.messages.types.inv import InvMessage
 from networking.messages.types.mempool import MempoolMessage
+from networking.messages.types.headers import HeadersMessage
+from networking.messages.types.sendcmpct import SendCmpctMessage
+from networking.messages.types.sendheaders import SendHeadersMessage
 from networking.peer import Peer
 from networking.processor import MessageProcessor
+from networking.request_manager import RequestManager
+from networking.rest import RESTServer
+from networking.rpc import RPCServer
+from utils.bloom import RollingBloomFilter
 from utils.config import APP_CONFIG
+from utils.events import PEER_CONNECTED, PEER_DISCONNECTED, EventBus
+from utils.ip import ip_convert_to_bytes
+from utils.rate_limit import TokenBucket
 
 log = logging.getLogger(__name__)
 
@@ -34,20 +57,46 @@ class Node:
         self.server: asyncio.Server | None = None
         self.server_start_time: int = 0
         self.loop: asyncio.AbstractEventLoop = loop
+        
+        # Recently seen inventory, used to answer `inv` messages without hitting the database
+        self.known_inventory = RollingBloomFilter(APP_CONFIG.get("node", "known_inventory_size"))
+        self.recent_rejects: OrderedDict[bytes, None] = OrderedDict()
+        self.recent_rejects_size: int = APP_CONFIG.get("node", "recent_rejects_size")
+        
+        # Changes to the mempool, blockchain and peers, for the GUI
+        self.events = EventBus()
+        
+        # Active chain tip, which mempool transactions are tracked against for fee estimation
+        self.block_tip_index: BlockIndex = get_block_tip_index()
+        
+        self.fee_estimator = FeeEstimator()
+        self.fee_estimator.load()
         self.mempool = Mempool(self)
+        self.block_assembler = BlockAssembler(self)
         self.miner = Miner()
         
         self.mempool.load_mempool()
-        log.info(f"Mempool loaded with {len(self.mempool._valid_txs)} transactions.")
+        log.info(f"Mempool loaded with {self.mempool.get_no_tx()} transactions.")
         
         # Clients (peers)
+        self.addrman = AddrMan()  # Known addresses, loaded from peers.db on startup
         self.next_peer_id: int = 0
         self.peer_id_lookup: dict = dict()
         self.bytes_recv: int = 0
         self.bytes_sent: int = 0
+        
+        # Bandwidth limits (bytes/s) shared by all peers, and the daily upload target
+        self.upload_limiter = TokenBucket(APP_CONFIG.get("node", "max_upload_rate") * 1024)
+        self.download_limiter = TokenBucket(APP_CONFIG.get("node", "max_download_rate") * 1024)
+        self.upload_cycle_start: float = time.time()
+        self.upload_cycle_bytes_sent: int = 0  # `bytes_sent` when the current cycle started
 
         # Async variables
         self.msg_processor = MessageProcessor(self)
+        self.request_manager = RequestManager(self)
+        self.connman = ConnectionManager(self)
+        self.rpc_server = RPCServer(self) if APP_CONFIG.get("node", "rpc_enabled") else None
+        self.rest_server = RESTServer(self) if APP_CONFIG.get("node", "rest_enabled") else None
         self.msg_processor_queue: asyncio.Queue[tuple[Peer, MessageEnvelope]] = asyncio.Queue()  # For db write serialization
 
         self._shutdown_requested = asyncio.Event()
@@ -56,12 +105,10 @@ class Node:
         self.is_running = False
         
         # Block consensus 
-        self.block_tip_index: BlockIndex = get_block_tip_index()
         self.orphan_blocks: set[Block] = set()
-        
-        # Transient variables for efficient GUI update
-        self._updated_blockchain = 0
-        self._updated_peers = 0
+        self.partial_blocks: OrderedDict[bytes, PartialBlock] = OrderedDict()  # Compact blocks waiting on `blocktxn`
+        self.block_cache = BlockCache(APP_CONFIG.get("node", "block_cache_size"))  # Ready-to-send recent blocks
+
         log.info(f"Node '{self.name}' initialized on {self.external_ip}:{self.port}")
 
  
@@ -75,8 +122,13 @@ class Node:
         log.info("Spawning Node startup tasks...")
         self.spawn(self._start_server())
         self.spawn(self._message_processor_loop())
-        self.spawn(self._initial_connection_task())
+        self.spawn(self._connection_task())
         self.spawn(self._node_management_task())
+        self.spawn(self._inv_trickle_task())
+        if self.rpc_server:
+            self.spawn(self.rpc_server.start())
+        if self.rest_server:
+            self.spawn(self.rest_server.start())
 
         log.info(f"Node running. Waiting for shutdown signal...")
         self.is_running = True
@@ -84,9 +136,7 @@ class Node:
 
         log.info(f"Shutdown requested. Cleaning up...")
         await self._close_server()
-        
-        self.loop.stop()
-        log.info(f"Loop stopped. Node finished.")
+        log.info(f"Node finished.")
         
     async def shutdown(self):
         log.info(f"External shutdown triggered.")
@@ -118,8 +168,9 @@ class Node:
         self.mempool.save_mempool()
         log.info(
             f"Mempool saved with "
-            f"{len(self.mempool._valid_txs) + len(self.mempool._orphan_txs)} txs"
+            f"{self.mempool.get_no_tx() + self.mempool.get_stats().orphan_count} txs"
         )
+        self.fee_estimator.save()
 
         # Close server socket first (stop new connections)
         if self.server:
@@ -131,9 +182,21 @@ class Node:
                 log.warning(f"Error while waiting for server to close: {e}")
             self.server = None
 
+        if self.rpc_server:
+            try:
+                await self.rpc_server.close()
+            except Exception as e:
+                log.warning(f"Error closing RPC server: {e}")
+        if self.rest_server:
+            try:
+                await self.rest_server.close()
+            except Exception as e:
+                log.warning(f"Error closing REST server: {e}")
+
         peers_to_close = list(self.peers)
         self.peers.clear()
-        self._updated_peers = 0
+        for peer in peers_to_close:
+            self.events.publish(PEER_DISCONNECTED, peer_id=peer.session_id)
 
         tasks_to_cancel = list(self._tasks)
         self._tasks.clear()
@@ -153,6 +216,12 @@ class Node:
             if isinstance(r, Exception) and not isinstance(r, asyncio.CancelledError):
                 log.warning(f"Exception during shutdown: {r}")
 
+        # Save addresses last, after closing peers has updated their last seen time
+        try:
+            await self.addrman.close()
+        except Exception as e:
+            log.warning(f"Error saving addresses: {e}")
+
         log.info("Server shutdown complete.")
 
      
@@ -178,13 +247,11 @@ class Node:
         peer_str_ip = f"{addr[0]}:{addr[1]}"
         log.debug(f"Handling incoming connection from {peer_str_ip}")
 
-        # Check if its possible to connect with peer
-        if len(self.peers) >= APP_CONFIG.get("node", "max_peers"):
-            writer.close()
-            await writer.wait_closed()
-            return
-
-        if any(p.addr == addr for p in self.peers):
+        # Check if its possible to connect with peer. If slots are full, the worst inbound peer is only evicted
+        # once the newcomer completes its handshake, so that no peer is dropped for a connection that is then refused
+        if any(p.addr == addr for p in self.peers) or (
+            not self.connman.can_accept_inbound() and self.connman.select_inbound_to_evict() is None
+        ):
             writer.close()
             await writer.wait_closed()
             return
@@ -205,12 +272,24 @@ class Node:
         try:
             log.debug(f"[{peer.str_ip}] Waiting for handshake established future")
             established = await asyncio.wait_for(peer.established, timeout=HANDSHAKE_TIMEOUT)
+            if established and not self.connman.can_accept_inbound():
+                victim = self.connman.select_inbound_to_evict()
+                if victim is None:
+                    log.info(f"[{peer.str_ip}] Inbound slots are full and no peer can be evicted. Disconnecting.")
+                    await peer.close()
+                    return
+                log.info(f"[{victim.str_ip}] Evicting inbound peer (score {victim.stats.score():.2f}) to make room for {peer.str_ip}")
+                await victim.close()
+
             if established:
                 log.info(f"[{peer.str_ip}] Handshake successful. Adding to peers.")
                 self.peers.add(peer)
-                self._updated_peers = 0
+                self.events.publish(PEER_CONNECTED, peer_id=peer.session_id)
+                await peer.send_message(SendHeadersMessage())
+                await peer.send_message(SendCmpctMessage(announce=True))
+                await peer.send_feefilter(self.mempool.get_min_fee_rate())
                 await peer.send_message(GetAddrMessage())
-                if peer.height > self.block_tip_index.height:
+                if self.get_download_peer() == peer:
                     await peer.send_getblocks()
             else:
                 log.warning(f"[{peer.str_ip}] Handshake failed or rejected .")
@@ -220,17 +299,19 @@ class Node:
             if not peer.writer.is_closing():
                 await peer.close()
 
-    async def _connect_to_peer(self, addr: tuple, name: str = "", initial=False):
-        if len(self.peers) >= APP_CONFIG.get("node", "max_peers"):
+    async def _connect_to_peer(self, addr: tuple, name: str = "", initial=False) -> bool:
+        """Connects and handshakes with the peer at `addr`. Returns True if the peer was established."""
+        if not self.connman.can_connect_outbound():
             log.info("Cannot connect to peer; max amount reached")
-            return
+            return False
 
         peer_str_ip = f"{addr[0]}:{addr[1]}"
         log.info(f"[{peer_str_ip}] Attempting to connect...")
         if addr == (self.external_ip, self.port):
             log.warning(f"[{peer_str_ip}] Attempted to self connect.")
-            return
+            return False
         
+        self.addrman.attempt(addr[0], addr[1])
         reader = writer = None
         try:
             reader, writer = await asyncio.wait_for(asyncio.open_connection(addr[0], addr[1]), timeout=CONNECTION_TIMEOUT)
@@ -239,14 +320,17 @@ class Node:
             log.info(f"[{peer_str_ip}] Connection not established for {CONNECTION_TIMEOUT}s. Giving up.")
         except ConnectionRefusedError:
             log.info(f"[{peer_str_ip}] Connection refused.")
-            return
+            return False
+        except OSError as e:
+            log.info(f"[{peer_str_ip}] Could not connect: {e}")
+            return False
         except Exception as e:
             log.exception(f"[{peer_str_ip}] Unexpected error attempting TCP connection: {e}")
-            return
+            return False
         
         if writer is None:
             log.info(f"[{peer_str_ip}] No writer.")
-            return
+            return False
         
         peer = Peer(self, reader, writer, name, session_id=self.next_peer_id, direction="outbound")
         self.peer_id_lookup[self.next_peer_id] = peer
@@ -259,27 +343,31 @@ class Node:
             if established:
                 log.info(f"[{peer_str_ip}] Handshake success. Pear established.")
                 self.peers.add(peer)
-                self._updated_peers = 0
+                self.addrman.good(addr[0], addr[1], peer.services)
+                self.events.publish(PEER_CONNECTED, peer_id=peer.session_id)
+                await peer.send_message(SendHeadersMessage())
+                await peer.send_message(SendCmpctMessage(announce=True))
+                await peer.send_feefilter(self.mempool.get_min_fee_rate())
                 
                 if initial:
                     await peer.send_message(MempoolMessage())
-                if peer.height > self.block_tip_index.height:
+                if self.get_download_peer() == peer:
                     await peer.send_getblocks()
+                return True
             else:
                 log.info(f"[{peer_str_ip}] Handshake failed.")
+                await peer.close()
         except Exception as e:
             log.info(f"[{peer_str_ip}] Error during handshake with peer {peer.str_ip}: {e}")
             await peer.close()
+        return False
 
-    async def _initial_connection_task(self):
-        log.info("Connecting to initial peers...")
-        peers_to_connect = await load_all_peers()
-        peers_to_connect = peers_to_connect[:APP_CONFIG.get("node", "max_peers")]
-        if not peers_to_connect:
-            return 
-
-        for peer_meta in peers_to_connect:
-            self.spawn(self._connect_to_peer((peer_meta.ip, peer_meta.port), peer_meta.name, initial=True))
+    async def _connection_task(self):
+        log.info("Loading addresses...")
+        await self.addrman.open()
+        
+        log.info("Connecting to peers...")
+        await self.connman.run()
 
 
     async def _node_management_task(self):
@@ -287,8 +375,16 @@ class Node:
         Running loop to manage expiry for peers and mempool txns
         """
         timeout = APP_CONFIG.get("node", "peer_inactive_timeout")
+        last_addrman_flush = time.time()
+        last_stats_sample = time.time()
+        last_mempool_expiry = time.time()
+        last_fee_estimates_flush = time.time()
         while not self._shutdown_requested.is_set():
             now = time.time()
+            min_fee_rate = self.mempool.get_min_fee_rate()
+            sample_stats = now - last_stats_sample >= PEER_STATS_INTERVAL
+            if sample_stats:
+                last_stats_sample = now
             
             for peer in list(self.peers):
                 # Clear inactive peers
@@ -300,12 +396,56 @@ class Node:
                 if (now - peer.last_ping) >= 120:
                     peer.ping()
                     
-                # 
-                if (peer.height - self.block_tip_index.height >= 5) and (peer.last_block_ago >= 30):
-                     await peer.send_getblocks()
+                # Keep peers up to date with our mempool's minimum fee rate
+                if peer.sent_fee_filter != min_fee_rate:
+                    await peer.send_feefilter(min_fee_rate)
+                    
+                if sample_stats:
+                    peer.stats.sample_recv_rate(peer.bytes_recv, now)
+            
+            # Keep syncing from the best scoring peer ahead of us, moving on from peers which stall
+            download_peer = self.get_download_peer()
+            if (
+                download_peer
+                and download_peer.height - self.block_tip_index.height >= 5
+                and download_peer.last_block_ago >= 30
+                and now - download_peer.last_getblocks_timestamp >= 30
+            ):
+                await download_peer.send_getblocks()
+            
+            # Re-request items that peers failed to deliver in time
+            await self.request_manager.expire_requests()
+            
+            # Snapshot changed addresses to peers.db
+            if now - last_addrman_flush >= ADDRMAN_FLUSH_INTERVAL:
+                last_addrman_flush = now
+                await self.addrman.flush()
+            
+            # Drop transactions which have been waiting too long to be mined
+            if now - last_mempool_expiry >= MEMPOOL_EXPIRY_INTERVAL:
+                last_mempool_expiry = now
+                self.mempool.expire(now)
+            
+            # Snapshot fee estimates, so that little is lost if the node does not shut down cleanly
+            if now - last_fee_estimates_flush >= FEE_ESTIMATE_FLUSH_INTERVAL:
+                last_fee_estimates_flush = now
+                self.fee_estimator.save()
                     
             await asyncio.sleep(1)
                 
+    async def _inv_trickle_task(self):
+        """
+        Running loop to flush each peer's queued tx announcements once its randomized trickle timer expires, 
+        so that many transactions are batched into a single `inv`.
+        """
+        while not self._shutdown_requested.is_set():
+            now = time.time()
+            for peer in list(self.peers):
+                if peer.inv_queue and now >= peer.next_inv_send:
+                    await peer.flush_inventory()
+                    
+            await asyncio.sleep(0.2)
+                
     def spawn(self, coro):
         task = self.loop.create_task(coro)
         self._tasks.add(task)
@@ -327,7 +467,7 @@ class Node:
     def broadcast(self, 
         message,
         exclude: Peer | None = None,
-        sample: int = APP_CONFIG.get("node", "max_peers"),
+        sample: int = APP_CONFIG.get("node", "max_outbound_peers") + APP_CONFIG.get("node", "max_inbound_peers"),
         outbound: bool = False
     ):
         """
@@ -353,38 +493,151 @@ class Node:
                 self.loop
             )
 
+    def relay_inventory(self, inv_type: int, inv_hash: bytes, fee_rate: float | None = None):
+        """
+        Announces an item to every connected peer that doesn't already know about it. Thread-safe.
+        \nBlocks are announced immediately, while transactions are queued and trickled out in batches (see `_inv_trickle_task`).
+        \nTransactions are not announced to peers whose `feefilter` is above `fee_rate` (khets/KB).
+        """
+        self.loop.call_soon_threadsafe(self._relay_inventory, inv_type, inv_hash, fee_rate)
+        
+    def _relay_inventory(self, inv_type: int, inv_hash: bytes, fee_rate: float | None):
+        for peer in list(self.peers):
+            if inv_type == BLOCK_TYPE:
+                if inv_hash not in peer.known_inventory:
+                    peer.known_inventory.insert(inv_hash)
+                    self.spawn(peer.send_message(InvMessage([(BLOCK_TYPE, inv_hash)])))
+            else:
+                peer.queue_inventory(inv_type, inv_hash, fee_rate)
+
+    def process_block_threadsafe(self, block: Block, timeout: float = 30) -> bool:
+        """
+        `process_new_block` for callers outside the event loop, such as the GUI miner, as connecting a block
+        updates the mempool and fee estimator. Returns True if `block` became the tip.
+        """
+        async def process():
+            process_new_block(block, self)
+            return self.block_tip_index.hash == block.hash()
+        return asyncio.run_coroutine_threadsafe(process(), self.loop).result(timeout)
+
+    def add_tx_threadsafe(self, tx: Transaction, timeout: float = 30) -> str | None:
+        """`Mempool.add_tx` for callers outside the event loop, such as the wallet. Returns the reason `tx` was refused, if any."""
+        async def add():
+            return self.mempool.add_tx(tx)
+        return asyncio.run_coroutine_threadsafe(add(), self.loop).result(timeout)
+
+    def save_address(self, ip: str, port: int, name: str):
+        """Saves an address under `name` in the address manager, e.g. from the GUI. Thread-safe."""
+        services = info.services if (info := self.addrman.entries.get((ip, port))) else 0
+        addresses = [(int(time.time()), services, ip_convert_to_bytes(ip), port)]
+        self.loop.call_soon_threadsafe(self.addrman.add, addresses, ip, name)
+
+    def remove_address(self, ip: str, port: int):
+        """Removes an address from the address manager and peers.db, e.g. from the GUI. Thread-safe."""
+        self.loop.call_soon_threadsafe(self.addrman.remove, ip, port)
+
+    def relay_block(self, block: Block):
+        """
+        Announces a new block to every connected peer that doesn't already know about it. Thread-safe.
+        \nPeers that asked for compact blocks are pushed a `cmpctblock` directly, 
+        peers that sent `sendheaders` are pushed the block's header, and the rest receive an `inv`.
+        """
+        self.loop.call_soon_threadsafe(self._relay_block, block)
+        
+    def _relay_block(self, block: Block):
+        block_hash = block.hash()
+        cmpct_msg = None
+        for peer in list(self.peers):
+            if block_hash in peer.known_inventory:
+                continue
+            
+            peer.known_inventory.insert(block_hash)
+            if peer.compact_blocks:
+                cmpct_msg = cmpct_msg or build_compact_block(block)
+                self.spawn(peer.send_message(cmpct_msg))
+            elif peer.prefers_headers:
+                self.spawn(peer.send_message(HeadersMessage([block.header.serialize()])))
+            else:
+                self.spawn(peer.send_message(InvMessage([(BLOCK_TYPE, block_hash)])))
+                
+    def add_partial_block(self, partial: PartialBlock):
+        """Stores a compact block waiting on `blocktxn`, dropping the oldest once `MAX_PARTIAL_BLOCKS` is exceeded."""
+        self.partial_blocks[partial.block_hash] = partial
+        if len(self.partial_blocks) > MAX_PARTIAL_BLOCKS:
+            self.partial_blocks.popitem(last=False)
+
     def remove_peer(self, peer: Peer):
         task = peer.listen_task
         if task and not task.done():
             task.cancel()
             
-        self.peers.discard(peer)
+        if peer in self.peers:
+            self.peers.discard(peer)
+            self.events.publish(PEER_DISCONNECTED, peer_id=peer.session_id)
         self.peer_id_lookup.pop(peer.session_id, None)
-        self._updated_peers = 0
+        self.request_manager.on_peer_removed(peer)
+        self.connman.on_peer_removed(peer)
+        self.mempool.remove_orphans_from_peer(peer.session_id)
         
         log.info(f"[{peer.str_ip}] Peer No. {peer.session_id} disconnected.")
 
+    def get_download_peer(self) -> Peer | None:
+        """Returns the best scoring peer whose chain is ahead of ours and which isn't stalling, to download blocks from."""
+        now = time.time()
+        candidates = [
+            peer for peer in self.peers
+            if peer.height > self.block_tip_index.height and not peer.is_stalling(now)
+        ]
+        return max(candidates, key=lambda peer: peer.stats.score(), default=None)
+
     def get_peer_by_id(self, peer_id: int) -> Peer | None:
         return self.peer_id_lookup.get(peer_id)
         
-    def check_updated_peers(self, i=1):
+    def set_tip(self, block_index):
+        self.block_tip_index = block_index
+        log.info(f"New node tip index: {block_index}")
+        
+        # Rejected transactions may become valid on a new tip
+        self.recent_rejects.clear()
+        
+    def have_inventory(self, inv_type: int, inv_hash: bytes) -> bool:
         """
-        Checks if any transactions were added or removd from self.peers from the last time this function was called.
-        \n`i` is used as an ID for different frames.
+        Returns True if the item announced by `inv_type` and `inv_hash` is already stored, or was recently rejected.
+        \nTransactions are answered from memory where possible; blocks always check the database.
+        \nUnknown inventory types return True, as they should never be requested.
         """
-        updated = (self._updated_peers >> i) & 1 == 0
-        self._updated_peers |= (1 << i)
-        return updated
+        if inv_type == TX_TYPE:
+            if inv_hash in self.recent_rejects or inv_hash in self.known_inventory:
+                return True
+            
+            if self.mempool.get_valid_tx(inv_hash) or self.mempool.get_orphan_tx(inv_hash) or get_tx_exists(inv_hash):
+                self.known_inventory.insert(inv_hash)
+                return True
+            return False
+        
+        elif inv_type == BLOCK_TYPE:
+            return get_block_exists(inv_hash)
+        
+        return True
     
-    def check_updated_blockchain(self, i=1):
-        updated = (self._updated_blockchain >> i) & 1 == 0
-        self._updated_blockchain |= (1 << i)
-        return updated
+    def add_recent_reject(self, tx_hash: bytes):
+        """Remembers `tx_hash` as rejected until the next tip change, up to `recent_rejects_size` hashes."""
+        self.recent_rejects[tx_hash] = None
+        self.recent_rejects.move_to_end(tx_hash)
+        if len(self.recent_rejects) > self.recent_rejects_size:
+            self.recent_rejects.popitem(last=False)
     
-    def set_tip(self, block_index):
-        self.block_tip_index = block_index
-        log.info(f"New node tip index: {block_index}")
-        self._updated_blockchain = 0
+    def upload_target_reached(self) -> bool:
+        """Returns True if `upload_target` MB have been uploaded since the current daily cycle started."""
+        target = APP_CONFIG.get("node", "upload_target")
+        if not target:
+            return False
+        
+        now = time.time()
+        if now - self.upload_cycle_start >= UPLOAD_TARGET_CYCLE:
+            self.upload_cycle_start = now
+            self.upload_cycle_bytes_sent = self.bytes_sent
+        return self.bytes_sent - self.upload_cycle_bytes_sent >= target * 1024 * 1024
     
     def uptime(self) -> int:
         if self.server_start_time:
@@ -1,17 +1,20 @@
 import asyncio
+from collections import deque
 import logging
-from random import randint
+from random import expovariate, randint
 import time
-from typing import List
 
-from db.block import get_block_locator_hashes
+from db.block import get_block_locator_hashes, get_raw_block
 from db.height import get_blockchain_height
-from db.peers import set_last_seen
-from networking.constants import PING_TIMEOUT, USER_AGENT
-from networking.constants import PROTOCOL_VERSION, SERVICES
+from networking.constants import BLOCK_REQUEST_TIMEOUT, BLOCK_TYPE, INV_LIMIT, INV_TRICKLE_INBOUND, INV_TRICKLE_OUTBOUND, PEER_KNOWN_INVENTORY_SIZE, PING_TIMEOUT, USER_AGENT
+from networking.constants import PROTOCOL_VERSION, SERVICES, _SVC_COMPRESS
 from networking.messages.envelope import MessageEnvelope
 from networking.messages.types import *
 from networking.messages.types import CORE_MESSAGES
+from networking.peer_stats import PeerStats
+from utils.bloom import RollingBloomFilter
+from utils.config import APP_CONFIG
+from utils.rate_limit import TokenBucket
 
 
 log = logging.getLogger(__name__)
@@ -57,15 +60,34 @@ class Peer:
         self.last_tx_timestamp: int = 0
         self.last_send_timestamp: int = 0
         self.last_recv_timestamp: int = 0
+        self.last_getblocks_timestamp: int = 0
 
         self.bytes_recv: int = 0
         self.bytes_sent: int = 0
+        
+        # Payload compression, enabled once both sides advertise `_SVC_COMPRESS`
+        self.compression: bool = False
+        self.bytes_saved_sent: int = 0
+        self.bytes_saved_recv: int = 0
+        
+        # Bandwidth limits (bytes/s); only bulk traffic waits on the upload limit
+        self.upload_limiter = TokenBucket(APP_CONFIG.get("node", "peer_max_upload_rate") * 1024)
+        self.download_limiter = TokenBucket(APP_CONFIG.get("node", "peer_max_download_rate") * 1024)
+        self.block_upload_queue: deque[bytes] = deque()  # Historical blocks requested by the peer, waiting to be served
+        self._block_upload_task: asyncio.Task | None = None
+        
+        # Rolling performance statistics, used to score peers
+        self.stats = PeerStats()
+        
+        # Inventory relay
+        self.known_inventory = RollingBloomFilter(PEER_KNOWN_INVENTORY_SIZE)  # Hashes this peer is known to have
+        self.inv_queue: dict[bytes, int] = dict()  # Tx hash to inv type, pending announcement
+        self.next_inv_send: float = 0
 
         # Ping / Latency tests
         self.time_offset = 0
         self.pong_future = asyncio.Future()
         self.latest_ping_time_ms = None
-        self.ping_times: List[float] = []
         self.last_ping = 0
         self.ping()
 
@@ -75,6 +97,10 @@ class Peer:
         self.user_agent: bytes = b""
         self.height: int = 0
         self.relay: bool = False
+        self.compact_blocks: bool = False  # Peer wants new blocks pushed as `cmpctblock`
+        self.prefers_headers: bool = False  # Peer wants new blocks pushed as `headers`
+        self.fee_filter: int = 0  # Min fee rate (khets/KB) of txs the peer wants announced
+        self.sent_fee_filter: int | None = None  # Last fee filter we sent to the peer
 
         # asyncio variables
         self.established = asyncio.Future()
@@ -83,12 +109,17 @@ class Peer:
 
     async def read_message(self) -> MessageEnvelope | None:
         try:
-            envelope = await MessageEnvelope.parse_async(self.reader)
+            envelope = await MessageEnvelope.parse_async(self.reader, compression=self.compression)
 
             # accounting
-            self.bytes_recv += envelope.payload_size
-            self.node.bytes_recv += envelope.payload_size
+            self.bytes_recv += envelope.wire_size
+            self.node.bytes_recv += envelope.wire_size
+            self.bytes_saved_recv += envelope.payload_size - envelope.wire_size
             self.last_recv_timestamp = int(time.time())
+            
+            # Decided here rather than in `process_version`, as messages after it are parsed before it is processed
+            if isinstance(envelope.message, VersionMessage):
+                self.compression = bool(envelope.message.services & SERVICES & _SVC_COMPRESS)
 
             if isinstance(envelope.message, BlockMessage):
                 self.last_block_timestamp = self.last_recv_timestamp
@@ -122,8 +153,12 @@ class Peer:
             return None
 
 
-    async def send_message(self, msg):
-        """Sends `msg` to this peer"""
+    async def send_message(self, msg, bulk: bool = False):
+        """
+        Sends `msg` to this peer.
+        \n`bulk` messages wait for the peer's and node's upload limits, while other messages are sent immediately
+        and only count towards them.
+        """
         if isinstance(msg, CORE_MESSAGES):
             envelope = MessageEnvelope(msg)
         else:
@@ -131,9 +166,16 @@ class Peer:
    
         
         cmd = envelope.command.decode("ascii", errors="replace")
-        serialized_envelope = envelope.serialize()
+        serialized_envelope = envelope.serialize(compression=self.compression)
         log.info(f"[{self.str_ip}] Sending message: {cmd} ({len(serialized_envelope)} bytes)")
 
+        if bulk:
+            await self.upload_limiter.throttle(len(serialized_envelope))
+            await self.node.upload_limiter.throttle(len(serialized_envelope))
+        else:
+            self.upload_limiter.consume(len(serialized_envelope))
+            self.node.upload_limiter.consume(len(serialized_envelope))
+
         try:
             print("SEND", type(envelope.message))
             self.writer.write(serialized_envelope)
@@ -142,6 +184,7 @@ class Peer:
             # Tracking
             self.bytes_sent += len(serialized_envelope)
             self.node.bytes_sent += len(serialized_envelope)
+            self.bytes_saved_sent += envelope.payload_size - len(serialized_envelope)
             self.last_send_timestamp = int(time.time())
 
             log.info(f"[{self.str_ip}] Sent message: {cmd} ({len(serialized_envelope)} bytes)\n{envelope}")
@@ -166,7 +209,12 @@ class Peer:
 
         await self.send_message(version_message)
     
+    async def send_feefilter(self, fee_rate: int):
+        self.sent_fee_filter = fee_rate
+        await self.send_message(FeeFilterMessage(fee_rate))
+    
     async def send_getblocks(self):
+        self.last_getblocks_timestamp = int(time.time())
         await self.send_message(
             GetBlocksMessage(
                 PROTOCOL_VERSION,
@@ -175,6 +223,52 @@ class Peer:
             )
         )
         
+    def queue_inventory(self, inv_type: int, inv_hash: bytes, fee_rate: float | None = None):
+        """
+        Queues an item to be announced in this peer's next batched `inv`, 
+        unless the peer already knows it or the tx `fee_rate` (khets/KB) is below the peer's `feefilter`.
+        """
+        if fee_rate is not None and fee_rate < self.fee_filter:
+            return
+        if inv_hash not in self.known_inventory:
+            self.inv_queue[inv_hash] = inv_type
+
+    async def flush_inventory(self):
+        """Announces all queued items that this peer doesn't know about yet, then schedules the next trickle."""
+        mean_delay = INV_TRICKLE_INBOUND if self.direction == "inbound" else INV_TRICKLE_OUTBOUND
+        self.next_inv_send = time.time() + expovariate(1 / mean_delay)
+
+        inventory = []
+        for inv_hash, inv_type in self.inv_queue.items():
+            if inv_hash not in self.known_inventory:
+                self.known_inventory.insert(inv_hash)
+                inventory.append((inv_type, inv_hash))
+        self.inv_queue.clear()
+
+        for i in range(0, len(inventory), INV_LIMIT):
+            await self.send_message(InvMessage(inventory[i:i + INV_LIMIT]))
+
+    def queue_block_uploads(self, block_hashes: list[bytes]):
+        """Queues historical blocks requested by this peer, to be served in the background within the upload limits."""
+        self.block_upload_queue.extend(block_hashes)
+        if self._block_upload_task is None or self._block_upload_task.done():
+            self._block_upload_task = self.node.spawn(self._serve_block_uploads())
+
+    async def _serve_block_uploads(self):
+        while self.block_upload_queue:
+            if self.node.upload_target_reached():
+                log.info(f"[{self.str_ip}] Daily upload target reached; not serving {len(self.block_upload_queue)} old blocks.")
+                not_found = [(BLOCK_TYPE, block_hash) for block_hash in self.block_upload_queue]
+                self.block_upload_queue.clear()
+                await self.send_message(NotFoundMessage(not_found))
+                return
+
+            block_hash = self.block_upload_queue.popleft()
+            if block_raw := get_raw_block(block_hash):
+                await self.send_message(BlockMessage(block_raw), bulk=True)
+            else:
+                await self.send_message(NotFoundMessage([(BLOCK_TYPE, block_hash)]))
+
     async def listen(self) -> None:
         while True:
             if self.reader.at_eof():
@@ -192,15 +286,20 @@ class Peer:
                 log.error(f"[{self.str_ip}] Error putting message onto queue: {e}. Stopping listener.")
                 break
 
+            # Stop reading from the socket until we are within the download limits again
+            await self.download_limiter.throttle(envelope.wire_size)
+            await self.node.download_limiter.throttle(envelope.wire_size)
+
         log.info(f"[{self.str_ip}] Listener task stopped.")
         await self.close()
 
     async def close(self):
         log.info(f"[{self.str_ip}] Closing connection")
+        self.block_upload_queue.clear()
 
         try:
             if self.last_recv_timestamp:
-                await set_last_seen(self.ip, self.port, self.last_recv_timestamp)
+                self.node.addrman.connected(self.ip, self.port, self.last_recv_timestamp)
 
             self.writer.close()
             await self.writer.wait_closed()
@@ -232,7 +331,17 @@ class Peer:
             await self.close()
             return
         self.latest_ping_time_ms = int((time_pong_received - time_ping_sent) * 1000)
-        self.ping_times.append(self.latest_ping_time_ms)
+        self.stats.record_ping(self.latest_ping_time_ms)
+
+    def is_stalling(self, now: float) -> bool:
+        """
+        Returns True if the peer hasn't sent a block within `BLOCK_REQUEST_TIMEOUT` of our last `getblocks`.
+        \nStalling peers are given another chance after 10 timeouts.
+        """
+        return (
+            self.last_getblocks_timestamp > self.last_block_timestamp
+            and BLOCK_REQUEST_TIMEOUT < now - self.last_getblocks_timestamp < 10 * BLOCK_REQUEST_TIMEOUT
+        )
 
     @property
     def connection_time(self) -> int:
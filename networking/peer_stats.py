@@ -0,0 +1,67 @@
+import time
+from collections import deque
+from statistics import median
+
+from networking.constants import INVALID_DATA_WINDOW, PEER_STATS_WINDOW, PING_TIMEOUT
+
+
+class PeerStats:
+    """
+    Rolling performance statistics of a peer, each kept in a ring buffer of the last `PEER_STATS_WINDOW` samples.
+    \nUsed to prefer fast peers for block downloads, and to pick which inbound peer to evict when slots are full.
+    """
+    def __init__(self):
+        self.ping_times: deque[int] = deque(maxlen=PEER_STATS_WINDOW)           # Round trip (ms)
+        self.block_latencies: deque[float] = deque(maxlen=PEER_STATS_WINDOW)    # Time from `getdata` to block (s)
+        self.recv_rates: deque[float] = deque(maxlen=PEER_STATS_WINDOW)         # Bytes received per second
+        self.invalid_times: deque[float] = deque(maxlen=PEER_STATS_WINDOW)      # When invalid data was received
+
+        self._last_sample_time: float = time.time()
+        self._last_sample_bytes: int = 0
+
+    def record_ping(self, ping_ms: int):
+        self.ping_times.append(ping_ms)
+
+    def record_block_latency(self, latency: float):
+        self.block_latencies.append(latency)
+
+    def record_invalid(self):
+        self.invalid_times.append(time.time())
+
+    def sample_recv_rate(self, bytes_recv: int, now: float):
+        """Records the receive rate since the last sample, given the peer's total `bytes_recv`."""
+        elapsed = now - self._last_sample_time
+        if elapsed <= 0:
+            return
+        self.recv_rates.append((bytes_recv - self._last_sample_bytes) / elapsed)
+        self._last_sample_time = now
+        self._last_sample_bytes = bytes_recv
+
+    @property
+    def median_ping(self) -> float:
+        return median(self.ping_times) if self.ping_times else PING_TIMEOUT * 1000 / 2
+
+    @property
+    def mean_block_latency(self) -> float | None:
+        return sum(self.block_latencies) / len(self.block_latencies) if self.block_latencies else None
+
+    @property
+    def mean_recv_rate(self) -> float:
+        return sum(self.recv_rates) / len(self.recv_rates) if self.recv_rates else 0
+
+    @property
+    def invalid_count(self) -> int:
+        """No. of times invalid data was received within the last `INVALID_DATA_WINDOW` seconds."""
+        since = time.time() - INVALID_DATA_WINDOW
+        return sum(1 for t in self.invalid_times if t > since)
+
+    def score(self) -> float:
+        """
+        Higher is better. Each of ping, block latency and receive rate contributes up to 1,
+        and every recent piece of invalid data costs 1.
+        """
+        ping_score = 1 / (1 + self.median_ping / 100)
+        latency = self.mean_block_latency
+        latency_score = 0.5 if latency is None else 1 / (1 + latency)
+        rate_score = min(1.0, self.mean_recv_rate / 100_000)
+        return ping_score + latency_score + rate_score - self.invalid_count
@@ -4,19 +4,22 @@ import time
 
 
 from blockchain.block import Block
+from blockchain.header import Header
 from blockchain.transaction import Transaction
 from crypto.hashing import HASH256
 from db.block import get_block_exists, get_block_height_at_hash, get_raw_block, get_raw_header
 from db.functions import process_new_block
 from db.height import get_block_hash_at_height
 from db.index import get_block_index
-from db.peers import load_all_active_peers, save_peer_from_addr
 from db.tx import get_tx_exists, get_tx
-from networking.constants import BLOCK_TYPE, GETADDR_LIMIT, GETBLOCKS_LIMIT, GETHEADERS_LIMIT, TX_TYPE
+from mining.mempool import RECENT_REJECT_REASONS
+from networking.compact import PartialBlock
+from networking.constants import BLOCK_TYPE, GETADDR_LIMIT, GETBLOCKS_LIMIT, GETHEADERS_LIMIT, HISTORICAL_BLOCK_DEPTH, TX_TYPE
 from networking.messages.envelope import MessageEnvelope
 from networking.messages.types import *
 from networking.peer import Peer
-from utils.helper import encode_ip, int_to_bytes, int_to_bytes
+from utils.config import APP_CONFIG
+from utils.helper import bits_to_target, bytes_to_int, encode_ip
 from utils.ip import is_routable
 
 
@@ -76,24 +79,16 @@ class MessageProcessor:
 
     async def process_inv(self, peer: Peer, msg: InvMessage):
         inventory = msg.inventory
-        missing_inventory = []
-        for item in inventory:
-            inv_type, inv_hash = item
-            if inv_type == TX_TYPE:  # TX
-                if peer.node.mempool.get_valid_tx(inv_hash):
-                    continue
-                elif get_tx_exists(inv_hash):
-                    continue
-            elif inv_type == BLOCK_TYPE: # BLOCK
-                if get_block_exists(inv_hash):
-                    continue
-            else: # 0 or some other invalid type - ignore
-                continue
-            missing_inventory.append((inv_type, inv_hash))
+        for _, inv_hash in inventory:
+            peer.known_inventory.insert(inv_hash)
+            
+        missing_inventory = [
+            (inv_type, inv_hash) for inv_type, inv_hash in inventory 
+            if not self.node.have_inventory(inv_type, inv_hash)
+        ]
         
         if missing_inventory:
-            getdata_msg = GetDataMessage(missing_inventory)
-            await peer.send_message(getdata_msg)
+            await self.node.request_manager.on_inv(peer, missing_inventory)
 
     async def process_getaddr(self, peer: Peer, msg: GetAddrMessage):
         addresses = set()
@@ -102,35 +97,27 @@ class MessageProcessor:
                 continue
 
             addr = (
-                int_to_bytes(connected_peer.last_recv),
-                int_to_bytes(connected_peer.services, 8),
-                encode_ip(peer.ip),
-                int_to_bytes(peer.port, 2)
+                connected_peer.last_recv_timestamp,
+                connected_peer.services,
+                encode_ip(connected_peer.ip),
+                connected_peer.port
             )
             addresses.add(addr)
 
-        # default limit = 8, chosen by random
-        # right now it just returns
-        active_peers = await load_all_active_peers()
-        
-        if active_peers:
-            active_peers = active_peers[:GETADDR_LIMIT]
-            for peer_meta in active_peers:
-                addr = (peer_meta.last_seen, peer_meta.services, peer_meta.ip_bytes, peer_meta.port)
-                addresses.add(addr)
+        # Up to `GETADDR_LIMIT` random addresses recently seen
+        max_age = APP_CONFIG.get("node", "peer_inactive_timeout")
+        for info in self.node.addrman.get_addresses(GETADDR_LIMIT, max_age):
+            addresses.add((info.last_seen, info.services, encode_ip(info.ip), info.port))
 
+        if addresses:
             addr_msg = AddrMessage(list(addresses))
             await peer.send_message(addr_msg)
 
     async def process_addr(self, peer: Peer, msg: AddrMessage):
-        # Filter addresses
-
-        # Process incoming addresses
-        for addr in msg.addresses:
-            ip = addr[2]
-            if is_routable(ip):
-                await save_peer_from_addr(addr)
-                
+        # Only keep addresses reachable from the internet
+        addresses = [addr for addr in msg.addresses if is_routable(addr[2])]
+        if addresses:
+            self.node.addrman.add(addresses, source=peer.ip)
 
 
     async def process_getheaders(self, peer: Peer, msg: GetHeadersMessage):
@@ -168,9 +155,51 @@ class MessageProcessor:
         await peer.send_message(header_msg)
 
     async def process_headers(self, peer: Peer, msg: HeadersMessage):
-        """Honestly I have no use for this yet"""
-        headers = msg.headers
+        """
+        Validates headers pushed by a peer, either announcing new blocks (see `sendheaders`) or replying to `getheaders`.
+        \nBodies are requested immediately for blocks that would extend our best chain.
+        """
+        if not msg.headers:
+            return
         
+        headers = [Header.parse(raw) for raw in msg.headers]
+        parent_index = get_block_index(headers[0].prev_block)
+        if parent_index is None:  # Doesn't connect to any block we have; catch up first
+            await peer.send_getblocks()
+            return
+        
+        chainwork = parent_index.chainwork
+        prev_hash = parent_index.hash
+        to_request = []
+        for header in headers:
+            block_hash = header.hash()
+            target = bits_to_target(header.bits)
+            
+            if header.prev_block != prev_hash:
+                log.warning(f"[{peer.str_ip}] Received non-continuous headers. Ignoring.")
+                peer.stats.record_invalid()
+                return
+            if bytes_to_int(block_hash) >= target:
+                log.warning(f"[{peer.str_ip}] Received header {block_hash.hex()} with invalid proof of work. Ignoring.")
+                peer.stats.record_invalid()
+                return
+            if header.timestamp > time.time() + 3600 * 2:
+                log.warning(f"[{peer.str_ip}] Received header {block_hash.hex()} too far into the future. Ignoring.")
+                peer.stats.record_invalid()
+                return
+            
+            peer.known_inventory.insert(block_hash)
+            chainwork += header.work()
+            if not self.node.have_inventory(BLOCK_TYPE, block_hash):
+                to_request.append((BLOCK_TYPE, block_hash))
+            prev_hash = block_hash
+            
+        peer.height = max(peer.height, parent_index.height + len(headers))
+        if to_request and chainwork > self.node.block_tip_index.chainwork:
+            await self.node.request_manager.on_inv(peer, to_request)
+            
+    async def process_sendheaders(self, peer: Peer, msg: SendHeadersMessage):
+        peer.prefers_headers = True
 
     async def process_getblocks(self, peer: Peer, msg: GetBlocksMessage):
         locator_hashes = msg.locator_hashes
@@ -213,6 +242,12 @@ class MessageProcessor:
         # process new block
         block_raw = msg.block
         block = Block.parse(BytesIO(block_raw))
+        await self._accept_block(peer, block)
+        
+    async def _accept_block(self, peer: Peer, block: Block):
+        """Processes a full block received from `peer`, whether sent whole or reconstructed from a compact block."""
+        peer.known_inventory.insert(block.hash())
+        self.node.request_manager.on_received(peer, block.hash())
 
         # 0.1 Block already seen & saved
         if get_block_exists(block.hash()):
@@ -229,11 +264,85 @@ class MessageProcessor:
         # 2. If the block is successfully verified & saved, this tells us that the peer is at least at that block's height
         if index := get_block_index(block.hash()):
             peer.height = index.height
+        else:
+            log.warning(f"[{peer.str_ip}] Received invalid block {block.hash().hex()}")
+            peer.stats.record_invalid()
+
 
 
+    async def process_sendcmpct(self, peer: Peer, msg: SendCmpctMessage):
+        peer.compact_blocks = msg.announce
+        
+    async def process_cmpctblock(self, peer: Peer, msg: CmpctBlockMessage):
+        header = Header.parse(msg.header)
+        block_hash = header.hash()
+        peer.known_inventory.insert(block_hash)
+        
+        if get_block_exists(block_hash) or block_hash in self.node.partial_blocks:
+            return
+        
+        # Cheap proof of work check before doing any reconstruction work
+        if bytes_to_int(block_hash) >= bits_to_target(header.bits):
+            log.warning(f"[{peer.str_ip}] Compact block {block_hash.hex()} has invalid proof of work.")
+            peer.stats.record_invalid()
+            return
+        
+        # We are missing its parent, so the mempool is unlikely to help; download it whole
+        if not get_block_exists(header.prev_block):
+            await self.node.request_manager.on_inv(peer, [(BLOCK_TYPE, block_hash)])
+            return
+        
+        try:
+            partial = PartialBlock(msg, self.node.mempool, peer)
+        except ValueError as e:
+            log.info(f"[{peer.str_ip}] Cannot reconstruct compact block ({e}); requesting full block.")
+            await self.node.request_manager.on_inv(peer, [(BLOCK_TYPE, block_hash)])
+            return
+        
+        self.node.request_manager.track(peer, BLOCK_TYPE, block_hash)
+        if missing := partial.missing:
+            self.node.add_partial_block(partial)
+            await peer.send_message(GetBlockTxnMessage(block_hash, missing))
+        else:
+            await self._accept_partial_block(peer, partial)
+            
+    async def _accept_partial_block(self, peer: Peer, partial: PartialBlock):
+        if block := partial.to_block():
+            await self._accept_block(peer, block)
+        else:  # Short ID collision with a mempool transaction
+            log.info(f"[{peer.str_ip}] Compact block {partial.block_hash.hex()} failed to reconstruct; requesting full block.")
+            await peer.send_message(GetDataMessage([(BLOCK_TYPE, partial.block_hash)]))
+            
+    async def process_getblocktxn(self, peer: Peer, msg: GetBlockTxnMessage):
+        envelope = self.node.block_cache.get(msg.block_hash)
+        block_raw = envelope.payload if envelope else get_raw_block(msg.block_hash)
+        if block_raw is None:
+            await peer.send_message(NotFoundMessage([(BLOCK_TYPE, msg.block_hash)]))
+            return
+        
+        txs = Block.parse(block_raw).get_transactions()
+        if any(index >= len(txs) for index in msg.indexes):
+            log.warning(f"[{peer.str_ip}] getblocktxn index out of range for block {msg.block_hash.hex()}")
+            peer.stats.record_invalid()
+            return
+        
+        await peer.send_message(BlockTxnMessage(msg.block_hash, [txs[i] for i in msg.indexes]))
+        
+    async def process_blocktxn(self, peer: Peer, msg: BlockTxnMessage):
+        partial = self.node.partial_blocks.get(msg.block_hash)
+        if partial is None or partial.peer != peer:
+            return
+        
+        del self.node.partial_blocks[msg.block_hash]
+        if partial.fill(msg.txs):
+            await self._accept_partial_block(peer, partial)
+        else:
+            await peer.send_message(GetDataMessage([(BLOCK_TYPE, partial.block_hash)]))
 
     async def process_getdata(self, peer: Peer, msg: GetDataMessage):
         inventory = msg.inventory
+        not_found = []
+        historical = []
 
         for inv_type, inv_hash in inventory:
             if inv_type == TX_TYPE:
@@ -245,24 +354,55 @@ class MessageProcessor:
                     tx_msg = TxMessage(tx)   # Stored in local Mempool
                     await peer.send_message(tx_msg)   
                     
+                else:
+                    not_found.append((inv_type, inv_hash))
+                    
             elif inv_type == BLOCK_TYPE:
-                if block_raw := get_raw_block(inv_hash):
+                # Recent blocks are served from the cache, without touching the database
+                if envelope := self.node.block_cache.get(inv_hash):
+                    await peer.send_message(envelope)
+                    continue
+
+                # Old blocks are served in the background as bulk traffic, so that relay isn't held up by syncing peers
+                index = get_block_index(inv_hash)
+                if index and index.height <= self.node.block_tip_index.height - HISTORICAL_BLOCK_DEPTH:
+                    historical.append(inv_hash)
+                    
+                elif block_raw := get_raw_block(inv_hash):
+                    self.node.block_cache.add(inv_hash, block_raw)
                     block_msg = BlockMessage(block_raw)
                     await peer.send_message(block_msg)
+                else:
+                    not_found.append((inv_type, inv_hash))
+                    
+        # Let the peer request these from someone else
+        if not_found:
+            await peer.send_message(NotFoundMessage(not_found))
+            
+        if historical:
+            peer.queue_block_uploads(historical)
+            
+    async def process_notfound(self, peer: Peer, msg: NotFoundMessage):
+        await self.node.request_manager.on_notfound(peer, msg.inventory)
 
 
     async def process_tx(self, peer: Peer, msg: TxMessage):
         tx_raw = msg.tx
         tx = Transaction.parse(BytesIO(tx_raw))
+        peer.known_inventory.insert(tx.hash())
+        self.node.request_manager.on_received(peer, tx.hash())
 
         # Mempool usage
         if get_tx_exists(tx.hash()):
             return
 
-        if peer.node.mempool.add_tx(tx):
+        if (reason := peer.node.mempool.add_tx(tx, peer.session_id)) is None:
             log.info(f"Transaction {tx.hash().hex()} successfully added into mempool")
         else:
-            log.info(f"Transaction {tx.hash().hex()} rejected from mempool")
+            # Orphans the pool did not keep may be fetched again from another peer once their parents arrive
+            if reason in RECENT_REJECT_REASONS:
+                self.node.add_recent_reject(tx.hash())
+            log.info(f"Transaction {tx.hash().hex()} rejected from mempool ({reason})")
 
         # Other usage if any
 
@@ -271,9 +411,12 @@ class MessageProcessor:
 
     async def process_mempool(self, peer: Peer, msg: MempoolMessage):
         """Returns an `inv` message containing the transaction hashes of all valid mempool transactions"""
-        inventory = [(TX_TYPE, tx.hash()) for tx in self.node.mempool.get_all_valid_tx()]
-        if inventory:
-            inv_msg = InvMessage(inventory)
-            await peer.send_message(inv_msg)
+        for tx in self.node.mempool.get_all_valid_tx():
+            tx_hash = tx.hash()
+            peer.queue_inventory(TX_TYPE, tx_hash, self.node.mempool.get_fee_rate(tx_hash))
+        await peer.flush_inventory()
+        
+    async def process_feefilter(self, peer: Peer, msg: FeeFilterMessage):
+        peer.fee_filter = msg.fee_rate
 
 
@@ -0,0 +1,116 @@
+import logging
+import time
+
+from networking.constants import BLOCK_REQUEST_TIMEOUT, BLOCK_TYPE, TX_REQUEST_TIMEOUT
+from networking.messages.types.getdata import GetDataMessage
+from networking.peer import Peer
+
+log = logging.getLogger(__name__)
+
+
+class InFlightRequest:
+    __slots__ = ("inv_type", "peer", "requested_at", "announcers")
+
+    def __init__(self, inv_type: int, peer: Peer, requested_at: float):
+        self.inv_type = inv_type
+        self.peer = peer
+        self.requested_at = requested_at
+        self.announcers: list[Peer] = []  # Other peers that announced this item, in order of announcement
+
+
+class RequestManager:
+    """
+    Tracks which peer each transaction or block is currently being downloaded from, so that an item is only requested once at a time.
+
+    If the peer answers with `notfound`, disconnects or takes too long, the item is requested from the best scoring peer that also announced it.
+    """
+    def __init__(self, node):
+        self.node = node
+        self.in_flight: dict[bytes, InFlightRequest] = dict()
+        self._last_block_received: dict[Peer, float] = dict()  # For peers serving many blocks at once
+
+    async def on_inv(self, peer: Peer, inventory: list[tuple[int, bytes]]):
+        """Requests every missing item in `inventory` from `peer`, unless it is already in flight from another peer."""
+        now = time.time()
+        to_request = []
+        for inv_type, inv_hash in inventory:
+            if request := self.in_flight.get(inv_hash):
+                if peer != request.peer and peer not in request.announcers:
+                    request.announcers.append(peer)
+                continue
+
+            self.in_flight[inv_hash] = InFlightRequest(inv_type, peer, now)
+            to_request.append((inv_type, inv_hash))
+
+        if to_request:
+            await peer.send_message(GetDataMessage(to_request))
+
+    def track(self, peer: Peer, inv_type: int, inv_hash: bytes):
+        """Records `inv_hash` as in flight from `peer` without sending `getdata`, e.g. while a compact block is being completed."""
+        if inv_hash not in self.in_flight:
+            self.in_flight[inv_hash] = InFlightRequest(inv_type, peer, time.time())
+
+    def on_received(self, peer: Peer, inv_hash: bytes):
+        """Marks `inv_hash` as received, whether or not it was requested from `peer`."""
+        request = self.in_flight.pop(inv_hash, None)
+        if request and request.inv_type == BLOCK_TYPE:
+            now = time.time()
+            self._last_block_received[peer] = now
+            if request.peer == peer:
+                peer.stats.record_block_latency(now - request.requested_at)
+
+    async def on_notfound(self, peer: Peer, inventory: list[tuple[int, bytes]]):
+        retry = [
+            inv_hash for _, inv_hash in inventory
+            if (request := self.in_flight.get(inv_hash)) and request.peer == peer
+        ]
+        await self._rerequest(retry)
+
+    def on_peer_removed(self, peer: Peer):
+        """Expires all requests in flight from `peer`, so they are re-requested on the next `expire_requests`."""
+        self._last_block_received.pop(peer, None)
+        for request in self.in_flight.values():
+            if request.peer == peer:
+                request.requested_at = 0
+            elif peer in request.announcers:
+                request.announcers.remove(peer)
+
+    async def expire_requests(self):
+        """Re-requests every item whose peer hasn't delivered it in time. Called regularly by the node."""
+        now = time.time()
+        expired = []
+        for inv_hash, request in self.in_flight.items():
+            if request.inv_type == BLOCK_TYPE:
+                # A peer serving a long list of blocks is not timed out while it keeps delivering
+                last_progress = max(request.requested_at, self._last_block_received.get(request.peer, 0))
+                timed_out = now - last_progress > BLOCK_REQUEST_TIMEOUT
+            else:
+                timed_out = now - request.requested_at > TX_REQUEST_TIMEOUT
+
+            if timed_out:
+                expired.append(inv_hash)
+
+        await self._rerequest(expired)
+
+    async def _rerequest(self, inv_hashes: list[bytes]):
+        """Requests each of `inv_hashes` from the best connected peer that announced it, or forgets it if there are none."""
+        now = time.time()
+        batches: dict[Peer, list[tuple[int, bytes]]] = dict()
+        for inv_hash in inv_hashes:
+            request = self.in_flight[inv_hash]
+
+            # Prefer the best scoring peer among the other announcers
+            request.announcers = [p for p in request.announcers if p in self.node.peers]
+            if request.announcers:
+                next_peer = max(request.announcers, key=lambda p: p.stats.score())
+                request.announcers.remove(next_peer)
+                log.info(f"[{request.peer.str_ip}] Request for {inv_hash.hex()} failed; re-requesting from {next_peer.str_ip}")
+                request.peer = next_peer
+                request.requested_at = now
+                batches.setdefault(next_peer, []).append((request.inv_type, inv_hash))
+            else:
+                log.info(f"[{request.peer.str_ip}] Request for {inv_hash.hex()} failed; no other peer to request from")
+                del self.in_flight[inv_hash]
+
+        for peer, inventory in batches.items():
+            await peer.send_message(GetDataMessage(inventory))
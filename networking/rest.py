@@ -0,0 +1,145 @@
+"""
+Unauthenticated REST interface for bulk reads of public blockchain data in binary form.
+
+    GET /rest/block/<hash>.bin                 Serialized block
+    GET /rest/headers/<count>/<hash>.bin       Up to `count` consecutive 80B headers, starting at `hash`
+    GET /rest/tx/<hash>.bin                    Serialized transaction, from the blockchain or the mempool
+    GET /rest/blockrange/<height>/<count>.bin  Up to `count` consecutive blocks starting at `height`,
+                                               concatenated and streamed in chunks
+
+Blocks and transactions are sliced out of the blk*.dat files as stored, without being parsed.
+"""
+
+import asyncio
+import logging
+from http import HTTPStatus
+
+from db.block import get_block_height_at_hash, get_raw_block, get_raw_blocks_in_range
+from db.height import get_block_hash_at_height
+from db.tx import get_tx
+from networking.http import HTTPRequest, build_chunk, build_response, build_response_head, http_connection_handler
+from utils.config import APP_CONFIG
+
+log = logging.getLogger(__name__)
+
+MAX_REST_HEADERS = 2000
+BLOCK_RANGE_CHUNK_SIZE = 4 * (1 << 20)  # Bytes of blocks read from disk per chunk while streaming a range
+
+BINARY = "application/octet-stream"
+
+
+class RESTServer:
+    def __init__(self, node):
+        self.node = node
+        self.server: asyncio.Server | None = None
+
+    async def start(self):
+        bind = APP_CONFIG.get("node", "rest_bind")
+        port = APP_CONFIG.get("node", "rest_port")
+        self.server = await asyncio.start_server(http_connection_handler(self._handle_http, "REST"), bind, port)
+        log.info(f"REST server listening on {bind}:{port}")
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _run(self, func, *args):
+        return await self.node.loop.run_in_executor(None, func, *args)
+
+    async def _handle_http(self, request: HTTPRequest, writer: asyncio.StreamWriter) -> bool:
+        keep_alive = request.keep_alive
+        if request.method != "GET":
+            return await self._reply(writer, HTTPStatus.METHOD_NOT_ALLOWED, b"REST interface handles only GET requests", keep_alive)
+
+        path = request.path.split("?", 1)[0]
+        if not path.startswith("/rest/") or not path.endswith(".bin"):
+            return await self._reply(writer, HTTPStatus.NOT_FOUND, b"Not found", keep_alive)
+        route, *params = path[len("/rest/"):-len(".bin")].split("/")
+
+        try:
+            if route == "block" and len(params) == 1:
+                body = await self.get_block(_parse_hash(params[0]))
+            elif route == "headers" and len(params) == 2:
+                body = await self.get_headers(_parse_int(params[0]), _parse_hash(params[1]))
+            elif route == "tx" and len(params) == 1:
+                body = await self.get_tx(_parse_hash(params[0]))
+            elif route == "blockrange" and len(params) == 2:
+                return await self.stream_block_range(writer, _parse_int(params[0]), _parse_int(params[1]), keep_alive)
+            else:
+                return await self._reply(writer, HTTPStatus.NOT_FOUND, b"Not found", keep_alive)
+        except ValueError as e:
+            return await self._reply(writer, HTTPStatus.BAD_REQUEST, str(e).encode(), keep_alive)
+
+        if body is None:
+            return await self._reply(writer, HTTPStatus.NOT_FOUND, b"Not found", keep_alive)
+        return await self._reply(writer, HTTPStatus.OK, body, keep_alive, BINARY)
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes, keep_alive: bool, content_type: str = "text/plain") -> bool:
+        writer.write(build_response(status, body, content_type, keep_alive))
+        await writer.drain()
+        return keep_alive
+
+    async def get_block(self, block_hash: bytes) -> bytes | None:
+        if envelope := self.node.block_cache.get(block_hash):
+            return envelope.payload
+        return await self._run(get_raw_block, block_hash)
+
+    async def get_headers(self, count: int, block_hash: bytes) -> bytes | None:
+        if not 1 <= count <= MAX_REST_HEADERS:
+            raise ValueError(f"Header count must be between 1 and {MAX_REST_HEADERS}")
+
+        def work():
+            # Only headers of the active chain can be read by height
+            height = get_block_height_at_hash(block_hash)
+            if height is None or get_block_hash_at_height(height) != block_hash:
+                return None
+            return b"".join(get_raw_blocks_in_range(height, count, headers_only=True))
+
+        return await self._run(work)
+
+    async def get_tx(self, tx_hash: bytes) -> bytes | None:
+        if tx := self.node.mempool.get_valid_tx(tx_hash):
+            return tx.serialize()
+        return await self._run(get_tx, tx_hash)
+
+    async def stream_block_range(self, writer: asyncio.StreamWriter, start_height: int, count: int, keep_alive: bool) -> bool:
+        """Streams the blocks in chunks of about `BLOCK_RANGE_CHUNK_SIZE`, reading the next chunk from disk while the last one is sent."""
+        tip_height = self.node.block_tip_index.height
+        if start_height > tip_height or count < 1:
+            return await self._reply(writer, HTTPStatus.NOT_FOUND, b"Block range not found", keep_alive)
+        end_height = min(start_height + count, tip_height + 1)
+
+        writer.write(build_response_head(HTTPStatus.OK, BINARY, keep_alive, {"Transfer-Encoding": "chunked"}))
+        height = start_height
+        while height < end_height:
+            blocks = await self._run(get_raw_blocks_in_range, height, end_height - height, False, BLOCK_RANGE_CHUNK_SIZE)
+            if not blocks:
+                # The chain was reorganized past this height; the client sees fewer blocks than requested
+                log.warning(f"[REST] Block range stream stopped at height {height}")
+                break
+            await writer.drain()
+            writer.write(build_chunk(b"".join(blocks)))
+            height += len(blocks)
+
+        writer.write(build_chunk(b""))
+        await writer.drain()
+        return keep_alive
+
+
+def _parse_hash(value: str) -> bytes:
+    try:
+        result = bytes.fromhex(value)
+    except ValueError:
+        result = b""
+    if len(result) != 32:
+        raise ValueError(f"Invalid hash: {value}")
+    return result
+
+
+def _parse_int(value: str) -> int:
+    if not value.isdigit():
+        raise ValueError(f"Invalid number: {value}")
+    return int(value)
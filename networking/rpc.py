@@ -0,0 +1,396 @@
+"""
+JSON-RPC server for programmatic access to the node, served over HTTP POST in the node's event loop.
+
+Requests follow bitcoind's JSON-RPC 1.0 style; a JSON array of requests is processed as a batch.
+Database reads and (de)serialization run in the default executor, while calls that change
+the mempool or the blockchain run in the event loop, like messages from peers.
+"""
+
+import asyncio
+import inspect
+import ipaddress
+import json
+import logging
+import time
+from http import HTTPStatus
+
+from blockchain.block import Block
+from blockchain.header import Header
+from blockchain.transaction import Transaction
+from crypto.key import wif_decode, wif_encode
+from db.block import get_block_exists, get_raw_block, get_raw_header, median_time_past
+from db.functions import process_new_block
+from db.index import get_block_index
+from db.tx import get_tx, get_tx_height
+from db.utxo import get_utxo_set_to_addr
+from ktc_constants import MAX_BLOCK_SIZE
+from mining.constants import FEE_ESTIMATE_MAX_TARGET
+from mining.mempool import RECENT_REJECT_REASONS
+from networking.http import HTTPRequest, build_response, check_basic_auth, http_connection_handler
+from utils.config import APP_CONFIG
+from utils.helper import bits_to_target
+
+log = logging.getLogger(__name__)
+
+# Error codes, as used by bitcoind
+RPC_PARSE_ERROR = -32700
+RPC_INVALID_REQUEST = -32600
+RPC_METHOD_NOT_FOUND = -32601
+RPC_INVALID_PARAMS = -32602
+RPC_INTERNAL_ERROR = -32603
+RPC_INVALID_PARAMETER = -8
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+RPC_NOT_FOUND = -5
+RPC_DESERIALIZATION_ERROR = -22
+RPC_VERIFY_REJECTED = -26
+
+MAX_BATCH_SIZE = 1000
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _parse_hash(value) -> bytes:
+    try:
+        result = bytes.fromhex(value)
+    except (TypeError, ValueError):
+        result = b""
+    if len(result) != 32:
+        raise RPCError(RPC_INVALID_PARAMETER, f"Invalid hash: {value}")
+    return result
+
+
+def _parse_hex(value) -> bytes:
+    try:
+        return bytes.fromhex(value)
+    except (TypeError, ValueError):
+        raise RPCError(RPC_DESERIALIZATION_ERROR, "Data must be hexadecimal")
+
+
+def tx_to_json(tx: Transaction) -> dict:
+    result = {
+        "txid": tx.hash().hex(),
+        "version": tx.version,
+        "size": tx.size(),
+        "locktime": tx.locktime,
+        "vin": [],
+        "vout": [],
+    }
+    for tx_in in tx.inputs:
+        if tx.is_coinbase():
+            result["vin"].append({"coinbase": tx_in.script_sig.serialize().hex(), "sequence": tx_in.sequence})
+        else:
+            result["vin"].append({
+                "txid": tx_in.prev_tx_hash.hex(),
+                "vout": tx_in.prev_index,
+                "scriptSig": tx_in.script_sig.serialize().hex(),
+                "sequence": tx_in.sequence,
+            })
+    for i, tx_out in enumerate(tx.outputs):
+        receiver = tx_out.script_pubkey.get_script_pubkey_receiver()
+        result["vout"].append({
+            "n": i,
+            "value": tx_out.value,
+            "scriptPubKey": tx_out.script_pubkey.serialize().hex(),
+            "address": wif_encode(receiver) if receiver else None,
+        })
+    return result
+
+
+def header_to_json(header: Header, tip_height: int) -> dict:
+    block_hash = header.hash()
+    index = get_block_index(block_hash)
+    height = index.height if index else None
+    return {
+        "hash": block_hash.hex(),
+        "height": height,
+        "confirmations": tip_height - height + 1 if height is not None else 0,
+        "version": header.version,
+        "previousblockhash": header.prev_block.hex(),
+        "merkleroot": header.merkle_root.hex(),
+        "time": header.timestamp,
+        "bits": header.bits.hex(),
+        "target": f"{bits_to_target(header.bits):064x}",
+        "nonce": header.nonce,
+        "chainwork": f"{index.chainwork:064x}" if index else None,
+    }
+
+
+class RPCServer:
+    def __init__(self, node):
+        self.node = node
+        self.server: asyncio.Server | None = None
+
+        self.methods = {
+            "getblock": self.getblock,
+            "getblockheader": self.getblockheader,
+            "getrawtransaction": self.getrawtransaction,
+            "sendrawtransaction": self.sendrawtransaction,
+            "getmempoolinfo": self.getmempoolinfo,
+            "estimatesmartfee": self.estimatesmartfee,
+            "getutxos": self.getutxos,
+            "getblocktemplate": self.getblocktemplate,
+            "submitblock": self.submitblock,
+        }
+
+    async def start(self):
+        bind = APP_CONFIG.get("node", "rpc_bind")
+        port = APP_CONFIG.get("node", "rpc_port")
+        if not APP_CONFIG.get("node", "rpc_password") and not _is_loopback(bind):
+            log.error(f"RPC server not started: rpc_password must be set to listen on {bind or 'all interfaces'}.")
+            return
+        self.server = await asyncio.start_server(http_connection_handler(self._handle_http, "RPC"), bind, port)
+        log.info(f"RPC server listening on {bind}:{port}")
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle_http(self, request: HTTPRequest, writer: asyncio.StreamWriter) -> bool:
+        keep_alive = request.keep_alive
+        if not check_basic_auth(request, APP_CONFIG.get("node", "rpc_user"), APP_CONFIG.get("node", "rpc_password")):
+            writer.write(build_response(
+                HTTPStatus.UNAUTHORIZED, keep_alive=False, headers={"WWW-Authenticate": 'Basic realm="jsonrpc"'}
+            ))
+            await writer.drain()
+            return False
+
+        if request.method != "POST":
+            writer.write(build_response(HTTPStatus.METHOD_NOT_ALLOWED, b"JSON-RPC server handles only POST requests", keep_alive=keep_alive))
+            await writer.drain()
+            return keep_alive
+
+        reply = await self.handle(request.body)
+        writer.write(build_response(HTTPStatus.OK, reply, "application/json", keep_alive))
+        await writer.drain()
+        return keep_alive
+
+    async def handle(self, body: bytes) -> bytes:
+        """Processes a raw JSON-RPC request or batch, and returns the raw JSON reply."""
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return json.dumps(self._error(None, RPC_PARSE_ERROR, "Parse error")).encode()
+
+        if isinstance(payload, list):
+            if not payload or len(payload) > MAX_BATCH_SIZE:
+                return json.dumps(self._error(None, RPC_INVALID_REQUEST, f"Batch must have 1 to {MAX_BATCH_SIZE} requests")).encode()
+            replies = await asyncio.gather(*(self._call(request) for request in payload))
+            return json.dumps(replies).encode()
+
+        return json.dumps(await self._call(payload)).encode()
+
+    @staticmethod
+    def _error(request_id, code: int, message: str) -> dict:
+        return {"result": None, "error": {"code": code, "message": message}, "id": request_id}
+
+    async def _call(self, request) -> dict:
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return self._error(None, RPC_INVALID_REQUEST, "Invalid request")
+
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return self._error(request_id, RPC_METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+
+        params = request.get("params", [])
+        try:
+            if isinstance(params, dict):
+                args = inspect.signature(method).bind(**params)
+            elif isinstance(params, list):
+                args = inspect.signature(method).bind(*params)
+            else:
+                raise TypeError("params must be an array or an object")
+        except TypeError as e:
+            return self._error(request_id, RPC_INVALID_PARAMS, f"Invalid params: {e}")
+
+        try:
+            result = await method(*args.args, **args.kwargs)
+        except RPCError as e:
+            return self._error(request_id, e.code, e.message)
+        except Exception as e:
+            log.exception(f"RPC {request['method']} failed: {e}")
+            return self._error(request_id, RPC_INTERNAL_ERROR, str(e))
+
+        return {"result": result, "error": None, "id": request_id}
+
+    async def _run(self, func, *args):
+        """Runs blocking database reads and CPU-heavy work in the default executor."""
+        return await self.node.loop.run_in_executor(None, func, *args)
+
+    # Methods
+    async def getblock(self, blockhash: str, verbosity: int = 1):
+        block_hash = _parse_hash(blockhash)
+        tip_height = self.node.block_tip_index.height
+
+        def work():
+            envelope = self.node.block_cache.get(block_hash)
+            block_raw = envelope.payload if envelope else get_raw_block(block_hash)
+            if block_raw is None:
+                raise RPCError(RPC_NOT_FOUND, "Block not found")
+            if verbosity == 0:
+                return block_raw.hex()
+
+            block = Block.parse(block_raw)
+            result = header_to_json(block.header, tip_height)
+            result["size"] = len(block_raw)
+            if verbosity >= 2:
+                result["tx"] = [tx_to_json(tx) for tx in block.get_transactions()]
+            else:
+                result["tx"] = [tx_hash.hex() for tx_hash in block.get_tx_hashes()]
+            return result
+
+        return await self._run(work)
+
+    async def getblockheader(self, blockhash: str, verbose: bool = True):
+        block_hash = _parse_hash(blockhash)
+        tip_height = self.node.block_tip_index.height
+
+        def work():
+            header_raw = get_raw_header(block_hash)
+            if header_raw is None:
+                raise RPCError(RPC_NOT_FOUND, "Block not found")
+            if not verbose:
+                return header_raw.hex()
+            return header_to_json(Header.parse(header_raw), tip_height)
+
+        return await self._run(work)
+
+    async def getrawtransaction(self, txid: str, verbose: bool = False):
+        tx_hash = _parse_hash(txid)
+        tip_height = self.node.block_tip_index.height
+        mempool_tx = self.node.mempool.get_valid_tx(tx_hash) or self.node.mempool.get_orphan_tx(tx_hash)
+
+        def work():
+            if mempool_tx:
+                tx, height = mempool_tx, None
+            elif tx_raw := get_tx(tx_hash):
+                tx, height = Transaction.parse(tx_raw), get_tx_height(tx_hash)
+            else:
+                raise RPCError(RPC_NOT_FOUND, "No such mempool or blockchain transaction")
+
+            if not verbose:
+                return tx.serialize().hex()
+
+            result = tx_to_json(tx)
+            result["hex"] = tx.serialize().hex()
+            result["blockheight"] = height
+            result["confirmations"] = tip_height - height + 1 if height is not None else 0
+            return result
+
+        return await self._run(work)
+
+    async def sendrawtransaction(self, hexstring: str):
+        tx_raw = _parse_hex(hexstring)
+        try:
+            tx = await self._run(Transaction.parse, tx_raw)
+        except Exception:
+            raise RPCError(RPC_DESERIALIZATION_ERROR, "TX decode failed")
+
+        tx_hash = tx.hash()
+        if self.node.mempool.get_valid_tx(tx_hash) or self.node.mempool.get_orphan_tx(tx_hash):
+            return tx_hash.hex()
+
+        # Added in the event loop, like transactions from peers
+        if reason := self.node.mempool.add_tx(tx):
+            if reason in RECENT_REJECT_REASONS:
+                self.node.add_recent_reject(tx_hash)
+            raise RPCError(RPC_VERIFY_REJECTED, f"Transaction rejected by mempool: {reason}")
+        return tx_hash.hex()
+
+    async def getmempoolinfo(self):
+        stats = self.node.mempool.get_stats()
+        return {
+            "size": stats.count,
+            "bytes": stats.size,
+            "total_fee": stats.fee,
+            "orphans": stats.orphan_count,
+            "orphan_bytes": stats.orphan_size,
+            "maxmempool": stats.max_size,
+            "usage": stats.usage,
+            "mempoolminfee": stats.min_fee_rate,
+            "minrelaytxfee": APP_CONFIG.get("node", "min_relay_fee_rate"),
+            "fee_histogram": [
+                {"fee_rate": fee_rate, "count": count, "bytes": size}
+                for fee_rate, count, size in stats.fee_rate_histogram
+            ],
+        }
+
+    async def estimatesmartfee(self, conf_target: int):
+        if not isinstance(conf_target, int) or not 1 <= conf_target <= FEE_ESTIMATE_MAX_TARGET:
+            raise RPCError(RPC_INVALID_PARAMETER, f"Invalid conf_target, must be between 1 and {FEE_ESTIMATE_MAX_TARGET}")
+        fee_rate = self.node.fee_estimator.estimate_fee_rate(conf_target)
+        if fee_rate is None:
+            return {"errors": ["Insufficient data or no feerate found"], "blocks": conf_target}
+        return {"feerate": max(fee_rate, self.node.mempool.get_min_fee_rate()), "blocks": conf_target}
+
+    async def getutxos(self, address: str):
+        pk_hash = wif_decode(address) if isinstance(address, str) else None
+        if not pk_hash:
+            raise RPCError(RPC_INVALID_PARAMETER, f"Invalid address: {address}")
+
+        def work():
+            return [
+                {
+                    "txid": utxo.tx_hash.hex(),
+                    "vout": utxo.index,
+                    "value": utxo.value,
+                    "timestamp": utxo.timestamp,
+                    "scriptPubKey": utxo.script_pubkey.serialize().hex(),
+                }
+                for utxo in sorted(get_utxo_set_to_addr(pk_hash), key=lambda utxo: (utxo.timestamp, utxo.tx_hash, utxo.index))
+            ]
+
+        return await self._run(work)
+
+    async def getblocktemplate(self):
+        template = self.node.block_assembler.get_template()
+        mtp = await self._run(median_time_past)
+        return {
+            "version": 1,
+            "previousblockhash": template.prev_block.hex(),
+            "height": template.height,
+            "bits": template.bits.hex(),
+            "target": f"{bits_to_target(template.bits):064x}",
+            "curtime": int(time.time()),
+            "mintime": mtp + 1,
+            "coinbasevalue": template.coinbase_value,
+            "sizelimit": MAX_BLOCK_SIZE,
+            "transactions": [
+                {"data": entry.tx.serialize().hex(), "txid": entry.tx_hash.hex(), "fee": entry.fee, "size": entry.size}
+                for entry in template.entries
+            ],
+        }
+
+    async def submitblock(self, hexdata: str):
+        block_raw = _parse_hex(hexdata)
+        try:
+            block = await self._run(Block.parse, block_raw)
+        except Exception:
+            raise RPCError(RPC_DESERIALIZATION_ERROR, "Block decode failed")
+
+        block_hash = block.hash()
+        if get_block_exists(block_hash):
+            return "duplicate"
+        if not get_block_exists(block.prev_block):
+            return "inconclusive"
+
+        # Connected in the event loop, like blocks from peers
+        process_new_block(block, self.node)
+        if get_block_index(block_hash) is None:
+            return "rejected"
+        return None
@@ -2,13 +2,18 @@ import logging
 from utils.config import APP_CONFIG
 
 
-def configure_logging() -> logging.Logger:
+def configure_logging(console: bool = False) -> logging.Logger:
     """
     Configure the logging system and return a logger for this module.
+    \nLogs to the log file, or to stderr if `console` is True (e.g. for the headless daemon).
     """
-    log_path = APP_CONFIG.get("path", "log")
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    log_path.touch(exist_ok=True)
+    if console:
+        output = {"stream": None}
+    else:
+        log_path = APP_CONFIG.get("path", "log")
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        log_path.touch(exist_ok=True)
+        output = {"filename": log_path, "filemode": "w"}
     
     logging.basicConfig(
         level=logging.INFO,
@@ -18,9 +23,8 @@ def configure_logging() -> logging.Logger:
             "%(funcName)s() - "
             "%(message)s"
         ),
-        filename=log_path,
-        filemode="w",
         force=True,
+        **output,
     )
 
 
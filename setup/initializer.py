@@ -1,18 +1,15 @@
 """
 Setup file to create LMDB database and save genesis block
 """
-from math import floor
 from pathlib import Path
 import sqlite3
 import time
-import tkinter as tk
-from tkinter import font
 
 from crypto.hashing import HASH256
 
 from ktc_constants import GENESIS_HASH, GENESIS_BLOCK_BYTES, HIGHEST_TARGET, INITIAL_BLOCK_REWARD
 from utils.config import APP_CONFIG
-from utils.helper import int_to_bytes
+from utils.helper import int_to_bytes, target_to_work
 
 ADDRESSES_SQL = APP_CONFIG.get("path", "addresses")
 PEERS_SQL = APP_CONFIG.get("path", "peers")
@@ -57,6 +54,7 @@ def init_db():
                 added INTEGER,
                 last_seen INTEGER,
                 services INTEGER,
+                tried INTEGER DEFAULT 0,
                 UNIQUE(ip, port)
             );""")
         con.commit()
@@ -108,7 +106,7 @@ def init_db():
             GENESIS_HASH
             + bytes(32)
             + int_to_bytes(0, 8)
-            + int_to_bytes(floor((1 << 256) / (HIGHEST_TARGET + 1)), 32)
+            + int_to_bytes(target_to_work(HIGHEST_TARGET), 32)
             + bytes(0)
         )
         db_tx.put(GENESIS_HASH, index_value, db=INDEX_DB)
@@ -138,6 +136,8 @@ def init_db():
         db_tx.put(CB_TX_OUTPUT[12:32], outpoint, db=ADDR_DB)
         
 def init_font():
+    import tkinter as tk  # Imported here so that the headless daemon never loads Tk
+
     MONO_STACK = ["Courier New", "Courier", "Liberation Mono", "Monospace"]
     SANS_STACK = ["Segoe UI", "Helvetica", "Arial", "Sans"]
     
@@ -149,6 +149,8 @@ def init_font():
 
 def _pick_family(stack):
     """Return the first available font family from the stack."""
+    from tkinter import font
+
     available = list(font.families())
     for f in stack:
         if f in available:
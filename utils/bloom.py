@@ -0,0 +1,59 @@
+import hashlib
+import math
+import os
+
+
+class RollingBloomFilter:
+    """
+    A probabilistic set that remembers roughly the last `n_elements` items inserted into it.
+
+    Items are kept in two generations of `n_elements // 2` each. Once the current generation
+    is full, the older one is discarded, so memory stays constant no matter how many items are inserted.
+
+    `contains` never gives a false negative for the most recent `n_elements // 2` items,
+    and gives a false positive with a probability of roughly `2 * fp_rate`.
+    """
+    def __init__(self, n_elements: int, fp_rate: float = 1e-6):
+        self.gen_capacity = max(1, n_elements // 2)
+
+        # Optimal bit count and number of hash functions for each generation
+        self.n_bits = max(8, math.ceil(-self.gen_capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / self.gen_capacity * math.log(2)))
+
+        # Random key so that peers cannot craft hashes which collide in our filter
+        self._key = os.urandom(16)
+
+        self._current = bytearray((self.n_bits + 7) // 8)
+        self._previous = bytearray((self.n_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, item: bytes) -> list[int]:
+        digest = hashlib.blake2b(item, key=self._key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def insert(self, item: bytes) -> None:
+        if self._count >= self.gen_capacity:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._count = 0
+
+        for pos in self._positions(item):
+            self._current[pos >> 3] |= 1 << (pos & 7)
+        self._count += 1
+
+    def contains(self, item: bytes) -> bool:
+        positions = self._positions(item)
+        for bits in (self._current, self._previous):
+            if all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions):
+                return True
+        return False
+
+    def reset(self) -> None:
+        self._current = bytearray(len(self._current))
+        self._previous = bytearray(len(self._previous))
+        self._count = 0
+
+    def __contains__(self, item: bytes) -> bool:
+        return self.contains(item)
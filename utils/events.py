@@ -0,0 +1,83 @@
+"""
+Publish/subscribe of node events, delivered to another thread (the GUI) as deltas.
+
+    TX_ADDED            tx_hash, tx, orphan, time, fee (None for orphans)
+    TX_REMOVED          tx_hash, orphan
+    BLOCK_CONNECTED     block_hash, height
+    BLOCK_DISCONNECTED  block_hash, height
+    PEER_CONNECTED      peer_id
+    PEER_DISCONNECTED   peer_id
+
+Events are published from the node's event loop and queued; subscribers are only ever called from `dispatch`,
+in the consumer's thread. Events nobody subscribed to are dropped right away, so a node without a GUI does no extra work.
+"""
+
+import logging
+import queue
+import threading
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+TX_ADDED = "tx_added"
+TX_REMOVED = "tx_removed"
+BLOCK_CONNECTED = "block_connected"
+BLOCK_DISCONNECTED = "block_disconnected"
+PEER_CONNECTED = "peer_connected"
+PEER_DISCONNECTED = "peer_disconnected"
+
+
+class EventBus:
+    def __init__(self):
+        # Lists are replaced rather than changed in place, so the publishing thread can read them without a lock
+        self._subscribers: dict[str, list[Callable]] = dict()
+        self._queue: queue.SimpleQueue[tuple[str, dict]] = queue.SimpleQueue()
+        self._pending = threading.Event()
+        self._notifier: threading.Thread | None = None
+
+    def subscribe(self, name: str, callback: Callable):
+        """`callback` is called with the event's fields as keyword arguments."""
+        self._subscribers[name] = self._subscribers.get(name, []) + [callback]
+
+    def unsubscribe(self, name: str, callback: Callable):
+        self._subscribers[name] = [subscriber for subscriber in self._subscribers.get(name, []) if subscriber != callback]
+
+    def publish(self, name: str, **data):
+        if not self._subscribers.get(name):
+            return
+        self._queue.put((name, data))
+        self._pending.set()
+
+    def dispatch(self) -> int:
+        """Calls the subscribers of every queued event, in order. Must be called from the consumer's thread. Returns the no. of events."""
+        n_events = 0
+        while True:
+            try:
+                name, data = self._queue.get_nowait()
+            except queue.Empty:
+                return n_events
+            n_events += 1
+            for callback in self._subscribers.get(name, []):
+                try:
+                    callback(**data)
+                except Exception:
+                    log.exception(f"Subscriber to '{name}' failed")
+
+    def start_notifier(self, notify: Callable[[], None]):
+        """
+        Calls `notify` from a separate thread once events are queued, so that the consumer can wake up and `dispatch` them
+        instead of polling. One call covers every event queued before the consumer dispatches.
+        \n`notify` may block, e.g. while Tk is busy, without holding up the node's event loop. If it fails, e.g. before Tk's
+        main loop has started, the events stay queued until the next successful call or `dispatch`.
+        """
+        def run():
+            while True:
+                self._pending.wait()
+                self._pending.clear()
+                try:
+                    notify()
+                except Exception as e:
+                    log.debug(f"Failed to notify of queued events: {e}")
+
+        self._notifier = threading.Thread(target=run, name="event-notifier", daemon=True)
+        self._notifier.start()
@@ -2,7 +2,7 @@
 from datetime import datetime
 import math
 
-from networking.constants import _SVC_FULL, _SVC_BETA
+from networking.constants import _SVC_FULL, _SVC_BETA, _SVC_COMPRESS
 
 
 def print_compare_bytes(stuff1: bytes, stuff2: bytes) -> None:
@@ -145,5 +145,8 @@ def services_to_str(services: bytes):
     
     if services & _SVC_FULL:
         svcs.append("NODE_FULL")
+    
+    if services & _SVC_COMPRESS:
+        svcs.append("NODE_COMPRESS")
         
     return ", ".join(svcs)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from math import floor
 from typing import BinaryIO
 from io import BytesIO
 import ipaddress
@@ -68,6 +69,14 @@ def bits_to_target(bits: bytes):
     return bytes_to_int(bits[:3]) * pow(256, bits[3] - 3)
 
 
+def target_to_work(target: int) -> int:
+    """
+    Expected no. of hashes to find a block below `target`, as summed into chainwork.
+    \nComputed with a float division, as for the chainwork already stored, so every caller must use this to compare equal.
+    """
+    return floor((1 << 256) / (target + 1))
+
+
 def target_to_bits(target: int):
     raw = target.to_bytes(32, byteorder="big").lstrip(b"\x00")
     size = len(raw)
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    A token bucket allowing `rate` units per second on average, with bursts of up to `burst` units.
+
+    `consume` never waits and may leave the bucket in debt, so that urgent traffic is never delayed,
+    while `throttle` waits for the debt to be paid off first. A `rate` of 0 disables limiting.
+    """
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate  # 1 second worth of tokens by default
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, amount: float) -> None:
+        """Takes `amount` tokens without waiting."""
+        if not self.rate:
+            return
+        self._refill()
+        self._tokens -= amount
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` tokens (or a full bucket, if `amount` is larger than `burst`) are available."""
+        if not self.rate:
+            return 0
+        self._refill()
+        return max(0.0, (min(amount, self.burst) - self._tokens) / self.rate)
+
+    async def throttle(self, amount: float) -> None:
+        """Waits until `amount` tokens are available, then takes them."""
+        while (delay := self.delay(amount)) > 0:
+            await asyncio.sleep(delay)
+        self.consume(amount)
@@ -0,0 +1,43 @@
+import bisect
+from typing import Any, Iterator
+
+
+class SortedIndex:
+    """
+    Keys kept in ascending order, for indexes that must be walked in order or have their extremes looked up.
+
+    Keys must be unique and comparable, e.g. `(fee_rate, tx_hash)`. Positions are found by binary search
+    in O(log n); inserting and removing then shift the underlying list, which is a single memmove
+    and negligible next to the O(n log n) re-sort it replaces.
+    """
+    def __init__(self):
+        self._keys: list[Any] = []
+
+    def add(self, key) -> None:
+        bisect.insort(self._keys, key)
+
+    def remove(self, key) -> None:
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def first(self):
+        """Smallest key, or None if empty."""
+        return self._keys[0] if self._keys else None
+
+    def last(self):
+        """Largest key, or None if empty."""
+        return self._keys[-1] if self._keys else None
+
+    def __iter__(self) -> Iterator:
+        return iter(self._keys)
+
+    def __reversed__(self) -> Iterator:
+        return reversed(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
@@ -1,10 +1,8 @@
 # Specialized file for coin selection algorithms
 
 
-from blockchain.transaction import Transaction
 from db.utxo import UTXO
-from ktc_constants import KTC, MAX_BLOCK_SIZE
-from mining.constants import MIN_RELAY_TX_FEE_RATE
+from ktc_constants import KTC
 from utils.config import APP_CONFIG
 
 
@@ -73,16 +71,3 @@ def select_utxos(utxo_set: set[UTXO], target, use_min_change = True) -> list[UTX
     
     # 1.6 In the rare case where total_small + largest utxo != target and < target + min_change
     return select_utxos(utxo_set, target, use_min_change=False)
-        
-
-def get_recommended_fee_rate(mempool: list[Transaction], wait_block = 1) -> int:
-    """Returns fee in khet/KB"""
-    mempool.sort(key = lambda tx: tx.fee() / tx.size(), reverse=True)
-    
-    size = 0
-    for tx in mempool:
-        size += tx.size()
-        if size > wait_block * MAX_BLOCK_SIZE:
-            return round(tx.fee() / tx.size())
-    else:
-        return MIN_RELAY_TX_FEE_RATE